@@ -0,0 +1,316 @@
+#!/usr/bin/env python3
+# 🏁 Banc d'essai du pipeline : chronomètre chaque processeur, le validateur, la jointure
+# et le formatter sur un jeu de données synthétique, enregistre les résultats
+# (data/benchmarks/benchmark_results.jsonl) et signale les régressions d'un run à l'autre.
+
+import os
+import sys
+import json
+import shutil
+import argparse
+import platform
+import statistics
+import subprocess
+import tempfile
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+# Ajout du chemin racine pour import des modules du pipeline
+PIPELINE_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, PIPELINE_ROOT)
+
+from benchmarks.data_generator import DATASETS_DIR, generate_dataset, load_descriptor
+from monitoring.data_metrics import COUNTERS, load_metrics, track
+from transformations.data_storage import load_pipeline_config
+
+BENCHMARKS_DIR = os.path.join(PIPELINE_ROOT, "data", "benchmarks")
+RESULTS_PATH = os.path.join(BENCHMARKS_DIR, "benchmark_results.jsonl")
+
+# Code du pipeline copié dans le répertoire de travail : les sorties du benchmark
+# (data/processed, manifest, dictionnaires...) ne touchent jamais les vraies données
+CODE_DIRS = ["config", "orchestration", "processing", "transformations", "monitoring", "benchmarks"]
+
+# Étapes dans l'ordre d'exécution (la jointure et le formatter lisent les données enrichies)
+STEPS = ["validator", "api_logs", "sessions", "products", "users", "joiner", "formatter"]
+STEP_SOURCES = {"validator": None, "api_logs": "logs", "sessions": "sessions", "products": "products",
+                "users": "users", "joiner": "sessions", "formatter": "logs"}
+OK_CODES = {"validator": (0, 1)}  # 1 = fichiers rejetés (violations injectées), pas un échec du banc
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=PIPELINE_ROOT,
+                                       stderr=subprocess.DEVNULL, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+# ===============================
+# 🧪 Jeu de données
+# ===============================
+
+def prepare_dataset(args) -> tuple:
+    """
+    Jeu de données du benchmark : --dataset existant, ou généré (et réutilisé tant que
+    ses paramètres ne changent pas) dans data/benchmarks/datasets/.
+    """
+    if args.dataset:
+        descriptor = load_descriptor(args.dataset)
+        if descriptor is None:
+            print(f"❌ dataset.json introuvable dans {args.dataset} (jeu produit par data_generator.py attendu)")
+            sys.exit(1)
+        return args.dataset, descriptor
+
+    dataset_dir = os.path.join(DATASETS_DIR, f"rows_{args.rows}_seed_{args.seed}")
+    params = {"null_rate": args.null_rate, "violation_rate": args.violation_rate, "seed": args.seed,
+              "days": args.days, "logs_format": args.logs_format}
+    descriptor = load_descriptor(dataset_dir)
+    if descriptor is not None and sum(descriptor["rows"].values()) == args.rows \
+            and all(descriptor.get(k) == v for k, v in params.items()):
+        print(f"♻️  Jeu de données réutilisé : {dataset_dir}")
+        return dataset_dir, descriptor
+
+    shutil.rmtree(dataset_dir, ignore_errors=True)
+    print(f"🧪 Génération de {args.rows} lignes dans {dataset_dir}...")
+    descriptor = generate_dataset(dataset_dir, args.rows, workers=args.workers, **params)
+    print(f"✅ Jeu de données généré en {descriptor['duration_s']} s")
+    return dataset_dir, descriptor
+
+
+def step_commands(step: str, dataset_dir: str, descriptor: dict, args) -> List[List[str]]:
+    """
+    Commandes d'une étape (une par fichier d'entrée pour les processeurs), lancées
+    depuis le répertoire de travail.
+    """
+    files = {source: [os.path.join(dataset_dir, f["path"]) for f in descriptor["files"] if f["source"] == source]
+             for source in ("logs", "sessions", "products", "users")}
+    py, workers = sys.executable, str(args.workers)
+    if step == "validator":
+        return [[py, "processing/data_validator.py", "--input-dir", dataset_dir, "--workers", workers,
+                 "--check-schema", "--check-anomalies", "--check-coherence"]]
+    if step == "api_logs":
+        inputs = sorted({p.split(".zip" + os.sep)[0] + ".zip" if ".zip" + os.sep in p else p for p in files["logs"]})
+        return [[py, "processing/api_log_processor.py", "--input", p, "--workers", workers, "--force"] for p in inputs]
+    if step == "sessions":
+        return [[py, "processing/session_processor.py", "--input", p, "--workers", workers, "--force"]
+                for p in files["sessions"]]
+    if step == "products":
+        return [[py, "processing/product_processor.py", "--input", p, "--force"] for p in files["products"]]
+    if step == "users":
+        return [[py, "processing/business_processor.py", "--input", p, "--force"] for p in files["users"]]
+    if step == "joiner":
+        return [[py, "transformations/data_joiner.py", "--mode", args.join_mode, "--workers", workers]]
+    return [[py, "benchmarks/benchmark_runner.py", "--formatter-only"]]
+
+
+# ===============================
+# ⏱️ Exécution mesurée
+# ===============================
+
+def run_step(step: str, commands: List[List[str]], workdir: str, run_id: str, log_file) -> dict:
+    """
+    Lance les commandes d'une étape, chacune mesurée par data_metrics.py (durée, CPU,
+    pic de RSS de ses processus, volumes des tâches), et agrège les mesures.
+    """
+    metrics_path = os.path.join(workdir, "data", "metrics", "pipeline_metrics.jsonl")
+    env = dict(os.environ, PIPELINE_RUN_ID=run_id, PIPELINE_METRICS_PATH=metrics_path)
+    seen = len(load_metrics(metrics_path))
+    codes = []
+    for command in commands:
+        log_file.write(f"\n$ {' '.join(command)}\n")
+        log_file.flush()
+        codes.append(subprocess.call(
+            [sys.executable, "monitoring/data_metrics.py", "run", "--stage", step, "--"] + command,
+            cwd=workdir, env=env, stdout=log_file, stderr=subprocess.STDOUT))
+
+    records = [r for r in load_metrics(metrics_path)[seen:] if r["level"] == "stage" and r["stage"] == step]
+    result = {
+        "step": step,
+        "status": "ok" if all(c in OK_CODES.get(step, (0,)) for c in codes) else "failed",
+        "exit_codes": codes,
+        "wall_s": round(sum(r["wall_s"] for r in records), 3),
+        "cpu_s": round(sum(r["cpu_s"] for r in records), 3),
+        "peak_rss_mb": max((r["peak_rss_mb"] for r in records), default=0.0),
+    }
+    for key in COUNTERS:
+        result[key] = sum(r.get(key, 0) for r in records)
+    return result
+
+
+def bench_formatter() -> None:
+    """
+    Étape formatter : réécrit le dataset enrichi des logs partitionné par date
+    (write_partitions : découpage + écritures parallèles), dans le répertoire de travail.
+    """
+    from transformations.data_enricher import ENRICHED_DIR
+    from transformations.data_formatter import write_partitions
+    from transformations.data_storage import read_dataset
+
+    with track("formatter:logs_enriched"):
+        df = read_dataset(os.path.join(ENRICHED_DIR, "logs_enriched"))
+        output_root = os.path.join(BENCHMARKS_DIR, "formatter_output")
+        shutil.rmtree(output_root, ignore_errors=True)
+        outputs = write_partitions(df, output_root, "date", lambda date: f"api_logs_{date}_bench")
+    print(f"💾 {len(outputs)} partitions écrites ({len(df)} lignes)")
+
+
+# ===============================
+# 📈 Régressions
+# ===============================
+
+def comparison_key(descriptor: dict, args) -> dict:
+    """
+    Paramètres qui rendent deux runs comparables (volumes, taux, workers...).
+    """
+    return {
+        "rows": descriptor["rows"],
+        "null_rate": descriptor["null_rate"],
+        "violation_rate": descriptor["violation_rate"],
+        "seed": descriptor["seed"],
+        "days": descriptor["days"],
+        "logs_format": descriptor["logs_format"],
+        "workers": args.workers,
+        "join_mode": args.join_mode,
+    }
+
+
+def load_results(results_path: str = RESULTS_PATH) -> List[dict]:
+    if not os.path.exists(results_path):
+        return []
+    with open(results_path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def detect_regressions(steps: List[dict], history: List[dict], tolerance: float) -> List[dict]:
+    """
+    Compare chaque étape à la médiane des runs comparables précédents : une durée ou un
+    pic de RSS au-delà de (1 + tolerance) × médiane est une régression, en deçà de
+    (1 - tolerance) × médiane une amélioration.
+    """
+    findings = []
+    for step in steps:
+        previous = [s for run in history for s in run["steps"] if s["step"] == step["step"] and s["status"] == "ok"]
+        step["baseline_wall_s"] = None
+        if not previous or step["status"] != "ok":
+            continue
+        for field, label in (("wall_s", "durée"), ("peak_rss_mb", "mémoire")):
+            baseline = statistics.median(s[field] for s in previous)
+            if field == "wall_s":
+                step["baseline_wall_s"] = baseline
+            if baseline <= 0:
+                continue
+            change = step[field] / baseline - 1
+            if abs(change) > tolerance:
+                findings.append({"step": step["step"], "metric": label, "value": step[field],
+                                 "baseline": baseline, "change_pct": round(change * 100, 1),
+                                 "kind": "regression" if change > 0 else "improvement"})
+    return findings
+
+
+def print_report(steps: List[dict], findings: List[dict]) -> None:
+    print(f"\n{'Étape':<12} {'Statut':<7} {'Durée (s)':>10} {'Réf. (s)':>9} {'CPU (s)':>9} "
+          f"{'RSS (Mo)':>9} {'Lignes':>11} {'Lignes/s':>11}")
+    for s in steps:
+        baseline = f"{s['baseline_wall_s']:.2f}" if s.get("baseline_wall_s") else "-"
+        print(f"{s['step']:<12} {s['status']:<7} {s['wall_s']:>10.2f} {baseline:>9} {s['cpu_s']:>9.2f} "
+              f"{s['peak_rss_mb']:>9.1f} {s['rows']:>11} {s['rows_per_s'] or 0:>11.0f}")
+    for f in findings:
+        icon = "⚠️  Régression" if f["kind"] == "regression" else "🚀 Amélioration"
+        print(f"{icon} [{f['step']}] {f['metric']} : {f['value']} vs {f['baseline']} ({f['change_pct']:+.1f} %)")
+
+
+def main() -> None:
+    config = load_pipeline_config()
+    parser = argparse.ArgumentParser(description="Benchmark des étapes du pipeline sur données synthétiques")
+    parser.add_argument('--rows', type=int, default=1_000_000, help="Volume total généré (1M à 100M)")
+    parser.add_argument('--dataset', help="Jeu de données existant (dossier avec dataset.json)")
+    parser.add_argument('--days', type=int, default=7)
+    parser.add_argument('--null-rate', type=float, default=0.01)
+    parser.add_argument('--violation-rate', type=float, default=0.005)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--logs-format', choices=["zip", "json"], default="zip")
+    parser.add_argument('--workers', type=int, default=config.get("data_workers", 1))
+    parser.add_argument('--join-mode', choices=["memory", "sharded"], default=config.get("join_mode", "memory"))
+    parser.add_argument('--steps', nargs='+', choices=STEPS, default=STEPS, help="Étapes à mesurer")
+    parser.add_argument('--repeat', type=int, default=1, help="Répétitions (meilleure durée retenue)")
+    parser.add_argument('--tolerance', type=float, default=0.10, help="Écart toléré avant de signaler (0.10 = 10 %%)")
+    parser.add_argument('--history', type=int, default=3, help="Runs comparables précédents servant de référence")
+    parser.add_argument('--results', default=RESULTS_PATH, help="Fichier JSONL des résultats")
+    parser.add_argument('--fail-on-regression', action='store_true', help="Code retour 1 si une régression est détectée")
+    parser.add_argument('--keep-workdir', action='store_true', help="Conserver le répertoire de travail")
+    parser.add_argument('--formatter-only', action='store_true', help=argparse.SUPPRESS)  # Étape formatter (interne)
+    args = parser.parse_args()
+
+    if args.formatter_only:
+        bench_formatter()
+        return
+
+    dataset_dir, descriptor = prepare_dataset(args)
+    dataset_dir = os.path.abspath(dataset_dir)
+    steps = [s for s in STEPS if s in args.steps]
+    run_id = "bench_" + datetime.now().strftime("%Y%m%d_%H%M%S")
+
+    os.makedirs(BENCHMARKS_DIR, exist_ok=True)
+    workdir = tempfile.mkdtemp(prefix="work_", dir=BENCHMARKS_DIR)
+    for name in CODE_DIRS:
+        shutil.copytree(os.path.join(PIPELINE_ROOT, name), os.path.join(workdir, name),
+                        ignore=shutil.ignore_patterns("__pycache__"))
+    os.makedirs(os.path.join(workdir, "logs"), exist_ok=True)
+    log_path = os.path.join(workdir, "logs", "benchmark.log")
+
+    best: Dict[str, dict] = {}
+    try:
+        with open(log_path, "w", encoding="utf-8") as log_file:
+            for r in range(args.repeat):
+                for step in steps:
+                    print(f"⏱️ [{r + 1}/{args.repeat}] {step}...", flush=True)
+                    result = run_step(step, step_commands(step, dataset_dir, descriptor, args), workdir, run_id, log_file)
+                    if step not in best or (result["status"] != "ok", result["wall_s"]) < (best[step]["status"] != "ok", best[step]["wall_s"]):
+                        best[step] = result
+    finally:
+        if args.keep_workdir:
+            print(f"📁 Répertoire de travail conservé : {workdir} (journal : {log_path})")
+        else:
+            if any(result["status"] != "ok" for result in best.values()):
+                shutil.copy(log_path, os.path.join(BENCHMARKS_DIR, f"{run_id}.log"))
+                print(f"📝 Journal des étapes : {os.path.join(BENCHMARKS_DIR, run_id + '.log')}")
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    results = [best[s] for s in steps]
+    for s in results:
+        # Lignes de l'étape : volumes comptés par les tâches, sinon ceux du jeu de données
+        source = STEP_SOURCES[s["step"]]
+        s["rows"] = s["rows_in"] or (descriptor["rows"][source] if source else sum(descriptor["rows"].values()))
+        s["rows_per_s"] = round(s["rows"] / s["wall_s"], 1) if s["wall_s"] > 0 else None
+
+    key = comparison_key(descriptor, args)
+    history = [run for run in load_results(args.results) if run["key"] == key][-args.history:]
+    findings = detect_regressions(results, history, args.tolerance)
+    print_report(results, findings)
+
+    record = {
+        "timestamp": datetime.now(timezone.utc).isoformat().replace("+00:00", "Z"),
+        "run_id": run_id,
+        "commit": git_commit(),
+        "host": platform.node(),
+        "cpu_count": os.cpu_count(),
+        "dataset": dataset_dir,
+        "key": key,
+        "repeat": args.repeat,
+        "steps": results,
+        "findings": findings,
+    }
+    os.makedirs(os.path.dirname(args.results), exist_ok=True)
+    with open(args.results, "a", encoding="utf-8") as f:
+        f.write(json.dumps(record, ensure_ascii=False) + "\n")
+    print(f"📝 Résultats enregistrés : {args.results}")
+
+    failed = [s["step"] for s in results if s["status"] != "ok"]
+    if failed:
+        print(f"❌ Étapes en échec : {', '.join(failed)}")
+    regressions = [f for f in findings if f["kind"] == "regression"]
+    sys.exit(1 if failed or (args.fail_on_regression and regressions) else 0)
+
+
+if __name__ == "__main__":
+    main()
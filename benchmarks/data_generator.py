@@ -0,0 +1,504 @@
+#!/usr/bin/env python3
+# 🧪 Générateur de données synthétiques conformes à config/data_schemas.json
+# (logs API, sessions, produits, utilisateurs) pour les tests de charge du pipeline :
+# volume paramétrable (1M à 100M lignes), taux de valeurs nulles et de violations
+# des règles métier contrôlés, génération par chunks (mémoire bornée) et en parallèle.
+
+import os
+import sys
+import json
+import gzip
+import shutil
+import zipfile
+import argparse
+import numpy as np
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+# Ajout du chemin racine pour import des modules du pipeline
+PIPELINE_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, PIPELINE_ROOT)
+
+from transformations.data_reader import schema_columns
+from transformations.data_storage import load_pipeline_config
+
+DATASETS_DIR = os.path.join(PIPELINE_ROOT, "data", "benchmarks", "datasets")
+DESCRIPTOR_NAME = "dataset.json"
+CHUNK_ROWS = 500_000  # Lignes générées puis écrites à la fois
+
+# Répartition d'un volume total entre les sources
+SOURCE_SHARES = {"logs": 0.80, "sessions": 0.15, "users": 0.04, "products": 0.01}
+ID_COLUMNS = {"logs": "request_id", "sessions": "session_id", "users": "user_id", "products": "product_id"}
+SOURCE_CODES = {"logs": 1, "sessions": 2, "users": 3, "products": 4}  # Graines indépendantes par source
+
+# ===============================
+# 🎲 Référentiels de valeurs réalistes
+# ===============================
+
+ENDPOINTS = ["/api/products/{}", "/api/search", "/api/categories/{}", "/api/cart/add", "/api/cart",
+             "/api/checkout", "/api/login", "/api/auth/refresh", "/api/users/me", "/api/products/{}/reviews"]
+ENDPOINT_WEIGHTS = [0.30, 0.15, 0.10, 0.08, 0.07, 0.04, 0.06, 0.08, 0.07, 0.05]
+METHODS, METHOD_WEIGHTS = ["GET", "POST", "PUT", "DELETE"], [0.70, 0.20, 0.06, 0.04]
+STATUS_CODES = [200, 201, 204, 301, 400, 401, 404, 500, 503]
+STATUS_WEIGHTS = [0.80, 0.05, 0.02, 0.01, 0.03, 0.02, 0.04, 0.02, 0.01]
+COUNTRY_CODES = ["FR", "DE", "ES", "IT", "GB", "BE", "US", "CH"]
+COUNTRY_CODE_WEIGHTS = [0.40, 0.15, 0.10, 0.10, 0.08, 0.07, 0.06, 0.04]
+LOCATIONS = [("France", "Paris"), ("France", "Lyon"), ("France", "Marseille"), ("Germany", "Berlin"),
+             ("Germany", "Munich"), ("Spain", "Madrid"), ("Italy", "Rome"), ("United Kingdom", "London"),
+             ("Belgium", "Brussels"), ("United States", "New York")]
+LOCATION_WEIGHTS = [0.22, 0.10, 0.08, 0.10, 0.05, 0.10, 0.10, 0.09, 0.08, 0.08]
+COUNTRIES = np.array([country for country, _ in LOCATIONS], dtype=object)
+CITIES = np.array([city for _, city in LOCATIONS], dtype=object)
+DEVICES, DEVICE_WEIGHTS = ["desktop", "mobile", "tablet"], [0.45, 0.45, 0.10]
+BROWSERS, BROWSER_WEIGHTS = ["Chrome", "Safari", "Firefox", "Edge"], [0.60, 0.22, 0.10, 0.08]
+REFERRERS = ["google_ads", "organic_search", "facebook", "social_x", "direct", "newsletter", None]
+REFERRER_WEIGHTS = [0.20, 0.25, 0.12, 0.05, 0.20, 0.08, 0.10]
+CATEGORIES = ["Vêtements", "Chaussures", "Accessoires", "Électronique", "Maison", "Sport"]
+BRANDS = ["Nordika", "Alto", "Veltro", "Kumo", "Brisa", "Orbis", "Lumen", "Tavola"]
+FIRST_NAMES = ["Camille", "Léa", "Hugo", "Lucas", "Emma", "Jonas", "Sofia", "Marco", "Anna", "Noah",
+               "Inès", "Yanis", "Chloé", "Elias", "Mila", "Adam"]
+LAST_NAMES = ["Martin", "Bernard", "Dubois", "Müller", "Schmidt", "García", "Rossi", "Smith",
+              "Peeters", "Moreau", "Laurent", "Fischer", "López", "Bianchi"]
+EMAIL_DOMAINS = ["example.com", "mail.fr", "web.de", "correo.es", "posta.it"]
+
+
+# ===============================
+# 🧱 Génération des sources (un chunk à la fois)
+# ===============================
+
+def _ids(prefix: str, start: int, n: int) -> pd.Series:
+    return prefix + pd.Series(np.arange(start, start + n)).astype(str)
+
+
+def _timestamps(day_start: np.datetime64, seconds: np.ndarray) -> pd.Series:
+    """
+    Horodatages texte "AAAA-MM-JJ HH:MM:SS" (format des fichiers bruts).
+    """
+    values = np.datetime_as_string(day_start + seconds.astype("timedelta64[s]"), unit="s")
+    return pd.Series(values).str.replace("T", " ", regex=False)
+
+
+def session_user(session_index: np.ndarray, n_users: int) -> np.ndarray:
+    """
+    Utilisateur d'une session (fonction déterministe de son numéro) : les logs retrouvent
+    l'utilisateur de leur session sans table de correspondance.
+    """
+    return (session_index.astype(np.uint64) * np.uint64(2654435761)) % np.uint64(max(n_users, 1))
+
+
+def generate_logs(rng: np.random.Generator, start: int, n: int, day_start: np.datetime64,
+                  sessions_range: tuple, n_users: int, n_products: int) -> pd.DataFrame:
+    """
+    Logs API d'une journée : chaque requête appartient à une session du même jour.
+    """
+    first_session, n_sessions = sessions_range
+    sessions = first_session + rng.integers(0, max(n_sessions, 1), n)
+    kinds = rng.choice(len(ENDPOINTS), n, p=ENDPOINT_WEIGHTS)
+    endpoints = pd.Series(np.array(ENDPOINTS, dtype=object)[kinds], dtype=object)
+    ids = pd.Series(rng.integers(1, max(n_products, 2), n)).astype(str)
+    for k, template in enumerate(ENDPOINTS):
+        if "{}" in template:
+            # Identifiant produit/catégorie inséré dans le chemin (concaténation vectorisée)
+            prefix, suffix = template.split("{}")
+            selected = kinds == k
+            endpoints[selected] = prefix + ids[selected] + suffix
+    return pd.DataFrame({
+        "timestamp": _timestamps(day_start, np.sort(rng.integers(0, 86_400, n))),
+        "request_id": _ids("r", start, n),
+        "user_id": "u" + pd.Series(session_user(sessions, n_users)).astype(str),
+        "endpoint": endpoints,
+        "method": rng.choice(METHODS, n, p=METHOD_WEIGHTS),
+        "status_code": rng.choice(STATUS_CODES, n, p=STATUS_WEIGHTS),
+        "response_time_ms": np.round(rng.lognormal(4.6, 0.7, n), 1),
+        "payload_size_bytes": rng.lognormal(7, 1, n).astype(np.int64),
+        "cache_hit": rng.random(n) < 0.35,
+        "country_code": rng.choice(COUNTRY_CODES, n, p=COUNTRY_CODE_WEIGHTS),
+        "session_id": "s" + pd.Series(sessions).astype(str),
+    })
+
+
+def generate_sessions(rng: np.random.Generator, start: int, n: int, day_start: np.datetime64,
+                      n_users: int) -> pd.DataFrame:
+    """
+    Sessions d'une journée : parcours (pages, produits vus, panier) et conversion cohérents.
+    """
+    index = np.arange(start, start + n)
+    starts = rng.integers(0, 86_400, n)
+    duration = np.clip(rng.lognormal(6.2, 1.0, n), 5, 5 * 3600).astype(np.int64)
+    pages = rng.geometric(0.18, n)
+    viewed = rng.binomial(pages, 0.5)
+    added = rng.binomial(viewed, 0.15)
+    conversion = rng.random(n) < np.where(added > 0, 0.45, 0.02)
+    locations = rng.choice(len(LOCATIONS), n, p=LOCATION_WEIGHTS)
+    return pd.DataFrame({
+        "session_id": _ids("s", start, n),
+        "user_id": "u" + pd.Series(session_user(index, n_users)).astype(str),
+        "start_time": _timestamps(day_start, starts),
+        "end_time": _timestamps(day_start, starts + duration),
+        "pages_visited": pages,
+        "products_viewed": viewed,
+        "products_added_to_cart": added,
+        "conversion": conversion,
+        "total_spent": np.where(conversion, np.round(rng.gamma(2.0, 45.0, n) + 5, 2), 0.0),
+        "device_type": rng.choice(DEVICES, n, p=DEVICE_WEIGHTS),
+        "browser": rng.choice(BROWSERS, n, p=BROWSER_WEIGHTS),
+        "referrer": rng.choice(np.array(REFERRERS, dtype=object), n, p=REFERRER_WEIGHTS),
+        "bounce_rate": pages == 1,
+        "country": COUNTRIES[locations],
+        "city": CITIES[locations],
+    })
+
+
+def generate_products(rng: np.random.Generator, start: int, n: int, reference: np.datetime64) -> pd.DataFrame:
+    """
+    Catalogue produits : prix et coûts cohérents (marge positive), stock, notes.
+    """
+    category = rng.choice(CATEGORIES, n)
+    brand = rng.choice(BRANDS, n)
+    price = np.round(rng.lognormal(3.6, 0.8, n), 2)
+    return pd.DataFrame({
+        "product_id": _ids("p", start, n),
+        "name": pd.Series(brand) + " " + pd.Series(category) + " " + pd.Series(np.arange(start, start + n)).astype(str),
+        "category": category,
+        "price": price,
+        "cost": np.round(price * rng.uniform(0.35, 0.8, n), 2),
+        "stock": rng.negative_binomial(2, 0.03, n),
+        "brand": brand,
+        "created_at": _timestamps(reference, -rng.integers(0, 730 * 86_400, n)),
+        "is_active": rng.random(n) < 0.9,
+        "rating": np.round(np.clip(rng.normal(4.0, 0.6, n), 0, 5), 1),
+        "review_count": rng.geometric(0.02, n) - 1,
+    })
+
+
+def generate_users(rng: np.random.Generator, start: int, n: int, reference: np.datetime64) -> pd.DataFrame:
+    """
+    Base utilisateurs : profil, inscription, commandes et dernière connexion.
+    """
+    index = pd.Series(np.arange(start, start + n)).astype(str)
+    first = pd.Series(rng.choice(FIRST_NAMES, n))
+    last = pd.Series(rng.choice(LAST_NAMES, n))
+    registered = rng.integers(30 * 86_400, 3 * 365 * 86_400, n)
+    orders = rng.poisson(3, n)
+    locations = rng.choice(len(LOCATIONS), n, p=LOCATION_WEIGHTS)
+    return pd.DataFrame({
+        "user_id": "u" + index,
+        "email": first.str.lower() + "." + last.str.lower() + index + "@" + pd.Series(rng.choice(EMAIL_DOMAINS, n)),
+        "first_name": first,
+        "last_name": last,
+        "age": np.clip(rng.normal(38, 12, n), 16, 90).astype(np.int64),
+        "gender": rng.choice(["M", "F", "O"], n, p=[0.48, 0.48, 0.04]),
+        "country": COUNTRIES[locations],
+        "city": CITIES[locations],
+        "registration_date": _timestamps(reference, -registered),
+        "is_premium": rng.random(n) < 0.15,
+        "total_orders": orders,
+        "total_spent": np.round(orders * rng.gamma(2.0, 40.0, n), 2),
+        "last_login": _timestamps(reference, -(registered * rng.random(n)).astype(np.int64)),
+    })
+
+
+# ===============================
+# 💣 Valeurs nulles et violations contrôlées
+# ===============================
+
+def _set_invalid(df: pd.DataFrame, col: str, rows: np.ndarray, value) -> None:
+    if isinstance(value, str) and df[col].dtype != object:
+        df[col] = df[col].astype(object)  # Valeur texte dans une colonne typée
+    df.loc[df.index[rows], col] = value
+
+
+# Violations par source : (colonne, valeur invalide) — règles de business_rules.yaml,
+# valeurs non conformes au type du schéma et incohérences temporelles
+VIOLATIONS = {
+    "logs": [("status_code", 999), ("response_time_ms", 25_000.0), ("method", "PATCH"),
+             ("country_code", ""), ("status_code", "n/a"), ("timestamp", "not-a-date")],
+    "sessions": [("pages_visited", -1), ("products_added_to_cart", -2), ("total_spent", -10.0),
+                 ("conversion", "maybe"), ("end_time", "long"), ("pages_visited", "n/a")],
+    "products": [("price", -5.0), ("cost", -1.0), ("stock", -3), ("rating", 7.5),
+                 ("review_count", -1), ("price", "n/a")],
+    "users": [("age", 150), ("age", 9), ("gender", "X"), ("total_orders", -1),
+              ("email", "admin@example.com"), ("total_spent", "n/a")],
+}
+
+
+def inject_violations(df: pd.DataFrame, source: str, rate: float, rng: np.random.Generator) -> int:
+    """
+    Rend invalide une fraction `rate` des lignes (une violation par ligne, types de
+    violations répartis uniformément). Renvoie le nombre de lignes touchées.
+    """
+    n_rows = int(round(len(df) * rate))
+    if n_rows == 0:
+        return 0
+    rows = rng.choice(len(df), n_rows, replace=False)
+    kinds = rng.integers(0, len(VIOLATIONS[source]), n_rows)
+    for k, (col, value) in enumerate(VIOLATIONS[source]):
+        selected = rows[kinds == k]
+        if not len(selected):
+            continue
+        if value == "long":
+            # Session de plus de 6 heures (duration_min > 360)
+            ends = pd.to_datetime(df[col].iloc[selected]) + pd.Timedelta(hours=9)
+            df.loc[df.index[selected], col] = ends.dt.strftime("%Y-%m-%d %H:%M:%S").to_numpy()
+        else:
+            _set_invalid(df, col, selected, value)
+    return n_rows
+
+
+def inject_nulls(df: pd.DataFrame, rate: float, rng: np.random.Generator, keep: List[str]) -> int:
+    """
+    Remplace une fraction `rate` des valeurs de chaque colonne (hors `keep`) par des
+    nulls, en gardant des entiers et booléens nullables. Renvoie le nombre de nulls.
+    """
+    if rate <= 0:
+        return 0
+    total = 0
+    for col in df.columns:
+        if col in keep:
+            continue
+        mask = rng.random(len(df)) < rate
+        if not mask.any():
+            continue
+        s = df[col]
+        if pd.api.types.is_bool_dtype(s):
+            s = s.astype("boolean")
+        elif pd.api.types.is_integer_dtype(s):
+            s = s.astype("Int64")
+        elif s.dtype != object and not pd.api.types.is_float_dtype(s):
+            s = s.astype(object)
+        df[col] = s.mask(mask)
+        total += int(mask.sum())
+    return total
+
+
+# ===============================
+# 💾 Écriture par chunks (une tâche = un fichier)
+# ===============================
+
+def _write_chunk(df: pd.DataFrame, f, fmt: str, first: bool) -> None:
+    if fmt == "json":
+        text = df.to_json(orient="records", lines=True, force_ascii=False)
+        f.write(text if text.endswith("\n") else text + "\n")
+    else:
+        df.to_csv(f, index=False, header=first)
+
+
+def generate_file(task: dict) -> dict:
+    """
+    Génère un fichier (une source, éventuellement une journée) chunk par chunk.
+    """
+    source, path, n, start = task["source"], task["path"], task["rows"], task["start"]
+    fmt = "json" if source == "logs" else "csv"
+    counts = {"nulls": 0, "violations": 0}
+    opener = gzip.open if path.endswith(".gz") else open
+    day_start = np.datetime64(task["day"]) if task.get("day") else np.datetime64(task["reference"])
+
+    with opener(path, "wt", encoding="utf-8", newline="") as f:
+        for k, offset in enumerate(range(0, n, CHUNK_ROWS)):
+            size = min(CHUNK_ROWS, n - offset)
+            rng = np.random.default_rng([task["seed"], SOURCE_CODES[source], task.get("day_index", 0), k])
+            if source == "logs":
+                df = generate_logs(rng, start + offset, size, day_start, task["sessions_range"],
+                                   task["n_users"], task["n_products"])
+            elif source == "sessions":
+                df = generate_sessions(rng, start + offset, size, day_start, task["n_users"])
+            elif source == "products":
+                df = generate_products(rng, start + offset, size, day_start)
+            else:
+                df = generate_users(rng, start + offset, size, day_start)
+            counts["violations"] += inject_violations(df, source, task["violation_rate"], rng)
+            counts["nulls"] += inject_nulls(df, task["null_rate"], rng, keep=[ID_COLUMNS[source]])
+            _write_chunk(df, f, fmt, first=(k == 0))
+    return {"source": source, "path": path, "rows": n, **counts}
+
+
+def split_rows(rows: int) -> Dict[str, int]:
+    """
+    Répartit un volume total entre logs, sessions, utilisateurs et produits.
+    """
+    counts = {source: max(1, int(rows * share)) for source, share in SOURCE_SHARES.items()}
+    counts["logs"] += rows - sum(counts.values())
+    return counts
+
+
+def plan_tasks(output_dir: str, counts: Dict[str, int], days: int, start_date: str, seed: int,
+               null_rate: float, violation_rate: float, logs_format: str) -> List[dict]:
+    """
+    Une tâche par fichier : une journée de logs, une journée de sessions, les utilisateurs, les produits.
+    """
+    common = {"seed": seed, "null_rate": null_rate, "violation_rate": violation_rate,
+              "n_users": counts["users"], "n_products": counts["products"],
+              "reference": str(np.datetime64(start_date) + np.timedelta64(days, "D"))}
+    dates = [np.datetime64(start_date) + np.timedelta64(d, "D") for d in range(days)]
+    logs_dir = os.path.join(output_dir, "_api_logs") if logs_format == "zip" else output_dir
+    sessions_dir = os.path.join(output_dir, "user_sessions")
+    os.makedirs(logs_dir, exist_ok=True)
+    os.makedirs(sessions_dir, exist_ok=True)
+
+    def per_day(total: int) -> List[int]:
+        return [total // days + (1 if d < total % days else 0) for d in range(days)]
+
+    tasks = []
+    log_rows, session_rows = per_day(counts["logs"]), per_day(counts["sessions"])
+    log_start = session_start = 0
+    for d, date in enumerate(dates):
+        stamp = str(date).replace("-", "")
+        day = {"day": str(date), "day_index": d}
+        if not session_rows[d] and not log_rows[d]:
+            continue
+        tasks.append({**common, **day, "source": "sessions", "rows": session_rows[d], "start": session_start,
+                      "path": os.path.join(sessions_dir, f"sessions_{stamp}.csv")})
+        log_ext = ".json.gz" if logs_format == "zip" else ".json"
+        tasks.append({**common, **day, "source": "logs", "rows": log_rows[d], "start": log_start,
+                      "sessions_range": (session_start, session_rows[d]),
+                      "path": os.path.join(logs_dir, f"api_logs_{stamp}{log_ext}")})
+        log_start += log_rows[d]
+        session_start += session_rows[d]
+    tasks.append({**common, "source": "products", "rows": counts["products"], "start": 0,
+                  "path": os.path.join(output_dir, "products_catalog.csv")})
+    tasks.append({**common, "source": "users", "rows": counts["users"], "start": 0,
+                  "path": os.path.join(output_dir, "users_database.csv")})
+    # Les plus gros fichiers d'abord (meilleur équilibrage du pool), fichiers vides exclus
+    return sorted((t for t in tasks if t["rows"] > 0), key=lambda t: -t["rows"])
+
+
+def pack_logs_archive(output_dir: str, members: List[str]) -> str:
+    """
+    Regroupe les journées de logs .json.gz dans api_logs.zip (membres stockés tels quels,
+    déjà compressés), comme l'archive brute attendue par data_discovery.sh.
+    """
+    zip_path = os.path.join(output_dir, "api_logs.zip")
+    with zipfile.ZipFile(zip_path, "w", compression=zipfile.ZIP_STORED, allowZip64=True) as zf:
+        for member in sorted(members):
+            zf.write(member, arcname=os.path.basename(member))
+            os.remove(member)
+    shutil.rmtree(os.path.join(output_dir, "_api_logs"), ignore_errors=True)
+    return zip_path
+
+
+def generate_dataset(output_dir: str, rows: int, days: int = 7, start_date: str = "2025-07-20",
+                     null_rate: float = 0.01, violation_rate: float = 0.005, seed: int = 42,
+                     workers: int = 1, logs_format: str = "zip",
+                     counts: Optional[Dict[str, int]] = None) -> dict:
+    """
+    Génère un jeu de données complet dans output_dir (même organisation que data/raw) et
+    son descripteur dataset.json (volumes, taux, fichiers). Déterministe pour une graine donnée.
+
+    Args:
+        output_dir (str): Dossier de sortie.
+        rows (int): Volume total, réparti entre les sources (SOURCE_SHARES).
+        days (int): Nombre de journées de logs et de sessions.
+        start_date (str): Première journée (AAAA-MM-JJ).
+        null_rate (float): Part des valeurs nulles par colonne (hors identifiants).
+        violation_rate (float): Part des lignes violant une règle métier ou le schéma.
+        seed (int): Graine aléatoire.
+        workers (int): Fichiers générés en parallèle.
+        logs_format (str): "zip" (api_logs.zip de .json.gz) ou "json" (fichiers à plat).
+        counts (dict): Volumes explicites par source (remplacent la répartition de `rows`).
+
+    Returns:
+        dict: Descripteur du jeu de données.
+    """
+    counts = {**split_rows(rows), **(counts or {})}
+    os.makedirs(output_dir, exist_ok=True)
+    tasks = plan_tasks(output_dir, counts, days, start_date, seed, null_rate, violation_rate, logs_format)
+
+    started = datetime.now()
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(generate_file, tasks))
+    else:
+        results = [generate_file(task) for task in tasks]
+
+    if logs_format == "zip":
+        zip_path = pack_logs_archive(output_dir, [r["path"] for r in results if r["source"] == "logs"])
+        for r in results:
+            if r["source"] == "logs":
+                r["path"] = os.path.join(zip_path, os.path.basename(r["path"]))
+
+    descriptor = {
+        "generated_at": datetime.now(timezone.utc).isoformat().replace("+00:00", "Z"),
+        "duration_s": round((datetime.now() - started).total_seconds(), 3),
+        "seed": seed,
+        "start_date": start_date,
+        "days": days,
+        "null_rate": null_rate,
+        "violation_rate": violation_rate,
+        "logs_format": logs_format,
+        "rows": counts,
+        "files": [{**r, "path": os.path.relpath(r["path"], output_dir)}
+                  for r in sorted(results, key=lambda r: r["path"])],
+    }
+    with open(os.path.join(output_dir, DESCRIPTOR_NAME), "w", encoding="utf-8") as f:
+        json.dump(descriptor, f, indent=4, ensure_ascii=False)
+    return descriptor
+
+
+def load_descriptor(dataset_dir: str) -> Optional[dict]:
+    """
+    Descripteur dataset.json d'un jeu de données généré (None s'il est absent).
+    """
+    path = os.path.join(dataset_dir, DESCRIPTOR_NAME)
+    if not os.path.exists(path):
+        return None
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def check_schema_coverage() -> None:
+    """
+    Vérifie que les générateurs produisent toutes les colonnes requises par data_schemas.json.
+    """
+    rng = np.random.default_rng(0)
+    day = np.datetime64("2025-07-20")
+    samples = {
+        "logs": generate_logs(rng, 0, 10, day, (0, 5), 5, 5),
+        "sessions": generate_sessions(rng, 0, 10, day, 5),
+        "products": generate_products(rng, 0, 10, day),
+        "users": generate_users(rng, 0, 10, day),
+    }
+    for source, df in samples.items():
+        missing = set(schema_columns(source)) - set(df.columns)
+        if missing:
+            raise ValueError(f"❌ Colonnes du schéma {source} non générées : {sorted(missing)}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Génération de données synthétiques pour les tests de charge")
+    parser.add_argument('--rows', type=int, default=1_000_000,
+                        help="Volume total de lignes, réparti entre les sources (1M à 100M)")
+    parser.add_argument('--output', help="Dossier de sortie (défaut : data/benchmarks/datasets/rows_<N>)")
+    parser.add_argument('--days', type=int, default=7, help="Journées de logs et de sessions")
+    parser.add_argument('--start-date', default="2025-07-20", help="Première journée (AAAA-MM-JJ)")
+    parser.add_argument('--null-rate', type=float, default=0.01, help="Part de valeurs nulles par colonne")
+    parser.add_argument('--violation-rate', type=float, default=0.005, help="Part de lignes invalides")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--workers', type=int, default=load_pipeline_config().get("data_workers", 1),
+                        help="Fichiers générés en parallèle")
+    parser.add_argument('--logs-format', choices=["zip", "json"], default="zip",
+                        help="api_logs.zip de .json.gz (comme data/raw) ou fichiers JSONL à plat")
+    for source in SOURCE_SHARES:
+        parser.add_argument(f'--{source}-rows', type=int, help=f"Volume explicite de {source}")
+    args = parser.parse_args()
+
+    for name, rate in (("--null-rate", args.null_rate), ("--violation-rate", args.violation_rate)):
+        if not 0 <= rate < 1:
+            parser.error(f"{name} doit être compris entre 0 et 1")
+    check_schema_coverage()
+
+    counts = {s: getattr(args, f"{s}_rows") for s in SOURCE_SHARES if getattr(args, f"{s}_rows")}
+    output_dir = args.output or os.path.join(DATASETS_DIR, f"rows_{args.rows}")
+    print(f"🧪 Génération de {args.rows} lignes dans {output_dir}...")
+    descriptor = generate_dataset(output_dir, args.rows, days=args.days, start_date=args.start_date,
+                                  null_rate=args.null_rate, violation_rate=args.violation_rate,
+                                  seed=args.seed, workers=max(1, args.workers),
+                                  logs_format=args.logs_format, counts=counts)
+    for source, n in descriptor["rows"].items():
+        print(f"   - {source} : {n} lignes")
+    print(f"✅ Jeu de données généré en {descriptor['duration_s']} s : {output_dir}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,48 +1,54 @@
 #!/usr/bin/env python3
-# Analyse des rapports qualité et simulation d'alerte email enrichie
+# Analyse des rapports qualité (historique indexé) et simulation d'alerte email enrichie
 
 
 import os
 import sys
-import json
-from datetime import datetime
+import argparse
+from datetime import datetime, timezone
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from monitoring.quality_store import current_run_id, load_reports, since_hours
 
 QUALITY_DIR = os.path.join(os.path.dirname(__file__), "../data/quality")
 ALERT_FILE = os.path.join(QUALITY_DIR, "quality_alert.txt")
 EMAIL_DEST = "tanouti.jaouad@labom2iformation.fr"
 
-failed_reports = []
+parser = argparse.ArgumentParser(description="Alerte qualité sur le run courant ou une fenêtre de temps")
+parser.add_argument('--run-id', help="Run à analyser (défaut : PIPELINE_RUN_ID ou dernier run)")
+parser.add_argument('--since-hours', type=float, help="Analyser les rapports des N dernières heures au lieu d'un run")
+args = parser.parse_args()
 
-# Parcours des fichiers de validation
-for file in os.listdir(QUALITY_DIR):
-    if file.startswith("validation_report_") and file.endswith(".json"):
-        path = os.path.join(QUALITY_DIR, file)
-        with open(path, "r") as f:
-            try:
-                report = json.load(f)
-                if report.get("status") == "failed":
-                    failed_reports.append(report)
-            except:
-                continue
+# Rapports en échec du run (ou de la fenêtre) uniquement
+if args.since_hours is not None:
+    scope = f"{args.since_hours:g} dernières heures"
+    failed_reports = load_reports(since=since_hours(args.since_hours), status="failed")
+else:
+    run = args.run_id or current_run_id()
+    scope = f"run {run}"
+    failed_reports = load_reports(run=run, status="failed") if run else []
 
 # Génération d'une alerte si nécessaire
 if failed_reports:
+    os.makedirs(QUALITY_DIR, exist_ok=True)
     with open(ALERT_FILE, "w") as alert:
         alert.write("🚨 ALERTE QUALITÉ - ÉCHEC DÉTECTÉ\n")
-        alert.write(f"Date : {datetime.utcnow().isoformat()}Z\n")
+        alert.write(f"Date : {datetime.now(timezone.utc).isoformat().replace('+00:00', 'Z')}\n")
+        alert.write(f"Périmètre : {scope}\n")
         alert.write(f"Destinataire simulé : {EMAIL_DEST}\n\n")
         for r in failed_reports:
-            alert.write(f"❌ {r['filename']}\n")
+            alert.write(f"❌ {r['filename']} (validé le {r['validated_at']})\n")
             alert.write(f"   - Complétude : {r['completeness']}% (Seuil : {r['threshold']}%)\n")
             if r.get("errors"):
                 for err in r["errors"]:
                     alert.write(f"   - 📌 {err}\n")
             alert.write("\n")
-    
+
     print(f"📩 Alerte générée : {ALERT_FILE}")
 else:
-    print("✅ Tous les fichiers ont passé les contrôles qualité.")
+    print(f"✅ Tous les fichiers ont passé les contrôles qualité ({scope}).")
 if failed_reports:
     sys.exit(1)
 else:
-    sys.exit(0)
\ No newline at end of file
+    sys.exit(0)
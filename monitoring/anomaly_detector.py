@@ -0,0 +1,351 @@
+#!/usr/bin/env python3
+# 📉 Détection d'anomalies statistiques en une passe, chunk par chunk : par colonne numérique,
+# moments de Welford (moyenne, écart-type), médiane / MAD par sketch et taux de nulls,
+# comparés à une référence fusionnée des fichiers précédents de la même source (SQLite),
+# puis enregistrés pour mettre cette référence à jour.
+
+import os
+import sys
+import json
+import argparse
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+import yaml
+
+PIPELINE_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, PIPELINE_ROOT)
+
+from monitoring.quality_store import load_column_stats, record_column_stats
+from transformations.data_reader import iter_source, read_source, schema_columns
+from transformations.data_sketches import (QUANTILES, bucket_values, decode_sketches, empty_sketch,
+                                           encode_sketches, merge_sketches, quantile_sketch)
+from transformations.data_zip import source_extension
+
+THRESHOLDS_PATH = os.path.join(PIPELINE_ROOT, "config", "quality_thresholds.yaml")
+
+NUMERIC_TYPES = ("integer", "float")
+MAD_SCALE = 1.4826  # MAD → écart-type (loi normale)
+SIGN_GROUPS = np.arange(2)  # Sketch signé : groupe 0 = valeurs >= 0, groupe 1 = |valeurs < 0|
+
+DEFAULT_SETTINGS = {
+    "baseline_files": 30,       # Fichiers précédents fusionnés dans la référence
+    "min_baseline_files": 3,    # En deçà, seules les limites absolues sont contrôlées
+    "median_shift": 3.5,        # |médiane - médiane de référence| en MAD normalisées
+    "outlier_mad": 6.0,         # Valeur aberrante : au-delà de médiane ± k MAD normalisées
+    "max_outlier_rate": 0.01,   # Excès toléré de valeurs aberrantes par rapport à la référence
+    "std_ratio": 3.0,           # Écart-type hors [référence / r, référence * r]
+    "null_rate_drift": 0.05,    # Écart absolu du taux de nulls
+    "limits": {},               # Valeurs maximales absolues par colonne
+}
+
+
+def anomaly_settings(thresholds: dict) -> dict:
+    """
+    Paramètres de détection (section anomalies de quality_thresholds.yaml, défauts sinon).
+    """
+    return dict(DEFAULT_SETTINGS, **(thresholds.get("anomalies") or {}))
+
+
+# ===============================
+# 🧮 Statistiques fusionnables
+# ===============================
+
+def combine_moments(a: tuple, b: tuple) -> tuple:
+    """
+    Fusion de deux triplets (n, moyenne, M2) de Welford (formule de Chan).
+    """
+    n_a, mean_a, m2_a = a
+    n_b, mean_b, m2_b = b
+    n = n_a + n_b
+    if n == 0:
+        return 0, 0.0, 0.0
+    delta = mean_b - mean_a
+    return n, mean_a + delta * n_b / n, m2_a + m2_b + delta * delta * n_a * n_b / n
+
+
+def signed_sketch(x: np.ndarray) -> pd.DataFrame:
+    """
+    Histogramme logarithmique de valeurs signées (les négatives en valeur absolue, groupe 1).
+    """
+    return quantile_sketch(pd.Series(np.abs(x)), (x < 0).astype(np.int64))
+
+
+def merge_signed(sketches: List[pd.DataFrame]) -> pd.DataFrame:
+    return merge_sketches(sketches, [SIGN_GROUPS] * len(sketches), QUANTILES)
+
+
+def _weighted_median(values: np.ndarray, counts: np.ndarray) -> float:
+    order = np.argsort(values, kind="stable")
+    cumulative = np.cumsum(counts[order])
+    position = np.searchsorted(cumulative, (cumulative[-1] - 1) // 2, side="right")
+    return float(values[order][position])
+
+
+def _signed_values(sketch: pd.DataFrame) -> tuple:
+    values = bucket_values(sketch["bin"].to_numpy()) * np.where(sketch["group"].to_numpy() == 1, -1.0, 1.0)
+    return values, sketch["value"].to_numpy()
+
+
+def median_mad(sketch: pd.DataFrame) -> tuple:
+    """
+    Médiane et MAD (médiane des écarts absolus à la médiane) lues sur un sketch signé.
+    """
+    if sketch.empty:
+        return np.nan, np.nan
+    values, counts = _signed_values(sketch)
+    median = _weighted_median(values, counts)
+    return median, _weighted_median(np.abs(values - median), counts)
+
+
+def outside_rate(sketch: pd.DataFrame, low: float, high: float) -> float:
+    """
+    Part des valeurs d'un sketch signé hors de [low, high].
+    """
+    if sketch.empty:
+        return 0.0
+    values, counts = _signed_values(sketch)
+    return float(counts[(values < low) | (values > high)].sum() / counts.sum())
+
+
+def _std(n: int, m2: float) -> float:
+    return float(np.sqrt(m2 / (n - 1))) if n > 1 else np.nan
+
+
+def _num(value, digits: int = 4):
+    """
+    Valeur JSON : flottant arrondi, None pour NaN.
+    """
+    return None if value is None or pd.isna(value) else round(float(value), digits)
+
+
+def _new_state() -> dict:
+    return {"rows": 0, "nulls": 0, "n": 0, "mean": 0.0, "m2": 0.0, "min": np.nan, "max": np.nan,
+            "sketch": empty_sketch(), "outliers": 0, "over_limit": 0}
+
+
+def load_baseline(source: str, filename: str, max_files: int) -> Dict[str, dict]:
+    """
+    Référence par colonne : fusion des statistiques des `max_files` derniers fichiers
+    de la source (runs précédents, hors fichier courant).
+    """
+    baseline = {}
+    for row in load_column_stats(source, exclude=filename, max_files=max_files):
+        ref = baseline.setdefault(row["column_name"], dict(_new_state(), files=0))
+        ref["files"] += 1
+        ref["rows"] += row["rows"]
+        ref["nulls"] += row["nulls"]
+        if row["n"]:
+            ref["n"], ref["mean"], ref["m2"] = combine_moments(
+                (ref["n"], ref["mean"], ref["m2"]), (row["n"], row["mean"], row["m2"]))
+            ref["min"] = np.fmin(ref["min"], row["min"])
+            ref["max"] = np.fmax(ref["max"], row["max"])
+        try:
+            sketch = decode_sketches(pd.Series((row["sketch"] or ",").split(",")), QUANTILES)
+        except ValueError:
+            continue  # Sketch construit avec une autre précision : ignoré
+        ref["sketch"] = merge_signed([ref["sketch"], sketch])
+    for ref in baseline.values():
+        ref["median"], ref["mad"] = median_mad(ref["sketch"])
+        ref["std"] = _std(ref["n"], ref["m2"])
+        ref["null_rate"] = ref["nulls"] / ref["rows"] if ref["rows"] else np.nan
+    return baseline
+
+
+# ===============================
+# 📉 Détecteur
+# ===============================
+
+class AnomalyDetector:
+    """
+    Détecteur d'anomalies d'un fichier : update() sur chaque chunk (ou sur le fichier
+    entier), puis finish() compare à la référence et l'enrichit de ce fichier.
+
+    Usage :
+        detector = AnomalyDetector("sessions", "sessions_20250720.csv", settings)
+        for chunk in chunks:
+            detector.update(chunk)
+        anomalies = detector.finish()
+    """
+
+    def __init__(self, source: str, filename: str, settings: Optional[dict] = None,
+                 baseline: Optional[Dict[str, dict]] = None):
+        self.source = source
+        self.filename = filename
+        self.settings = settings or dict(DEFAULT_SETTINGS)
+        numeric = [col for col, t in schema_columns(source).items() if t in NUMERIC_TYPES]
+        self.columns = numeric + [col for col in self.settings["limits"] if col not in numeric]
+        self.baseline = baseline if baseline is not None else load_baseline(
+            source, filename, self.settings["baseline_files"])
+        self.state: Dict[str, dict] = {}
+
+        # Bornes des valeurs aberrantes connues avant la lecture : comptées au fil des chunks
+        k = self.settings["outlier_mad"] * MAD_SCALE
+        self.bounds = {
+            col: (ref["median"] - k * ref["mad"], ref["median"] + k * ref["mad"])
+            for col, ref in self.baseline.items()
+            if self._has_baseline(col) and ref["mad"] > 0
+        }
+        # Part attendue hors bornes (queues naturelles des distributions asymétriques)
+        self.expected_outliers = {col: outside_rate(self.baseline[col]["sketch"], *b) for col, b in self.bounds.items()}
+
+    def _has_baseline(self, col: str) -> bool:
+        ref = self.baseline.get(col)
+        return ref is not None and ref["files"] >= self.settings["min_baseline_files"]
+
+    def update(self, chunk: pd.DataFrame) -> None:
+        """
+        Cumule les statistiques d'un chunk (valeurs non numériques comptées comme nulles
+        pour les moments, mais pas pour le taux de nulls).
+        """
+        for col in self.columns:
+            if col not in chunk.columns:
+                continue
+            state = self.state.setdefault(col, _new_state())
+            s = chunk[col]
+            state["rows"] += len(s)
+            state["nulls"] += int(s.isna().sum())
+            if not pd.api.types.is_numeric_dtype(s):
+                s = pd.to_numeric(s, errors="coerce")
+            x = s.to_numpy(np.float64, na_value=np.nan)
+            x = x[~np.isnan(x)]
+            if len(x) == 0:
+                continue
+            mean = x.mean()
+            state["n"], state["mean"], state["m2"] = combine_moments(
+                (state["n"], state["mean"], state["m2"]), (len(x), mean, float(((x - mean) ** 2).sum())))
+            state["min"] = np.fmin(state["min"], x.min())
+            state["max"] = np.fmax(state["max"], x.max())
+            state["sketch"] = merge_signed([state["sketch"], signed_sketch(x)])
+            limit = self.settings["limits"].get(col)
+            if limit is not None:
+                state["over_limit"] += int((x > limit).sum())
+            if col in self.bounds:
+                low, high = self.bounds[col]
+                state["outliers"] += int(((x < low) | (x > high)).sum())
+
+    def _compare(self, col: str, stats: dict) -> List[dict]:
+        """
+        Constats d'une colonne : limite absolue, puis écarts à la référence.
+        """
+        findings = []
+
+        def finding(check: str, value, expected, message: str) -> None:
+            findings.append({"column": col, "check": check, "value": value, "expected": expected, "message": message})
+
+        limit = self.settings["limits"].get(col)
+        if stats.get("over_limit"):
+            finding("limit", stats["max"], limit,
+                    f"{stats['over_limit']} valeurs > {limit} pour '{col}' (max : {stats['max']})")
+        if not self._has_baseline(col):
+            return findings
+
+        ref = self.baseline[col]
+        if stats["null_rate"] is not None and pd.notna(ref["null_rate"]) and abs(stats["null_rate"] - ref["null_rate"]) > self.settings["null_rate_drift"]:
+            finding("null_rate_drift", stats["null_rate"], _num(ref["null_rate"]),
+                    f"Dérive du taux de nulls pour '{col}' : {stats['null_rate']:.1%} (référence {ref['null_rate']:.1%})")
+        if stats["median"] is not None and ref["mad"] > 0:
+            shift = abs(stats["median"] - ref["median"]) / (MAD_SCALE * ref["mad"])
+            if shift > self.settings["median_shift"]:
+                finding("median_shift", stats["median"], _num(ref["median"]),
+                        f"Médiane décalée pour '{col}' : {stats['median']} (référence {_num(ref['median'])}, "
+                        f"{shift:.1f} MAD)")
+        if stats["std"] is not None and ref["std"] > 0:
+            ratio = stats["std"] / ref["std"]
+            r = self.settings["std_ratio"]
+            if ratio > r or ratio < 1 / r:
+                finding("std_ratio", stats["std"], _num(ref["std"]),
+                        f"Dispersion anormale pour '{col}' : écart-type {stats['std']} "
+                        f"(référence {_num(ref['std'])}, x{ratio:.2f})")
+        if col in self.bounds and stats["n"]:
+            rate, expected = stats["outliers"] / stats["n"], self.expected_outliers[col]
+            if rate - expected > self.settings["max_outlier_rate"]:
+                low, high = self.bounds[col]
+                finding("outliers", stats["outliers"], _num(expected),
+                        f"{stats['outliers']} valeurs aberrantes ({rate:.2%}, référence {expected:.2%}) "
+                        f"pour '{col}' hors [{_num(low)}, {_num(high)}]")
+        return findings
+
+    def finish(self, update_baseline: bool = True) -> dict:
+        """
+        Statistiques par colonne et constats du fichier ; enregistre ensuite ses
+        statistiques dans la référence de la source.
+        """
+        columns, findings, records = {}, [], []
+        for col, state in self.state.items():
+            median, mad = median_mad(state["sketch"])
+            stats = {
+                "rows": state["rows"],
+                "null_rate": _num(state["nulls"] / state["rows"] if state["rows"] else np.nan),
+                "mean": _num(state["mean"] if state["n"] else np.nan),
+                "std": _num(_std(state["n"], state["m2"])),
+                "min": _num(state["min"]),
+                "max": _num(state["max"]),
+                "median": _num(median),
+                "mad": _num(mad),
+                "n": state["n"],
+            }
+            if col in self.settings["limits"]:
+                stats["over_limit"] = state["over_limit"]
+            if col in self.bounds:
+                stats["outliers"] = state["outliers"]
+            columns[col] = stats
+            findings.extend(self._compare(col, stats))
+            records.append({
+                "column_name": col, "rows": state["rows"], "nulls": state["nulls"], "n": state["n"],
+                "mean": float(state["mean"]), "m2": float(state["m2"]),
+                "min": _num(state["min"], 12), "max": _num(state["max"], 12),
+                "sketch": ",".join(encode_sketches(state["sketch"], len(SIGN_GROUPS), QUANTILES)),
+            })
+
+        if update_baseline and records:
+            record_column_stats(self.source, self.filename, records)
+        baseline_files = max((ref["files"] for ref in self.baseline.values()), default=0)
+        return {"baseline_files": baseline_files, "columns": columns, "findings": findings}
+
+
+def detect_file(input_path: str, source: str, settings: Optional[dict] = None, chunksize: int = 100_000,
+                update_baseline: bool = True) -> dict:
+    """
+    Détection sur un fichier lu par chunks (CSV / JSONL, y compris .gz et membres d'archive),
+    sans jamais le charger en entier ; les XLSX sont lus d'un bloc.
+    """
+    detector = AnomalyDetector(source, os.path.basename(input_path), settings)
+    if source_extension(input_path) in (".csv", ".json"):
+        chunks = iter_source(input_path, source, chunksize, coerce=False, categorical=False)
+    else:
+        chunks = [read_source(input_path, source, coerce=False, categorical=False)]
+    for chunk in chunks:
+        detector.update(chunk)
+    return detector.finish(update_baseline)
+
+
+# ===============================
+# 🌟 CLI
+# ===============================
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Détection d'anomalies statistiques (une passe, par chunks)")
+    parser.add_argument('--input', required=True, help="Fichier à analyser")
+    parser.add_argument('--source', required=True, help="Type de données : logs, sessions, products, users")
+    parser.add_argument('--chunksize', type=int, default=100_000, help="Taille des chunks (lignes)")
+    parser.add_argument('--no-update', action='store_true', help="Ne pas enrichir la référence avec ce fichier")
+    args = parser.parse_args()
+
+    with open(THRESHOLDS_PATH) as f:
+        settings = anomaly_settings(yaml.safe_load(f) or {})
+    try:
+        result = detect_file(args.input, args.source, settings, args.chunksize, not args.no_update)
+    except Exception as e:
+        print(f"❌ Erreur de lecture : {e}")
+        sys.exit(1)
+
+    print(json.dumps(result, indent=4, ensure_ascii=False))
+    for item in result["findings"]:
+        print(f"⚠️  {item['message']}")
+    sys.exit(1 if result["findings"] else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,31 +1,62 @@
 #!/usr/bin/env python3
-# Génère un tableau HTML à partir des rapports qualité JSON
+# Génère un tableau HTML à partir de l'historique des rapports qualité, des profils de colonnes
+# en cache et des métriques de ressources (sans relire les données)
 
 import os
-import json
+import sys
+import argparse
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from monitoring.data_metrics import latest_run, load_metrics
+from monitoring.quality_store import current_run_id, daily_trend, failing_files, load_reports, run_trend, since_hours
+from transformations.data_profile import load_profile_by_key
 
-QUALITY_DIR = os.path.join(os.path.dirname(__file__), "../data/quality")
 OUTPUT_FILE = os.path.join(os.path.dirname(__file__), "../data/quality/dashboard.html")
 
+parser = argparse.ArgumentParser(description="Dashboard HTML qualité et ressources")
+parser.add_argument('--run-id', help="Run affiché en détail (défaut : PIPELINE_RUN_ID ou dernier run)")
+parser.add_argument('--days', type=int, default=30, help="Fenêtre des tendances quotidiennes (jours)")
+parser.add_argument('--runs', type=int, default=20, help="Nombre de runs dans la tendance par run")
+args = parser.parse_args()
+
 os.makedirs(os.path.dirname(OUTPUT_FILE), exist_ok=True)
 
-rows = []
-
-for file in os.listdir(QUALITY_DIR):
-    if file.startswith("validation_report_") and file.endswith(".json"):
-        path = os.path.join(QUALITY_DIR, file)
-        with open(path) as f:
-            try:
-                report = json.load(f)
-                rows.append({
-                    "filename": report.get("filename", ""),
-                    "completeness": report.get("completeness", 0),
-                    "threshold": report.get("threshold", 0),
-                    "status": report.get("status", "unknown"),
-                    "errors": report.get("errors", [])
-                })
-            except:
-                continue
+# Rapports du run courant uniquement ; tendances agrégées en SQL sur la fenêtre
+quality_run = args.run_id or current_run_id()
+rows = load_reports(run=quality_run) if quality_run else []
+window_start = since_hours(24 * args.days)
+daily = daily_trend(window_start)
+runs = run_trend(args.runs)
+failing = failing_files(window_start)
+
+# Profils de colonnes (cache par hash de contenu) des fichiers validés dans le run
+profiles = {}
+for r in rows:
+    key = (r.get("profile") or {}).get("content_hash")
+    file_profile = load_profile_by_key(r.get("source"), key) if key and key not in profiles else None
+    if file_profile is not None:
+        profiles[key] = (r["filename"], file_profile)
+
+
+def pass_rate_cell(nb_passed: int, nb_reports: int) -> str:
+    """
+    Cellule HTML du taux de réussite avec une barre proportionnelle.
+    """
+    rate = 100 * nb_passed / nb_reports if nb_reports else 0
+    return (f"<td><div class='bar'><span style='width:{rate:.0f}%'></span></div> "
+            f"{rate:.1f}% ({nb_passed}/{nb_reports})</td>")
+
+
+def completeness_cell(value) -> str:
+    return f"<td>{value:.2f}</td>" if value is not None else "<td></td>"
+
+
+# Métriques de ressources du dernier run : étapes puis tâches de chaque étape
+metrics = latest_run(load_metrics())
+metrics.sort(key=lambda r: (r["stage"], r["level"] != "stage", r["timestamp"]))
+stage_walls = [r["wall_s"] for r in metrics if r["level"] == "stage"]
+slowest_wall = max(stage_walls) if stage_walls else None
 
 # Construction du tableau HTML
 html = """<!DOCTYPE html>
@@ -46,11 +77,18 @@ html = """<!DOCTYPE html>
         .passed { background-color: #d4edda; }
         .failed { background-color: #f8d7da; }
         .error-list { color: #a94442; font-size: 0.9em; margin: 0; padding-left: 15px; }
+        .stage { font-weight: bold; }
+        .bottleneck { background-color: #fff3cd; }
+        .task td:first-child { padding-left: 25px; }
+        .bar { display: inline-block; width: 120px; height: 10px; background: #f8d7da; vertical-align: middle; }
+        .bar span { display: block; height: 100%; background: #28a745; }
     </style>
 </head>
 <body>
     <h1>📊 Dashboard de Qualité des Données</h1>
-    <table>
+"""
+html += f"    <p>Run : {quality_run or 'aucun rapport enregistré'}</p>\n"
+html += """    <table>
         <thead>
             <tr>
                 <th>Fichier</th>
@@ -75,7 +113,166 @@ for r in rows:
 
 html += """        </tbody>
     </table>
-</body>
+"""
+
+# 📈 Tendances : par jour et par source, par run, fichiers les plus souvent en échec
+if daily:
+    html += f"""
+    <h1>📈 Tendance quotidienne ({args.days} derniers jours)</h1>
+    <table>
+        <thead>
+            <tr>
+                <th>Jour</th>
+                <th>Source</th>
+                <th>Taux de réussite</th>
+                <th>Complétude moyenne (%)</th>
+                <th>Lignes en échec</th>
+            </tr>
+        </thead>
+        <tbody>
+"""
+    for d in daily:
+        html += "<tr>"
+        html += f"<td>{d['day']}</td>"
+        html += f"<td>{d['source']}</td>"
+        html += pass_rate_cell(d["nb_passed"], d["nb_reports"])
+        html += completeness_cell(d["avg_completeness"])
+        html += f"<td>{d['failed_rows']}</td>"
+        html += "</tr>"
+    html += """        </tbody>
+    </table>
+"""
+
+if runs:
+    html += f"""
+    <h1>🔁 Derniers runs ({len(runs)})</h1>
+    <table>
+        <thead>
+            <tr>
+                <th>Run</th>
+                <th>Début</th>
+                <th>Taux de réussite</th>
+                <th>Complétude moyenne (%)</th>
+            </tr>
+        </thead>
+        <tbody>
+"""
+    for r in runs:
+        html += f"<tr class='{'stage' if r['run_id'] == quality_run else ''}'>"
+        html += f"<td>{r['run_id']}</td>"
+        html += f"<td>{r['started_at']}</td>"
+        html += pass_rate_cell(r["nb_passed"], r["nb_reports"])
+        html += completeness_cell(r["avg_completeness"])
+        html += "</tr>"
+    html += """        </tbody>
+    </table>
+"""
+
+if failing:
+    html += f"""
+    <h1>🚩 Fichiers le plus souvent en échec ({args.days} derniers jours)</h1>
+    <table>
+        <thead>
+            <tr>
+                <th>Fichier</th>
+                <th>Échecs</th>
+                <th>Validations</th>
+                <th>Dernier échec</th>
+            </tr>
+        </thead>
+        <tbody>
+"""
+    for entry in failing:
+        html += "<tr class='failed'>"
+        html += f"<td>{entry['filename']}</td>"
+        html += f"<td>{entry['nb_failed']}</td>"
+        html += f"<td>{entry['nb_reports']}</td>"
+        html += f"<td>{entry['last_failed_at']}</td>"
+        html += "</tr>"
+    html += """        </tbody>
+    </table>
+"""
+
+if profiles:
+    html += """
+    <h1>🧬 Profils de colonnes (run courant)</h1>
+    <table>
+        <thead>
+            <tr>
+                <th>Fichier / colonne</th>
+                <th>Type</th>
+                <th>Conforme</th>
+                <th>Nulls (%)</th>
+                <th>Distinctes (≈)</th>
+                <th>Min</th>
+                <th>Max</th>
+            </tr>
+        </thead>
+        <tbody>
+"""
+    for filename, file_profile in profiles.values():
+        html += f"<tr class='stage'><td colspan='7'>{filename} ({file_profile['rows']} lignes)</td></tr>"
+        for col, c in file_profile["columns"].items():
+            null_rate = 100 * c["nulls"] / file_profile["rows"] if file_profile["rows"] else 0
+            html += f"<tr class='{'task failed' if c['conforms'] is False else 'task'}'>"
+            html += f"<td>{col}</td>"
+            html += f"<td>{c['dtype']}</td>"
+            html += f"<td>{'' if c['conforms'] is None else ('oui' if c['conforms'] else 'non')}</td>"
+            html += f"<td>{null_rate:.2f}</td>"
+            html += f"<td>{c['distinct']}</td>"
+            html += f"<td>{'' if c['min'] is None else c['min']}</td>"
+            html += f"<td>{'' if c['max'] is None else c['max']}</td>"
+            html += "</tr>"
+    html += """        </tbody>
+    </table>
+"""
+
+# Tableau des ressources par étape / tâche (à côté de la qualité)
+if metrics:
+    html += f"""
+    <h1>⏱️ Ressources par étape (run {metrics[0]['run_id']})</h1>
+    <table>
+        <thead>
+            <tr>
+                <th>Étape / tâche</th>
+                <th>Statut</th>
+                <th>Durée (s)</th>
+                <th>CPU (s)</th>
+                <th>RSS max (Mo)</th>
+                <th>Lignes lues</th>
+                <th>Lignes produites</th>
+                <th>Lu (Mo)</th>
+                <th>Écrit (Mo)</th>
+                <th>Débit (lignes/s)</th>
+                <th>Débit (Mo/s)</th>
+            </tr>
+        </thead>
+        <tbody>
+"""
+    for m in metrics:
+        if m["level"] == "stage":
+            row_class = "stage bottleneck" if m["wall_s"] == slowest_wall else "stage"
+            name = m["stage"]
+        else:
+            row_class, name = "task", m["task"]
+        html += f"<tr class='{row_class}'>"
+        html += f"<td>{name}</td>"
+        html += f"<td>{m['status']}</td>"
+        html += f"<td>{m['wall_s']}</td>"
+        html += f"<td>{m['cpu_s']}</td>"
+        html += f"<td>{m['peak_rss_mb']}</td>"
+        html += f"<td>{m['rows_in']}</td>"
+        html += f"<td>{m['rows_out']}</td>"
+        html += f"<td>{m['bytes_read'] / 1024 ** 2:.2f}</td>"
+        html += f"<td>{m['bytes_written'] / 1024 ** 2:.2f}</td>"
+        html += f"<td>{m['rows_per_s'] if m['rows_per_s'] is not None else ''}</td>"
+        html += f"<td>{m['mb_per_s'] if m['mb_per_s'] is not None else ''}</td>"
+        html += "</tr>"
+    html += """        </tbody>
+    </table>
+"""
+
+html += """</body>
 </html>
 """
 
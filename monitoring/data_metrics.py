@@ -0,0 +1,326 @@
+#!/usr/bin/env python3
+# ⏱️ Métriques de ressources par étape du pipeline et par tâche de worker :
+# durée, temps CPU, RSS max, lignes en entrée/sortie, octets lus/écrits, débit.
+# Sorties : data/metrics/pipeline_metrics.jsonl (historique) et pipeline_metrics.prom
+# (format textfile Prometheus, dernier run). Bibliothèque standard uniquement.
+
+import os
+import sys
+import json
+import time
+import argparse
+import resource
+import subprocess
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Dict, Iterator, List, Optional, Tuple
+
+PIPELINE_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, PIPELINE_ROOT)
+
+# Compteurs de volume tenus par la couche de transformation (réexportés pour les processeurs)
+from transformations.data_counters import COUNTERS, add_counts, counting, run_counted  # noqa: E402,F401
+
+METRICS_DIR = os.path.join(PIPELINE_ROOT, "data", "metrics")
+METRICS_PATH = os.path.join(METRICS_DIR, "pipeline_metrics.jsonl")
+PROMETHEUS_PATH = os.path.join(METRICS_DIR, "pipeline_metrics.prom")
+
+RUN_ID_ENV = "PIPELINE_RUN_ID"  # Identifiant du run, partagé par toutes les étapes (pipeline_master.sh)
+STAGE_ENV = "PIPELINE_STAGE"    # Étape en cours, transmise aux tâches lancées par resource_monitor.sh
+METRICS_ENV = "PIPELINE_METRICS_PATH"  # Fichier de métriques de l'étape (--metrics), transmis de même
+
+
+def run_id() -> str:
+    """
+    Identifiant du run courant (variable PIPELINE_RUN_ID), fixé au premier appel à défaut.
+    """
+    if RUN_ID_ENV not in os.environ:
+        os.environ[RUN_ID_ENV] = datetime.now().strftime("%Y%m%d_%H%M%S")
+    return os.environ[RUN_ID_ENV]
+
+
+def metrics_path() -> str:
+    """
+    Fichier de métriques courant : celui de l'étape englobante (PIPELINE_METRICS_PATH), sinon le défaut.
+    """
+    return os.environ.get(METRICS_ENV) or METRICS_PATH
+
+
+# ===============================
+# 🧠 Mémoire et CPU
+# ===============================
+
+def _rusage_bytes(maxrss: int) -> int:
+    return maxrss if sys.platform == "darwin" else maxrss * 1024  # ko sous Linux
+
+
+def _reset_peak_rss() -> None:
+    """
+    Remet à zéro le pic de RSS du processus (Linux) : un worker persistant mesure ainsi
+    le pic de chaque tâche et non celui de toute sa vie.
+    """
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+    except OSError:
+        pass
+
+
+def _peak_rss() -> int:
+    """
+    Pic de RSS du processus en octets (VmHWM sous Linux, ru_maxrss ailleurs).
+    """
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return _rusage_bytes(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)
+
+
+def _children_usage() -> Tuple[float, int]:
+    """
+    (temps CPU, pic de RSS) des sous-processus terminés.
+    """
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return usage.ru_utime + usage.ru_stime, _rusage_bytes(usage.ru_maxrss)
+
+
+# ===============================
+# 📏 Mesure d'une tâche
+# ===============================
+
+def build_record(level: str, stage: str, task: Optional[str], status: str, wall: float, cpu: float,
+                 peak_rss: int, counts: Dict[str, int], input_path: Optional[str] = None) -> dict:
+    """
+    Enregistrement d'une mesure, avec les débits dérivés (lignes/s, Mo/s).
+    """
+    return {
+        "timestamp": datetime.now(timezone.utc).isoformat().replace("+00:00", "Z"),
+        "run_id": run_id(),
+        "level": level,
+        "stage": stage,
+        "task": task,
+        "input": input_path,
+        "status": status,
+        "pid": os.getpid(),
+        "wall_s": round(wall, 3),
+        "cpu_s": round(cpu, 3),
+        "peak_rss_mb": round(peak_rss / 1024 ** 2, 1),
+        **counts,
+        "rows_per_s": round(counts["rows_in"] / wall, 1) if wall > 0 else None,
+        "mb_per_s": round(counts["bytes_read"] / 1024 ** 2 / wall, 2) if wall > 0 else None,
+    }
+
+
+def write_record(record: dict, path: Optional[str] = None) -> None:
+    """
+    Ajoute un enregistrement au fichier JSONL (une seule écriture en O_APPEND : les
+    lignes de workers parallèles ne s'entremêlent pas). Par défaut : metrics_path().
+    """
+    path = path or metrics_path()
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    line = (json.dumps(record, ensure_ascii=False) + "\n").encode("utf-8")
+    fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+    try:
+        os.write(fd, line)
+    finally:
+        os.close(fd)
+
+
+@contextmanager
+def track(task: str, stage: Optional[str] = None, input_path: Optional[str] = None) -> Iterator[dict]:
+    """
+    Mesure une tâche (durée, CPU du processus et de ses sous-processus, pic de RSS,
+    volumes signalés par add_counts) et l'ajoute au fichier de métriques à la sortie.
+    L'étape et le fichier valent par défaut ceux de resource_monitor.sh / run_stage
+    (PIPELINE_STAGE, PIPELINE_METRICS_PATH).
+    Le dictionnaire produit permet de fixer le statut ("ok", "failed"...).
+    """
+    stage = stage or os.environ.get(STAGE_ENV, "standalone")
+    state = {"status": "ok"}
+    _reset_peak_rss()
+    children_cpu, children_rss = _children_usage()
+    cpu = time.process_time()
+    started = time.perf_counter()
+    try:
+        with counting() as counts:
+            yield state
+    except BaseException:
+        state["status"] = "error"
+        raise
+    finally:
+        wall = time.perf_counter() - started
+        end_cpu, end_rss = _children_usage()
+        # Pic des sous-processus : connu seulement s'il dépasse celui des précédents
+        peak_rss = max(_peak_rss(), end_rss if end_rss > children_rss else 0)
+        write_record(build_record("task", stage, task, state["status"], wall,
+                                  time.process_time() - cpu + end_cpu - children_cpu,
+                                  peak_rss, counts, input_path))
+
+
+def run_stage(stage: str, command: List[str], path: Optional[str] = None) -> int:
+    """
+    Lance la commande d'une étape et la mesure de l'extérieur (durée, CPU et pic de RSS
+    des processus lancés). Les volumes de l'étape sont la somme de ceux de ses tâches,
+    qui écrivent dans le même fichier de métriques (transmis par l'environnement).
+    """
+    current_run = run_id()
+    path = os.path.abspath(path or metrics_path())
+    env = dict(os.environ, **{STAGE_ENV: stage, METRICS_ENV: path})
+    children_cpu, _ = _children_usage()
+    started = time.perf_counter()
+    try:
+        code = subprocess.call(command, env=env)
+    except OSError as e:
+        print(f"❌ Impossible de lancer l'étape {stage} : {e}")
+        code = 127
+    wall = time.perf_counter() - started
+    end_cpu, peak_rss = _children_usage()
+
+    counts = dict.fromkeys(COUNTERS, 0)
+    for record in load_metrics(path, current_run):
+        if record["level"] == "task" and record["stage"] == stage:
+            for key in COUNTERS:
+                counts[key] += record.get(key, 0)
+    write_record(build_record("stage", stage, None, "ok" if code == 0 else "failed",
+                              wall, end_cpu - children_cpu, peak_rss, counts), path)
+    return code
+
+
+# ===============================
+# 📤 Lecture et export Prometheus
+# ===============================
+
+def load_metrics(path: Optional[str] = None, run: Optional[str] = None) -> List[dict]:
+    """
+    Enregistrements du fichier de métriques (défaut : metrics_path()), d'un run donné
+    si `run` est précisé.
+    """
+    path = path or metrics_path()
+    if not os.path.exists(path):
+        return []
+    records = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            if run is None or record.get("run_id") == run:
+                records.append(record)
+    return records
+
+
+def latest_run(records: List[dict]) -> List[dict]:
+    """
+    Enregistrements du run le plus récent.
+    """
+    if not records:
+        return []
+    last = max(records, key=lambda r: r["timestamp"])["run_id"]
+    return [r for r in records if r["run_id"] == last]
+
+
+# Métrique Prometheus → (champ, facteur, description)
+PROMETHEUS_METRICS = {
+    "wall_seconds": ("wall_s", 1, "Durée d'exécution"),
+    "cpu_seconds": ("cpu_s", 1, "Temps CPU (processus et sous-processus)"),
+    "peak_rss_bytes": ("peak_rss_mb", 1024 ** 2, "Pic de mémoire résidente"),
+    "rows_in": ("rows_in", 1, "Lignes lues"),
+    "rows_out": ("rows_out", 1, "Lignes produites"),
+    "bytes_read": ("bytes_read", 1, "Octets lus"),
+    "bytes_written": ("bytes_written", 1, "Octets écrits"),
+    "rows_per_second": ("rows_per_s", 1, "Débit en lignes lues par seconde"),
+    "bytes_per_second": ("mb_per_s", 1024 ** 2, "Débit en octets lus par seconde"),
+}
+
+
+def _label(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def export_prometheus(records: List[dict], prometheus_path: str = PROMETHEUS_PATH) -> str:
+    """
+    Écrit les métriques d'un run au format textfile Prometheus (jauges par étape et par
+    tâche, collecteur textfile de node_exporter). Publication atomique.
+    """
+    lines = []
+    for level in ("stage", "task"):
+        level_records = [r for r in records if r["level"] == level]
+        if not level_records:
+            continue
+        for name, (field, factor, description) in PROMETHEUS_METRICS.items():
+            metric = f"data_pipeline_{level}_{name}"
+            lines.append(f"# HELP {metric} {description} par {'étape' if level == 'stage' else 'tâche'}")
+            lines.append(f"# TYPE {metric} gauge")
+            for r in level_records:
+                if r.get(field) is None:
+                    continue
+                labels = f'stage="{_label(r["stage"])}"'
+                if level == "task":
+                    labels += f',task="{_label(r["task"])}"'
+                lines.append(f"{metric}{{{labels}}} {r[field] * factor:.12g}")
+    if records:
+        ended = max(datetime.fromisoformat(r["timestamp"].rstrip("Z")) for r in records)
+        lines.append("# HELP data_pipeline_last_run_timestamp_seconds Fin de la dernière mesure du run")
+        lines.append("# TYPE data_pipeline_last_run_timestamp_seconds gauge")
+        lines.append(f"data_pipeline_last_run_timestamp_seconds {(ended - datetime(1970, 1, 1)).total_seconds():.0f}")
+
+    os.makedirs(os.path.dirname(prometheus_path), exist_ok=True)
+    tmp_path = f"{prometheus_path}.tmp-{os.getpid()}"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write("\n".join(lines) + "\n")
+    os.replace(tmp_path, prometheus_path)
+    return prometheus_path
+
+
+def print_summary(records: List[dict]) -> None:
+    """
+    Tableau récapitulatif d'un run, étape la plus longue signalée.
+    """
+    stages = [r for r in records if r["level"] == "stage"]
+    slowest = max(stages, key=lambda r: r["wall_s"]) if stages else None
+    for r in sorted(records, key=lambda r: (r["stage"], r["level"] != "stage", r["timestamp"])):
+        name = r["stage"] if r["level"] == "stage" else f"  └ {r['task']}"
+        flag = " 🐢" if r is slowest else ""
+        print(f"{name:<45} {r['wall_s']:>9.2f} s  CPU {r['cpu_s']:>8.2f} s  RSS {r['peak_rss_mb']:>8.1f} Mo  "
+              f"{r['rows_in']:>10} → {r['rows_out']:<10} lignes{flag}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Métriques de ressources du pipeline (par étape et par tâche)")
+    parser.add_argument('--metrics', default=metrics_path(), help="Fichier JSONL des métriques")
+    parser.add_argument('--prometheus', default=PROMETHEUS_PATH, help="Export textfile Prometheus")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = sub.add_parser("run", help="Mesurer une étape : run --stage <étape> -- <commande...>")
+    run_parser.add_argument('--stage', required=True)
+    run_parser.add_argument('cmd', nargs=argparse.REMAINDER)
+    sub.add_parser("export", help="Réécrire l'export Prometheus du dernier run")
+    sub.add_parser("show", help="Afficher les métriques du dernier run")
+    args = parser.parse_args()
+
+    if args.command == "run":
+        command = args.cmd[1:] if args.cmd[:1] == ["--"] else args.cmd
+        if not command:
+            print("❌ Aucune commande à mesurer")
+            sys.exit(2)
+        code = run_stage(args.stage, command, args.metrics)
+        export_prometheus(load_metrics(args.metrics, run_id()), args.prometheus)
+        sys.exit(code)
+
+    records = latest_run(load_metrics(args.metrics))
+    if not records:
+        print(f"ℹ️ Aucune métrique dans {args.metrics}")
+        sys.exit(0)
+    if args.command == "export":
+        print(f"📤 Export Prometheus : {export_prometheus(records, args.prometheus)}")
+    else:
+        print_summary(records)
+
+
+if __name__ == "__main__":
+    main()
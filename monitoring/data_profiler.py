@@ -0,0 +1,167 @@
+# monitoring/data_profiler.py
+# 🔬 Profilage par étape (lecture, nettoyage, enrichissement, agrégation, export) des
+# processeurs : cProfile (fonctions les plus coûteuses) + tracemalloc (pics d'allocation).
+# Activé par --profile ; sans effet (et sans surcoût notable) sinon.
+
+import os
+import io
+import json
+import time
+import pstats
+import cProfile
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Dict, Iterable, Iterator, Optional, Tuple
+
+PIPELINE_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+QUALITY_DIR = os.path.join(PIPELINE_ROOT, "data", "quality")
+
+MB = 1024 ** 2
+
+
+class StepProfiler:
+    """
+    Profileur d'un traitement découpé en étapes nommées. Une étape peut être traversée
+    plusieurs fois (une fois par chunk) : ses mesures sont cumulées.
+
+    Usage :
+        profiler = StepProfiler("sessions", input_path, enabled=args.profile)
+        with profiler.step("clean"):
+            df = clean_session_data(df)
+        profiler.report()
+    """
+
+    def __init__(self, name: str, input_path: Optional[str] = None, enabled: bool = True, top: int = 20):
+        self.name = name
+        self.input_path = input_path
+        self.enabled = enabled
+        self.top = top
+        self.steps: Dict[str, dict] = {}
+        self._active = None
+        if enabled and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    @contextmanager
+    def step(self, name: str) -> Iterator[None]:
+        """
+        Profile le bloc comme (une partie de) l'étape `name`. Les étapes ne s'imbriquent
+        pas : un bloc ouvert dans une étape déjà profilée lui est simplement rattaché.
+        """
+        if not self.enabled or self._active is not None:
+            yield
+            return
+
+        stats = self.steps.setdefault(name, {
+            "profile": cProfile.Profile(), "calls": 0, "wall_s": 0.0, "cpu_s": 0.0,
+            "mem_delta_mb": 0.0, "mem_peak_mb": 0.0, "allocations": {},
+        })
+        self._active = name
+        before = tracemalloc.take_snapshot()
+        tracemalloc.reset_peak()
+        current_before = tracemalloc.get_traced_memory()[0]
+        cpu, started = time.process_time(), time.perf_counter()
+        stats["profile"].enable()
+        try:
+            yield
+        finally:
+            stats["profile"].disable()
+            stats["wall_s"] += time.perf_counter() - started
+            stats["cpu_s"] += time.process_time() - cpu
+            current, peak = tracemalloc.get_traced_memory()
+            stats["mem_delta_mb"] += (current - current_before) / MB
+            stats["mem_peak_mb"] = max(stats["mem_peak_mb"], (peak - current_before) / MB)
+            stats["calls"] += 1
+            # Lignes de code ayant le plus alloué pendant le bloc (cumulées sur les passages)
+            for diff in tracemalloc.take_snapshot().compare_to(before, "lineno")[:self.top]:
+                frame = diff.traceback[0]
+                location = f"{frame.filename}:{frame.lineno}"
+                alloc = stats["allocations"].setdefault(location, {"size_mb": 0.0, "count": 0})
+                alloc["size_mb"] += diff.size_diff / MB
+                alloc["count"] += diff.count_diff
+            self._active = None
+
+    def iterate(self, name: str, iterable: Iterable) -> Iterator:
+        """
+        Parcourt un itérable (lecture par chunks) en profilant chaque récupération d'élément.
+        """
+        iterator = iter(iterable)
+        while True:
+            with self.step(name):
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    return
+            yield item
+
+    def _hot_functions(self, profile: cProfile.Profile) -> Tuple[list, str]:
+        """
+        (top des fonctions par temps cumulé, table pstats texte) d'une étape.
+        """
+        buffer = io.StringIO()
+        stats = pstats.Stats(profile, stream=buffer).sort_stats("cumulative")
+        stats.print_stats(self.top)
+        rows = []
+        for (filename, lineno, function), (cc, nc, tt, ct, _) in stats.stats.items():
+            if filename.startswith(PIPELINE_ROOT):
+                filename = os.path.relpath(filename, PIPELINE_ROOT)
+            rows.append({"function": f"{filename}:{lineno}({function})",
+                         "ncalls": nc, "tottime_s": round(tt, 4), "cumtime_s": round(ct, 4)})
+        rows.sort(key=lambda r: r["cumtime_s"], reverse=True)
+        return rows[:self.top], buffer.getvalue()
+
+    def report(self, output_dir: str = QUALITY_DIR) -> Optional[Tuple[str, str]]:
+        """
+        Écrit dans data/quality/ le résumé structuré (profile_<nom>_<entrée>.json : durées,
+        CPU, deltas et pics mémoire, fonctions et allocations principales par étape) et
+        les tables texte des fonctions les plus coûteuses (.txt). Renvoie leurs chemins.
+        """
+        if not self.enabled:
+            return None
+        stem = os.path.basename(self.input_path).split(".")[0] if self.input_path else None
+        base = os.path.join(output_dir, f"profile_{self.name}" + (f"_{stem}" if stem else ""))
+        os.makedirs(output_dir, exist_ok=True)
+
+        summary = {
+            "name": self.name,
+            "input": self.input_path,
+            "profiled_at": datetime.now(timezone.utc).isoformat().replace("+00:00", "Z"),
+            "total_wall_s": round(sum(s["wall_s"] for s in self.steps.values()), 3),
+            "steps": [],
+        }
+        text = [f"🔬 Profil {self.name}" + (f" — {self.input_path}" if self.input_path else "")]
+        for name, stats in self.steps.items():
+            functions, table = self._hot_functions(stats["profile"])
+            allocations = sorted(
+                ({"location": loc, "size_mb": round(a["size_mb"], 3), "count": a["count"]}
+                 for loc, a in stats["allocations"].items()),
+                key=lambda a: a["size_mb"], reverse=True)[:self.top]
+            summary["steps"].append({
+                "step": name,
+                "calls": stats["calls"],
+                "wall_s": round(stats["wall_s"], 3),
+                "cpu_s": round(stats["cpu_s"], 3),
+                "mem_delta_mb": round(stats["mem_delta_mb"], 3),
+                "mem_peak_mb": round(stats["mem_peak_mb"], 3),
+                "hot_functions": functions,
+                "top_allocations": allocations,
+            })
+            text.append(f"\n===== {name} : {stats['wall_s']:.3f} s (CPU {stats['cpu_s']:.3f} s), "
+                        f"pic mémoire {stats['mem_peak_mb']:.1f} Mo, delta {stats['mem_delta_mb']:+.1f} Mo, "
+                        f"{stats['calls']} passage(s) =====")
+            text.append(table.strip())
+            text.append("\nAllocations principales :")
+            text.extend(f"  {a['size_mb']:>10.3f} Mo  {a['count']:>8} blocs  {a['location']}" for a in allocations)
+
+        with open(base + ".json", "w", encoding="utf-8") as f:
+            json.dump(summary, f, indent=4, ensure_ascii=False)
+        with open(base + ".txt", "w", encoding="utf-8") as f:
+            f.write("\n".join(text) + "\n")
+        print(f"🔬 Profil par étape : {base}.json / .txt")
+        for s in summary["steps"]:
+            print(f"   - {s['step']:<10} {s['wall_s']:>8.3f} s  pic {s['mem_peak_mb']:>8.1f} Mo")
+        return base + ".json", base + ".txt"
+
+
+# Profileur inactif : valeur par défaut des fonctions qui acceptent un profileur optionnel
+NO_PROFILER = StepProfiler("disabled", enabled=False)
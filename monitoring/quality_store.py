@@ -0,0 +1,329 @@
+#!/usr/bin/env python3
+# 🗃️ Historique indexé (SQLite, en ajout seul) des rapports de validation qualité :
+# un enregistrement par fichier validé et par run, interrogé par run ou par fenêtre de temps.
+# Stocke aussi les statistiques de colonnes par fichier (référence de la détection d'anomalies).
+
+import os
+import sys
+import glob
+import json
+import sqlite3
+import argparse
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional
+
+PIPELINE_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, PIPELINE_ROOT)
+
+from monitoring.data_metrics import run_id
+
+QUALITY_DIR = os.path.join(PIPELINE_ROOT, "data", "quality")
+DEFAULT_DB = os.path.join(QUALITY_DIR, "quality_reports.sqlite")
+IMPORTED_RUN = "imported"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS validation_reports (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    run_id TEXT NOT NULL,
+    source TEXT,
+    filename TEXT NOT NULL,
+    status TEXT NOT NULL,
+    completeness REAL,
+    threshold REAL,
+    rows INTEGER,
+    failed_rows INTEGER,
+    nb_errors INTEGER NOT NULL,
+    validated_at TEXT NOT NULL,
+    report TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_reports_run ON validation_reports (run_id, status);
+CREATE INDEX IF NOT EXISTS idx_reports_time
+    ON validation_reports (validated_at, source, status, completeness, failed_rows);
+CREATE INDEX IF NOT EXISTS idx_reports_file ON validation_reports (filename, validated_at);
+CREATE TABLE IF NOT EXISTS column_stats (
+    source TEXT NOT NULL,
+    filename TEXT NOT NULL,
+    column_name TEXT NOT NULL,
+    run_id TEXT NOT NULL,
+    recorded_at TEXT NOT NULL,
+    rows INTEGER NOT NULL,
+    nulls INTEGER NOT NULL,
+    n INTEGER NOT NULL,
+    mean REAL,
+    m2 REAL,
+    min REAL,
+    max REAL,
+    sketch TEXT,
+    PRIMARY KEY (source, filename, column_name)
+);
+CREATE INDEX IF NOT EXISTS idx_column_stats_time ON column_stats (source, recorded_at);
+"""
+
+COLUMN_STATS_FIELDS = ["column_name", "rows", "nulls", "n", "mean", "m2", "min", "max", "sketch"]
+
+
+def connect(db_path: str = DEFAULT_DB) -> sqlite3.Connection:
+    """
+    Ouvre l'historique (WAL + timeout pour les workers de validation concurrents) et crée le schéma.
+    """
+    os.makedirs(os.path.dirname(db_path), exist_ok=True)
+    conn = sqlite3.connect(db_path, timeout=30)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.executescript(SCHEMA)
+    return conn
+
+
+def since_hours(hours: float) -> str:
+    """
+    Horodatage ISO (UTC, format des rapports) de la borne basse d'une fenêtre de `hours` heures.
+    """
+    return (datetime.now(timezone.utc) - timedelta(hours=hours)).isoformat().replace("+00:00", "Z")
+
+
+def _row(report: dict, run: str) -> tuple:
+    return (
+        run, report.get("source"), report["filename"], report.get("status", "unknown"),
+        report.get("completeness"), report.get("threshold"), report.get("rows"),
+        report.get("failed_rows"), len(report.get("errors") or []),
+        report.get("validated_at") or datetime.now(timezone.utc).isoformat().replace("+00:00", "Z"),
+        json.dumps(report, ensure_ascii=False),
+    )
+
+
+INSERT = (
+    "INSERT INTO validation_reports (run_id, source, filename, status, completeness, threshold, rows, "
+    "failed_rows, nb_errors, validated_at, report) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)"
+)
+
+
+def record_report(report: dict, run: Optional[str] = None, db_path: str = DEFAULT_DB) -> None:
+    """
+    Ajoute un rapport de validation à l'historique (run courant par défaut).
+    """
+    conn = connect(db_path)
+    try:
+        with conn:
+            conn.execute(INSERT, _row(report, run or run_id()))
+    finally:
+        conn.close()
+
+
+def latest_run_id(db_path: str = DEFAULT_DB) -> Optional[str]:
+    """
+    Run du rapport le plus récent (hors rapports importés).
+    """
+    conn = connect(db_path)
+    try:
+        row = conn.execute(
+            "SELECT run_id FROM validation_reports WHERE run_id != ? ORDER BY validated_at DESC LIMIT 1",
+            (IMPORTED_RUN,),
+        ).fetchone()
+    finally:
+        conn.close()
+    return row[0] if row else None
+
+
+def current_run_id(db_path: str = DEFAULT_DB) -> Optional[str]:
+    """
+    Run en cours (PIPELINE_RUN_ID) s'il a des rapports, sinon le dernier run enregistré.
+    """
+    run = os.environ.get("PIPELINE_RUN_ID")
+    if run:
+        conn = connect(db_path)
+        try:
+            if conn.execute("SELECT 1 FROM validation_reports WHERE run_id = ? LIMIT 1", (run,)).fetchone():
+                return run
+        finally:
+            conn.close()
+    return latest_run_id(db_path)
+
+
+def load_reports(run: Optional[str] = None, since: Optional[str] = None, status: Optional[str] = None,
+                 db_path: str = DEFAULT_DB) -> List[dict]:
+    """
+    Rapports d'un run et/ou d'une fenêtre de temps (validated_at >= since), éventuellement
+    filtrés par statut, du plus ancien au plus récent. Chaque rapport reçoit son run_id.
+    """
+    clauses, params = [], []
+    if run is not None:
+        clauses.append("run_id = ?")
+        params.append(run)
+    if since is not None:
+        clauses.append("validated_at >= ?")
+        params.append(since)
+    if status is not None:
+        clauses.append("status = ?")
+        params.append(status)
+    where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+    conn = connect(db_path)
+    try:
+        rows = conn.execute(
+            f"SELECT run_id, report FROM validation_reports {where} ORDER BY validated_at, id", params
+        ).fetchall()
+    finally:
+        conn.close()
+    return [dict(json.loads(report), run_id=run) for run, report in rows]
+
+
+# ===============================
+# 📈 Tendances (agrégées en SQL sur les index)
+# ===============================
+
+def daily_trend(since: str, db_path: str = DEFAULT_DB) -> List[dict]:
+    """
+    Par jour et par source : rapports, rapports réussis, complétude moyenne, lignes en échec.
+    """
+    conn = connect(db_path)
+    try:
+        rows = conn.execute(
+            "SELECT substr(validated_at, 1, 10) AS day, COALESCE(source, '?'), COUNT(*), "
+            "SUM(status = 'passed'), AVG(completeness), COALESCE(SUM(failed_rows), 0) "
+            "FROM validation_reports WHERE validated_at >= ? GROUP BY day, source ORDER BY day, source",
+            (since,),
+        ).fetchall()
+    finally:
+        conn.close()
+    keys = ["day", "source", "nb_reports", "nb_passed", "avg_completeness", "failed_rows"]
+    return [dict(zip(keys, row)) for row in rows]
+
+
+def run_trend(limit: int = 20, db_path: str = DEFAULT_DB) -> List[dict]:
+    """
+    Derniers runs (plus récent d'abord) : rapports, réussites, complétude moyenne.
+    """
+    conn = connect(db_path)
+    try:
+        rows = conn.execute(
+            "SELECT run_id, MIN(validated_at) AS started, COUNT(*), SUM(status = 'passed'), AVG(completeness) "
+            "FROM validation_reports WHERE run_id != ? GROUP BY run_id ORDER BY started DESC LIMIT ?",
+            (IMPORTED_RUN, limit),
+        ).fetchall()
+    finally:
+        conn.close()
+    keys = ["run_id", "started_at", "nb_reports", "nb_passed", "avg_completeness"]
+    return [dict(zip(keys, row)) for row in rows]
+
+
+def failing_files(since: str, limit: int = 10, db_path: str = DEFAULT_DB) -> List[dict]:
+    """
+    Fichiers le plus souvent en échec sur la fenêtre (nombre d'échecs, dernier échec).
+    """
+    conn = connect(db_path)
+    try:
+        rows = conn.execute(
+            "SELECT filename, COUNT(*), SUM(status != 'passed') AS failures, "
+            "MAX(CASE WHEN status != 'passed' THEN validated_at END) "
+            "FROM validation_reports WHERE validated_at >= ? GROUP BY filename "
+            "HAVING failures > 0 ORDER BY failures DESC, filename LIMIT ?",
+            (since, limit),
+        ).fetchall()
+    finally:
+        conn.close()
+    keys = ["filename", "nb_reports", "nb_failed", "last_failed_at"]
+    return [dict(zip(keys, row)) for row in rows]
+
+
+# ===============================
+# 📐 Statistiques de colonnes (référence des anomalies)
+# ===============================
+
+def record_column_stats(source: str, filename: str, stats: List[dict], run: Optional[str] = None,
+                        db_path: str = DEFAULT_DB) -> None:
+    """
+    Enregistre les statistiques fusionnables des colonnes d'un fichier ; une nouvelle
+    validation du même fichier remplace sa contribution à la référence.
+    """
+    recorded_at = datetime.now(timezone.utc).isoformat().replace("+00:00", "Z")
+    conn = connect(db_path)
+    try:
+        with conn:
+            conn.execute("DELETE FROM column_stats WHERE source = ? AND filename = ?", (source, filename))
+            conn.executemany(
+                f"INSERT INTO column_stats (source, filename, run_id, recorded_at, {', '.join(COLUMN_STATS_FIELDS)}) "
+                f"VALUES (?, ?, ?, ?, {', '.join('?' * len(COLUMN_STATS_FIELDS))})",
+                [(source, filename, run or run_id(), recorded_at, *[s[k] for k in COLUMN_STATS_FIELDS]) for s in stats],
+            )
+    finally:
+        conn.close()
+
+
+def load_column_stats(source: str, exclude: Optional[str] = None, max_files: int = 30,
+                      run: Optional[str] = None, db_path: str = DEFAULT_DB) -> List[dict]:
+    """
+    Statistiques de colonnes des `max_files` derniers fichiers de la source enregistrés par
+    les runs précédents (hors run courant et hors fichier `exclude`), avec le nom du fichier.
+    """
+    conn = connect(db_path)
+    try:
+        rows = conn.execute(
+            f"SELECT filename, {', '.join(COLUMN_STATS_FIELDS)} FROM column_stats "
+            "WHERE source = ? AND filename IN ("
+            "  SELECT filename FROM column_stats WHERE source = ? AND filename != ? AND run_id != ? "
+            "  GROUP BY filename ORDER BY MAX(recorded_at) DESC LIMIT ?)",
+            (source, source, exclude or "", run or run_id(), max_files),
+        ).fetchall()
+    finally:
+        conn.close()
+    return [dict(zip(["filename"] + COLUMN_STATS_FIELDS, row)) for row in rows]
+
+
+def import_reports(quality_dir: str = QUALITY_DIR, db_path: str = DEFAULT_DB) -> int:
+    """
+    Reprise des rapports JSON existants (validation_report_*.json) dans l'historique,
+    sous le run « imported ». Un rapport déjà présent (même fichier, même horodatage) est ignoré.
+    """
+    conn = connect(db_path)
+    imported = 0
+    try:
+        with conn:
+            for path in sorted(glob.glob(os.path.join(quality_dir, "validation_report_*.json"))):
+                try:
+                    with open(path, encoding="utf-8") as f:
+                        report = json.load(f)
+                except (OSError, ValueError):
+                    continue
+                if "filename" not in report:
+                    continue
+                exists = conn.execute(
+                    "SELECT 1 FROM validation_reports WHERE filename = ? AND validated_at = ? LIMIT 1",
+                    (report["filename"], report.get("validated_at")),
+                ).fetchone()
+                if not exists:
+                    conn.execute(INSERT, _row(report, IMPORTED_RUN))
+                    imported += 1
+    finally:
+        conn.close()
+    return imported
+
+
+# ===============================
+# 🌟 CLI
+# ===============================
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Historique des rapports de validation qualité")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("import", help="Reprendre les rapports JSON de data/quality/ dans l'historique")
+    show = sub.add_parser("show", help="Afficher les rapports d'un run ou d'une fenêtre de temps")
+    show.add_argument("--run-id", help="Run à afficher (défaut : run courant ou dernier run)")
+    show.add_argument("--since-hours", type=float, help="Fenêtre de temps au lieu d'un run")
+    args = parser.parse_args()
+
+    if args.command == "import":
+        print(f"📥 {import_reports()} rapports importés dans {DEFAULT_DB}")
+        return
+
+    if args.since_hours is not None:
+        reports = load_reports(since=since_hours(args.since_hours))
+    else:
+        run = args.run_id or current_run_id()
+        if run is None:
+            print("ℹ️ Aucun rapport de validation enregistré")
+            return
+        reports = load_reports(run=run)
+    for r in reports:
+        print(f"{r['validated_at']}  {r['run_id']:<16} {r['status']:<7} {r.get('completeness')!s:>7}  {r['filename']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,322 @@
+#!/usr/bin/env python3
+# 📦 Archive incrémentale adressée par contenu : chaque fichier de data/processed et
+# data/quality est stocké une seule fois sous son SHA-256 (compression zstd en parallèle),
+# chaque run n'écrit qu'un manifest (chemin → hash) ; la restauration d'une partition ou
+# d'un run entier ne lit que les objets concernés.
+
+import os
+import sys
+import gzip
+import json
+import time
+import fnmatch
+import hashlib
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+PIPELINE_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, PIPELINE_ROOT)
+
+from monitoring.data_metrics import run_id
+from orchestration.manifest import cached_hash, connect, store_hash
+from transformations.data_storage import load_pipeline_config
+
+DATA_DIR = os.path.join(PIPELINE_ROOT, "data")
+ARCHIVE_DIR = os.path.join(DATA_DIR, "archive")
+OBJECTS_DIR = os.path.join(ARCHIVE_DIR, "objects")
+RUNS_DIR = os.path.join(ARCHIVE_DIR, "runs")
+RESTORE_DIR = os.path.join(ARCHIVE_DIR, "restore")
+
+DEFAULT_SOURCES = ("processed", "quality")
+# Formats déjà compressés : stockés tels quels (recompresser ne gagne rien)
+STORED_EXTENSIONS = (".parquet", ".gz", ".zip", ".xlsx", ".png", ".jpg")
+# Fichiers transitoires jamais archivés (verrous, écritures en cours, journaux SQLite)
+SKIPPED_SUFFIXES = (".lock", ".tmp", "-wal", "-shm", "-journal")
+CODECS = ("zst", "gz", "raw")
+
+
+# ===============================
+# 🗜️ Compression
+# ===============================
+
+def _zstd():
+    try:
+        import pyarrow as pa
+        return pa.Codec("zstd") if pa.Codec.is_available("zstd") else None
+    except ImportError:
+        return None
+
+
+def choose_codec(path: str) -> str:
+    if path.lower().endswith(STORED_EXTENSIONS):
+        return "raw"
+    return "zst" if _zstd() is not None else "gz"
+
+
+def compress(data: bytes, codec: str) -> bytes:
+    if codec == "zst":
+        return _zstd().compress(data, asbytes=True)
+    if codec == "gz":
+        return gzip.compress(data, compresslevel=6, mtime=0)
+    return data
+
+
+def decompress(data: bytes, codec: str, size: int) -> bytes:
+    if codec == "zst":
+        return _zstd().decompress(data, decompressed_size=size, asbytes=True)
+    if codec == "gz":
+        return gzip.decompress(data)
+    return data
+
+
+def object_path(digest: str, codec: str) -> str:
+    return os.path.join(OBJECTS_DIR, digest[:2], f"{digest}.{codec}")
+
+
+def find_object(digest: str) -> Optional[str]:
+    """
+    Codec de l'objet déjà stocké pour ce contenu (quel que soit le codec choisi alors), None sinon.
+    """
+    for codec in CODECS:
+        if os.path.exists(object_path(digest, codec)):
+            return codec
+    return None
+
+
+# ===============================
+# 📥 Archivage
+# ===============================
+
+def list_files(sources: List[str]) -> List[str]:
+    """
+    Fichiers à archiver, en chemins relatifs à data/ (ordre stable).
+    """
+    files = []
+    for source in sources:
+        root = os.path.join(DATA_DIR, source)
+        for dirpath, dirnames, names in os.walk(root):
+            dirnames.sort()
+            for name in sorted(names):
+                if not name.endswith(SKIPPED_SUFFIXES) and ".tmp" not in name:
+                    files.append(os.path.relpath(os.path.join(dirpath, name), DATA_DIR))
+    return files
+
+
+def _store(rel_path: str, digest: Optional[str]) -> dict:
+    """
+    Stocke un fichier (tâche d'un thread : hashlib et la compression libèrent le GIL).
+    Un contenu dont l'objet existe déjà n'est ni recompressé ni réécrit ; son hash
+    connu (cache du manifest), il n'est même pas relu.
+    """
+    path = os.path.join(DATA_DIR, rel_path)
+    codec = find_object(digest) if digest else None
+    if codec is not None:
+        return {"path": rel_path, "hash": digest, "codec": codec, "size": os.path.getsize(path),
+                "stored_bytes": 0, "new": False}
+
+    with open(path, "rb") as f:
+        data = f.read()
+    digest = hashlib.sha256(data).hexdigest()
+    codec = find_object(digest)
+    stored_bytes = 0
+    if codec is None:
+        codec = choose_codec(rel_path)
+        blob = compress(data, codec)
+        target = object_path(digest, codec)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        tmp_path = f"{target}.tmp-{os.getpid()}-{threading.get_ident()}"
+        with open(tmp_path, "wb") as f:
+            f.write(blob)
+        os.replace(tmp_path, target)  # Deux fichiers identiques en parallèle : même objet
+        stored_bytes = len(blob)
+    return {"path": rel_path, "hash": digest, "codec": codec, "size": len(data),
+            "stored_bytes": stored_bytes, "new": stored_bytes > 0}
+
+
+def archive(sources: List[str], run: str, workers: int) -> dict:
+    """
+    Archive les sources et écrit le manifest du run (data/archive/runs/<run>.json).
+    """
+    started = time.perf_counter()
+    files = list_files(sources)
+
+    # Hashs connus (taille et mtime inchangées) : les fichiers inchangés ne sont pas relus
+    conn = connect()
+    stats = {rel: os.stat(os.path.join(DATA_DIR, rel)) for rel in files}
+    known = {rel: cached_hash(conn, os.path.join(DATA_DIR, rel), stats[rel]) for rel in files}
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        entries = list(pool.map(_store, files, [known[rel] for rel in files]))
+
+    with conn:
+        for entry in entries:
+            if known[entry["path"]] != entry["hash"]:
+                store_hash(conn, os.path.join(DATA_DIR, entry["path"]), stats[entry["path"]], entry["hash"])
+    conn.close()
+
+    manifest = {
+        "run_id": run,
+        "created_at": datetime.now(timezone.utc).isoformat().replace("+00:00", "Z"),
+        "sources": sources,
+        "nb_files": len(entries),
+        "nb_new_objects": sum(e["new"] for e in entries),
+        "bytes": sum(e["size"] for e in entries),
+        "stored_bytes": sum(e["stored_bytes"] for e in entries),
+        "duration_s": round(time.perf_counter() - started, 3),
+        "files": [{key: e[key] for key in ("path", "hash", "codec", "size")} for e in entries],
+    }
+    os.makedirs(RUNS_DIR, exist_ok=True)
+    manifest_path = os.path.join(RUNS_DIR, f"{run}.json")
+    tmp_path = f"{manifest_path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=1, ensure_ascii=False)
+    os.replace(tmp_path, manifest_path)
+    return manifest
+
+
+# ===============================
+# 📤 Restauration
+# ===============================
+
+def list_runs() -> List[str]:
+    if not os.path.isdir(RUNS_DIR):
+        return []
+    return sorted(name[:-len(".json")] for name in os.listdir(RUNS_DIR) if name.endswith(".json"))
+
+
+def load_manifest(run: str) -> dict:
+    path = os.path.join(RUNS_DIR, f"{run}.json")
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"❌ Run absent de l'archive : {run}")
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def matches(rel_path: str, partitions: List[str]) -> bool:
+    """
+    Partition : dossier relatif à data/ (processed/sessions/2025-07-24) ou motif
+    (processed/*/2025-07-24/*).
+    """
+    for partition in partitions:
+        partition = partition.rstrip("/")
+        if rel_path == partition or rel_path.startswith(partition + "/") or fnmatch.fnmatch(rel_path, partition):
+            return True
+    return False
+
+
+def _restore(entry: dict, dest: str) -> int:
+    with open(object_path(entry["hash"], entry["codec"]), "rb") as f:
+        data = decompress(f.read(), entry["codec"], entry["size"])
+    if hashlib.sha256(data).hexdigest() != entry["hash"]:
+        raise ValueError(f"❌ Objet corrompu pour {entry['path']} ({entry['hash']})")
+    target = os.path.join(dest, entry["path"])
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    with open(target, "wb") as f:
+        f.write(data)
+    return len(data)
+
+
+def restore(run: str, partitions: Optional[List[str]], dest: str, workers: int) -> List[dict]:
+    """
+    Restaure les fichiers du run (toutes les partitions si `partitions` est vide) sous `dest`.
+    """
+    entries = load_manifest(run)["files"]
+    if partitions:
+        entries = [e for e in entries if matches(e["path"], partitions)]
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        list(pool.map(_restore, entries, [dest] * len(entries)))
+    return entries
+
+
+# ===============================
+# 🧹 Rétention
+# ===============================
+
+def prune(keep: int) -> Dict[str, int]:
+    """
+    Conserve les `keep` derniers runs ; supprime les objets qu'aucun run restant ne référence.
+    """
+    runs = list_runs()
+    removed_runs = runs[:-keep] if keep > 0 else runs
+    for run in removed_runs:
+        os.remove(os.path.join(RUNS_DIR, f"{run}.json"))
+
+    referenced = set()
+    for run in list_runs():
+        referenced.update(object_path(e["hash"], e["codec"]) for e in load_manifest(run)["files"])
+    removed_objects = freed = 0
+    if os.path.isdir(OBJECTS_DIR):
+        for dirpath, _, names in os.walk(OBJECTS_DIR):
+            for name in names:
+                path = os.path.join(dirpath, name)
+                if path not in referenced:
+                    freed += os.path.getsize(path)
+                    os.remove(path)
+                    removed_objects += 1
+    return {"runs": len(removed_runs), "objects": removed_objects, "bytes": freed}
+
+
+# ===============================
+# 🌟 CLI
+# ===============================
+
+def main() -> None:
+    config = load_pipeline_config()
+    parser = argparse.ArgumentParser(description="Archive adressée par contenu de data/processed et data/quality")
+    parser.add_argument('--workers', type=int, default=config.get("data_workers", 1),
+                        help="Threads de hachage / compression")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    archive_parser = sub.add_parser("archive", help="Archiver l'état courant (manifest du run)")
+    archive_parser.add_argument('--run-id', help="Identifiant du run (défaut : PIPELINE_RUN_ID)")
+    archive_parser.add_argument('--sources', nargs='+', default=list(DEFAULT_SOURCES),
+                                help="Dossiers de data/ à archiver")
+
+    sub.add_parser("list", help="Runs archivés")
+
+    restore_parser = sub.add_parser("restore", help="Restaurer un run ou certaines partitions")
+    restore_parser.add_argument('--run-id', help="Run à restaurer (défaut : dernier run archivé)")
+    restore_parser.add_argument('--partition', action='append', default=[],
+                                help="Dossier relatif à data/ ou motif (répétable) ; défaut : tout le run")
+    restore_parser.add_argument('--dest', help="Dossier de destination (défaut : data/archive/restore/<run>)")
+
+    prune_parser = sub.add_parser("prune", help="Ne garder que les N derniers runs")
+    prune_parser.add_argument('--keep', type=int, required=True)
+    args = parser.parse_args()
+
+    if args.command == "archive":
+        manifest = archive(args.sources, args.run_id or run_id(), args.workers)
+        print(f"📦 Run {manifest['run_id']} archivé : {manifest['nb_files']} fichiers, "
+              f"{manifest['nb_new_objects']} nouveaux objets ({manifest['stored_bytes'] / 1024 ** 2:.1f} Mo écrits "
+              f"pour {manifest['bytes'] / 1024 ** 2:.1f} Mo) en {manifest['duration_s']} s")
+    elif args.command == "list":
+        for run in list_runs():
+            m = load_manifest(run)
+            print(f"{run:<20} {m['created_at']:<28} {m['nb_files']:>7} fichiers  {m['nb_new_objects']:>6} nouveaux  "
+                  f"{m['stored_bytes'] / 1024 ** 2:>8.1f} Mo écrits")
+    elif args.command == "restore":
+        run = args.run_id or (list_runs() or [None])[-1]
+        if run is None:
+            print("ℹ️ Aucun run archivé")
+            sys.exit(1)
+        dest = args.dest or os.path.join(RESTORE_DIR, run)
+        try:
+            entries = restore(run, args.partition, dest, args.workers)
+        except (FileNotFoundError, ValueError) as e:
+            print(e)
+            sys.exit(1)
+        if not entries:
+            print(f"⚠️  Aucun fichier du run {run} ne correspond à : {', '.join(args.partition)}")
+            sys.exit(1)
+        print(f"✅ {len(entries)} fichiers du run {run} restaurés dans {dest}")
+    else:
+        result = prune(args.keep)
+        print(f"🧹 {result['runs']} runs et {result['objects']} objets supprimés "
+              f"({result['bytes'] / 1024 ** 2:.1f} Mo libérés)")
+
+
+if __name__ == "__main__":
+    main()
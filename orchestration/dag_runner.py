@@ -0,0 +1,587 @@
+#!/usr/bin/env python3
+# 🕸️ Exécution du pipeline en graphe de tâches (DAG) : une tâche par entrée et par étape,
+# déclarée avec ses entrées et ses sorties. Une tâche démarre dès que les tâches qui
+# produisent ses entrées sont terminées, dans la limite du budget de workers
+# (data_workers) ; le chemin critique de chaque run est affiché et enregistré.
+
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import importlib
+import subprocess
+import multiprocessing
+from datetime import datetime, timezone
+from multiprocessing.connection import wait
+from typing import Dict, List, Optional
+
+PIPELINE_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, PIPELINE_ROOT)
+
+import yaml
+
+from monitoring.data_metrics import (
+    COUNTERS, STAGE_ENV, build_record, export_prometheus, load_metrics, run_id, track, write_record,
+)
+from orchestration.manifest import infer_stage, is_up_to_date
+from orchestration.worker_pool import PROCESSOR_MODULES
+from processing.data_validator import infer_source, load_configs, validate_file
+from transformations import data_joiner
+from transformations.data_reader import api_log_members
+from transformations.data_storage import list_dataset, load_pipeline_config
+from transformations.data_zip import input_exists
+
+RAW_DIR = os.path.join(PIPELINE_ROOT, "data", "raw")
+STAGING_DIR = os.path.join(PIPELINE_ROOT, "data", "staging")
+ENRICHED_DIR = os.path.join(PIPELINE_ROOT, "data", "processed", "enriched")
+JOINED_PATH = os.path.join(PIPELINE_ROOT, "data", "processed", "joined", "combined_sessions_data")
+QUALITY_DIR = os.path.join(PIPELINE_ROOT, "data", "quality")
+REPORT_PATH = os.path.join(PIPELINE_ROOT, "logs", "dag_report.json")
+
+# Étape de traitement → dataset enrichi produit (cf. transformations/data_enricher.py)
+ENRICHED_DATASETS = {
+    "api_logs": "logs_enriched",
+    "sessions": "sessions_enriched",
+    "users": "sales_enriched",
+    "products": "products_enriched",
+}
+JOIN_STAGES = ("sessions", "users", "api_logs")  # Entrées de data_joiner.py
+SALES_FILES = ("products_catalog.csv", "products_catalog.xlsx", "users_database.csv")
+
+SUCCESS = ("ok", "skipped")
+
+
+class Task:
+    """
+    Tâche du graphe : action exécutée par un worker, entrées requises, sorties produites.
+    Les dépendances se déduisent des chemins : une tâche dépend de celles qui produisent
+    ses entrées, et des tâches nommées dans `after` (ordre seul, sans condition de succès).
+    `always` : exécutée même si une tâche amont a échoué (alertes, dashboard).
+    """
+
+    def __init__(self, name: str, stage: str, action: str, kwargs: Optional[dict] = None,
+                 inputs: Optional[List[str]] = None, outputs: Optional[List[str]] = None,
+                 after: Optional[List[str]] = None, always: bool = False):
+        self.name = name
+        self.stage = stage
+        self.action = action
+        self.kwargs = kwargs or {}
+        self.inputs = [os.path.abspath(p) for p in inputs or []]
+        self.outputs = [os.path.abspath(p) for p in outputs or []]
+        self.after = list(after or [])
+        self.always = always
+        self.producers = []  # Tâches produisant une entrée
+        self.deps = []       # Producteurs + `after`
+        self.dependents = []
+        self.status = None
+        self.error = None
+        self.ready_at = None
+        self.started_at = None
+        self.ended_at = None
+
+
+# ===============================
+# 🧰 Actions exécutées par les workers
+# ===============================
+
+_CONFIGS = None
+
+
+def _stage(raw_path: str, staged_path: str, link: bool = False, force: bool = False) -> str:
+    """
+    Dépose un fichier brut dans le staging (lien symbolique pour l'archive des logs,
+    lue en flux ; copie sinon, sauf contenu inchangé déjà traité et hors `force`).
+    """
+    os.makedirs(os.path.dirname(staged_path), exist_ok=True)
+    if link:
+        if os.path.lexists(staged_path):
+            os.remove(staged_path)
+        os.symlink(os.path.realpath(raw_path), staged_path)
+        print(f"📦 {os.path.basename(raw_path)} référencé dans staging (lecture en flux, sans extraction)")
+        return "ok"
+    if not force and is_up_to_date(infer_stage(os.path.basename(raw_path)), raw_path):
+        print(f"⏭️  Fichier inchangé déjà traité : {os.path.basename(raw_path)}")
+        return "skipped"
+    shutil.copy2(raw_path, staged_path)
+    print(f"📥 Fichier copié : {os.path.basename(raw_path)}")
+    return "ok"
+
+
+def _process(stage: str, input_path: str, options: dict) -> str:
+    module = importlib.import_module(PROCESSOR_MODULES[stage])
+    return "ok" if module.run(input_path, **options) == 0 else "failed"
+
+
+def _validate(input_path: str, source: str, options: dict) -> str:
+    """
+    Valide un fichier (configurations chargées une fois par worker).
+    """
+    global _CONFIGS
+    if _CONFIGS is None:
+        _CONFIGS = load_configs()
+    report = validate_file(input_path, source, _CONFIGS, **options)
+    return "ok" if report["status"] == "passed" else "failed"
+
+
+def _join(options: dict) -> str:
+    return "ok" if data_joiner.run(**options) == 0 else "failed"
+
+
+def _script(path: str, args: List[str], stage: str) -> str:
+    """
+    Script autonome (alertes, dashboard) lancé dans un sous-processus.
+    """
+    env = dict(os.environ, **{STAGE_ENV: stage})
+    code = subprocess.call([sys.executable, os.path.join(PIPELINE_ROOT, path), *args], env=env)
+    return "ok" if code == 0 else "failed"
+
+
+ACTIONS = {
+    "stage": _stage,
+    "process": _process,
+    "validate": _validate,
+    "join": _join,
+    "script": _script,
+}
+
+
+def _worker_loop(conn) -> None:
+    """
+    Boucle d'un worker persistant : une tâche à la fois reçue sur `conn` (imports partagés).
+    """
+    while True:
+        try:
+            message = conn.recv()
+        except EOFError:  # Parent disparu
+            break
+        if message is None:
+            break
+        name, stage, action, kwargs = message
+        started = time.perf_counter()
+        error = None
+        try:
+            with track(name, stage=stage, input_path=kwargs.get("input_path")) as metrics:
+                status = metrics["status"] = ACTIONS[action](**kwargs)
+        except BaseException as e:  # SystemExit inclus : une tâche ne doit pas tuer le worker
+            status, error = "error", repr(e)
+        sys.stdout.flush()
+        conn.send({"name": name, "status": status, "error": error,
+                   "duration_s": round(time.perf_counter() - started, 3)})
+    conn.close()
+
+
+def _spawn(ctx):
+    parent_conn, child_conn = ctx.Pipe()
+    # Non daemon : les processeurs et la validation lancent eux-mêmes des processus
+    process = ctx.Process(target=_worker_loop, args=(child_conn,))
+    process.start()
+    child_conn.close()
+    return process, parent_conn
+
+
+# ===============================
+# 🗺️ Construction du graphe
+# ===============================
+
+def build_tasks(raw_dir: str = RAW_DIR, staging_dir: str = STAGING_DIR, workers: int = 1,
+                options: Optional[dict] = None) -> List[Task]:
+    """
+    Tâches d'un run à partir des fichiers bruts présents : staging, traitement et validation
+    par fichier, puis jointure, alertes et dashboard.
+    """
+    options = options or {}
+    tasks = []
+    staged = []  # (étape de traitement, chemin brut, chemin dans le staging)
+
+    zip_path = os.path.join(raw_dir, "api_logs.zip")
+    if os.path.isfile(zip_path):
+        staged.append(("api_logs", zip_path, os.path.join(staging_dir, "api_logs", "api_logs.zip")))
+    session_dir = os.path.join(raw_dir, "user_sessions")
+    if os.path.isdir(session_dir):
+        for name in sorted(os.listdir(session_dir)):
+            if name.startswith("sessions_") and name.endswith(".csv"):
+                staged.append(("sessions", os.path.join(session_dir, name),
+                               os.path.join(staging_dir, "user_sessions", name)))
+    for name in SALES_FILES:
+        if os.path.isfile(os.path.join(raw_dir, name)):
+            staged.append((infer_stage(name), os.path.join(raw_dir, name),
+                           os.path.join(staging_dir, "sales_data", name)))
+
+    # Sous-workers des processeurs : comme worker_pool.py, le budget partagé entre les fichiers
+    split_workers = max(1, workers // max(1, len(staged)))
+    validations = []
+    for stage, raw_path, staged_path in staged:
+        name = os.path.basename(raw_path)
+        tasks.append(Task(f"stage:{name}", "discovery", "stage",
+                          {"raw_path": raw_path, "staged_path": staged_path, "link": stage == "api_logs",
+                           "force": options.get("force", False)},
+                          inputs=[raw_path], outputs=[staged_path]))
+
+        stage_options = {"force": options.get("force", False)}
+        if stage in ("api_logs", "sessions"):
+            stage_options["workers"] = split_workers
+        if stage == "api_logs":
+            stage_options["chunksize"] = options.get("chunksize", 100_000)
+        tasks.append(Task(f"process:{name}", "processing", "process",
+                          {"stage": stage, "input_path": staged_path, "options": stage_options},
+                          inputs=[staged_path], outputs=[os.path.join(ENRICHED_DIR, ENRICHED_DATASETS[stage])]))
+
+        # Validation : ne dépend que du fichier déposé (pas du traitement)
+        if stage == "api_logs":
+            members = api_log_members(raw_path, member_root=staged_path)
+        else:
+            members = [staged_path]
+        for member in members:
+            filename = os.path.basename(member)
+            source = infer_source(filename)
+            if source is None:
+                continue
+            validations.append(f"validate:{filename}")
+            tasks.append(Task(validations[-1], "quality", "validate",
+                              {"input_path": member, "source": source, "options": options.get("validation", {})},
+                              inputs=[staged_path],
+                              outputs=[os.path.join(QUALITY_DIR, f"validation_report_{filename}.json")]))
+
+    join_config = options.get("join", {})
+    tasks.append(Task("join", "consolidation", "join", {"options": join_config},
+                      inputs=[os.path.join(ENRICHED_DIR, ENRICHED_DATASETS[s]) for s in JOIN_STAGES],
+                      outputs=[JOINED_PATH]))
+    tasks.append(Task("alerts", "alerts", "script",
+                      {"path": "monitoring/alert_manager.py", "args": [], "stage": "alerts"},
+                      after=validations, always=True))
+    tasks.append(Task("dashboard", "dashboard", "script",
+                      {"path": "monitoring/dashboard_gen.py", "args": [], "stage": "dashboard"},
+                      after=["join", "alerts"], always=True))
+    return tasks
+
+
+def link_tasks(tasks: List[Task]) -> Dict[str, Task]:
+    """
+    Relie chaque tâche aux producteurs de ses entrées ; refuse les cycles.
+    """
+    by_name = {t.name: t for t in tasks}
+    producers = {}
+    for t in tasks:
+        for path in t.outputs:
+            producers.setdefault(path, []).append(t)
+    for t in tasks:
+        t.producers = [p for path in t.inputs for p in producers.get(path, []) if p is not t]
+        t.deps = list({id(d): d for d in t.producers + [by_name[n] for n in t.after]}.values())
+        for d in t.deps:
+            d.dependents.append(t)
+
+    # Tri topologique (Kahn) : tout reste non trié appartient à un cycle
+    remaining = {t.name: len(t.deps) for t in tasks}
+    queue = [t for t in tasks if not t.deps]
+    seen = 0
+    while queue:
+        t = queue.pop()
+        seen += 1
+        for d in t.dependents:
+            remaining[d.name] -= 1
+            if remaining[d.name] == 0:
+                queue.append(d)
+    if seen != len(tasks):
+        cycle = sorted(name for name, n in remaining.items() if n > 0)
+        raise ValueError(f"❌ Cycle dans le graphe de tâches : {', '.join(cycle)}")
+    return by_name
+
+
+def priorities(tasks: List[Task], estimates: Dict[str, float]) -> Dict[str, float]:
+    """
+    Durée estimée du plus long chemin partant de chaque tâche (durées du run précédent) :
+    à budget égal, les tâches prêtes les plus en amont du chemin critique passent d'abord.
+    """
+    rank = {}
+
+    def visit(t):
+        if t.name not in rank:
+            rank[t.name] = estimates.get(t.name, 1.0) + max((visit(d) for d in t.dependents), default=0.0)
+        return rank[t.name]
+
+    for t in tasks:
+        visit(t)
+    return rank
+
+
+def load_estimates(report_path: str = REPORT_PATH) -> Dict[str, float]:
+    try:
+        with open(report_path, encoding="utf-8") as f:
+            return json.load(f).get("estimates", {})
+    except (OSError, ValueError):
+        return {}
+
+
+def update_estimates(tasks: List[Task], previous: Dict[str, float]) -> Dict[str, float]:
+    """
+    Durées estimées pour le run suivant : une tâche exécutée garde le max entre sa durée
+    et la moitié de l'estimation précédente (un run incrémental, où le processeur saute
+    les contenus inchangés, n'efface pas d'un coup la durée d'un traitement complet).
+    """
+    estimates = dict(previous)
+    for t in tasks:
+        if t.status not in ("skipped", "upstream_failed"):
+            estimates[t.name] = round(max(t.ended_at - t.started_at, previous.get(t.name, 0.0) * 0.5), 3)
+    return estimates
+
+
+# ===============================
+# 🚦 Ordonnancement
+# ===============================
+
+def _available(path: str) -> bool:
+    return bool(list_dataset(path)) if os.path.isdir(path) else input_exists(path)
+
+
+def _decide(t: Task) -> Optional[str]:
+    """
+    Statut d'une tâche prête qui n'a pas à s'exécuter (None : à lancer).
+    """
+    if t.always:
+        return None
+    if any(d.status not in SUCCESS for d in t.deps):
+        return "upstream_failed"
+    if not all(_available(p) for p in t.inputs):
+        return "skipped"  # Entrée absente (fichier non déposé, dataset jamais produit)
+    if t.producers and all(d.status == "skipped" for d in t.producers) and t.outputs \
+            and all(_available(p) for p in t.outputs):
+        return "skipped"  # Entrées inchangées, sorties déjà présentes
+    return None
+
+
+def run_dag(tasks: List[Task], workers: int, timeout: Optional[float] = None,
+            estimates: Optional[Dict[str, float]] = None) -> float:
+    """
+    Exécute le graphe (déjà relié par link_tasks) sur `workers` processus persistants,
+    créés à la demande ; renvoie la durée totale.
+    Une tâche qui dépasse `timeout` secondes est interrompue (worker remplacé).
+    """
+    rank = priorities(tasks, estimates or {})
+    ctx = multiprocessing.get_context()
+    pool = {}
+    idle = set()
+    running = {}  # wid -> tâche
+    waiting = {t.name: len(t.deps) for t in tasks}
+    ready = []
+    origin = time.perf_counter()
+
+    def elapsed():
+        return time.perf_counter() - origin
+
+    def make_ready(t):
+        t.ready_at = elapsed()
+        ready.append(t)
+
+    def finish(t, status, error=None):
+        t.status, t.error = status, error
+        t.ended_at = elapsed()
+        if t.started_at is None:
+            t.started_at = t.ended_at
+        if status not in ("skipped", "upstream_failed") or error:
+            duration = t.ended_at - t.started_at
+            print(f"{'✅' if status == 'ok' else '❌'} [{t.stage}] {t.name} : {status} ({duration:.1f} s)")
+        for d in t.dependents:
+            waiting[d.name] -= 1
+            if waiting[d.name] == 0:
+                make_ready(d)
+
+    def replace(wid):
+        process, conn = pool[wid]
+        if process.is_alive():
+            process.terminate()
+        process.join()
+        conn.close()
+        pool[wid] = _spawn(ctx)
+
+    for t in tasks:
+        if not t.deps:
+            make_ready(t)
+
+    try:
+        while ready or running:
+            # Tâches prêtes : statut immédiat (sautée, amont en échec) ou lancement par priorité
+            while ready:
+                ready.sort(key=lambda t: rank[t.name])
+                t = ready[-1]
+                status = _decide(t)
+                if status is not None:
+                    ready.pop()
+                    finish(t, status)
+                    continue
+                if not idle and len(pool) < workers:
+                    wid = len(pool)
+                    pool[wid] = _spawn(ctx)
+                    idle.add(wid)
+                if not idle:
+                    break
+                ready.pop()
+                wid = idle.pop()
+                t.started_at = elapsed()
+                pool[wid][1].send((t.name, t.stage, t.action, t.kwargs))
+                running[wid] = t
+
+            if not running:
+                continue
+            conns = {pool[wid][1]: wid for wid in running}
+            for conn in wait(list(conns), timeout=1):
+                wid = conns[conn]
+                t = running.pop(wid)
+                try:
+                    msg = conn.recv()
+                    finish(t, msg["status"], msg["error"])
+                except EOFError:
+                    # Le worker est mort pendant la tâche (crash, OOM killer...)
+                    finish(t, "crashed", "worker terminé")
+                    replace(wid)
+                idle.add(wid)
+
+            if timeout:
+                for wid, t in list(running.items()):
+                    if elapsed() - t.started_at > timeout:
+                        del running[wid]
+                        finish(t, "timeout", f"processing_timeout ({timeout} s) dépassé")
+                        replace(wid)
+                        idle.add(wid)
+    finally:
+        for process, conn in pool.values():
+            try:
+                conn.send(None)
+            except (BrokenPipeError, OSError):
+                pass
+        for process, conn in pool.values():
+            process.join(timeout=5)
+            if process.is_alive():
+                process.terminate()
+
+    return elapsed()
+
+
+def critical_path(tasks: List[Task]) -> List[Task]:
+    """
+    Chemin critique observé : depuis la dernière tâche terminée, remonte à chaque fois
+    la dépendance terminée le plus tard (celle qui a retenu la tâche).
+    """
+    done = [t for t in tasks if t.ended_at is not None]
+    if not done:
+        return []
+    path = [max(done, key=lambda t: t.ended_at)]
+    while path[-1].deps:
+        path.append(max(path[-1].deps, key=lambda t: t.ended_at))
+    return path[::-1]
+
+
+def print_critical_path(path: List[Task]) -> None:
+    print("⛓️  Chemin critique :")
+    for t in path:
+        # Attente : tâche prête mais faute de worker libre (budget atteint)
+        wait_s = t.started_at - t.ready_at
+        flag = f"  ⏳ attente worker {wait_s:.1f} s" if wait_s >= 0.05 else ""
+        print(f"   {t.name:<45} {t.ended_at - t.started_at:>8.2f} s  [{t.status}]{flag}")
+    if path:
+        print(f"   Total : {path[-1].ended_at:.2f} s")
+
+
+def record_stage_metrics(tasks: List[Task]) -> None:
+    """
+    Un enregistrement par étape (comme resource_monitor.sh) : durée entre le début de sa
+    première tâche et la fin de sa dernière, CPU / volumes / pic de RSS de ses tâches.
+    """
+    records = [r for r in load_metrics(run=run_id()) if r["level"] == "task"]
+    for stage in dict.fromkeys(t.stage for t in tasks):
+        ran = [t for t in tasks if t.stage == stage and t.status not in ("skipped", "upstream_failed")]
+        if not ran:
+            continue
+        stage_records = [r for r in records if r["stage"] == stage]
+        counts = {key: sum(r.get(key, 0) for r in stage_records) for key in COUNTERS}
+        status = "ok" if all(t.status == "ok" for t in ran) else "failed"
+        wall = max(t.ended_at for t in ran) - min(t.started_at for t in ran)
+        write_record(build_record("stage", stage, None, status, wall,
+                                  sum(r["cpu_s"] for r in stage_records),
+                                  int(max((r["peak_rss_mb"] for r in stage_records), default=0) * 1024 ** 2),
+                                  counts))
+    export_prometheus(load_metrics(run=run_id()))
+
+
+# ===============================
+# 🌟 CLI
+# ===============================
+
+def main() -> None:
+    config = load_pipeline_config()
+    with open(os.path.join(PIPELINE_ROOT, "config", "quality_thresholds.yaml"), encoding="utf-8") as f:
+        thresholds = yaml.safe_load(f) or {}
+
+    parser = argparse.ArgumentParser(description="Exécution du pipeline en graphe de tâches (DAG)")
+    parser.add_argument('--raw-dir', default=RAW_DIR)
+    parser.add_argument('--staging-dir', default=STAGING_DIR)
+    parser.add_argument('--workers', type=int, default=config.get("data_workers", 1),
+                        help="Budget de workers (tâches simultanées)")
+    parser.add_argument('--timeout', type=float, default=config.get("processing_timeout"),
+                        help="Timeout par tâche en secondes (processing_timeout)")
+    parser.add_argument('--threshold', type=int, default=thresholds.get("global_threshold"),
+                        help="Seuil de complétude minimum (%%)")
+    parser.add_argument('--chunksize', type=int, default=100_000, help="Taille des chunks des logs API (lignes)")
+    parser.add_argument('--force', action='store_true', help="Ignorer le manifest et tout retraiter")
+    parser.add_argument('--dry-run', action='store_true', help="Afficher le graphe sans l'exécuter")
+    args = parser.parse_args()
+
+    workers = max(1, args.workers or 1)
+    options = {
+        "force": args.force,
+        "chunksize": args.chunksize,
+        "validation": {"threshold": args.threshold, "check_schema": True,
+                       "check_anomalies": True, "check_coherence": True},
+        "join": {"mode": config.get("join_mode", "memory"), "shards": config.get("join_shards", 16),
+                 "workers": config.get("join_workers", 1)},
+    }
+    try:
+        tasks = build_tasks(args.raw_dir, args.staging_dir, workers, options)
+        link_tasks(tasks)
+    except (OSError, ValueError) as e:
+        print(f"❌ Construction du graphe impossible : {e}")
+        sys.exit(1)
+
+    if args.dry_run:
+        for t in tasks:
+            print(f"{t.name:<45} [{t.stage}] ← {', '.join(d.name for d in t.deps) or '-'}")
+        sys.exit(0)
+
+    print(f"🕸️  {len(tasks)} tâches, budget de {workers} workers")
+    current_run = run_id()  # Fixé avant les workers : toutes les tâches enregistrent le même run
+    started_at = datetime.now(timezone.utc).isoformat().replace("+00:00", "Z")
+    estimates = load_estimates()
+    duration = run_dag(tasks, workers, args.timeout, estimates)
+    path = critical_path(tasks)
+    print_critical_path(path)
+    record_stage_metrics(tasks)
+
+    report = {
+        "run_id": current_run,
+        "started_at": started_at,
+        "workers": workers,
+        "duration_s": round(duration, 3),
+        "nb_tasks": len(tasks),
+        "nb_ok": sum(t.status == "ok" for t in tasks),
+        "critical_path": [t.name for t in path],
+        "critical_path_s": round(path[-1].ended_at, 3) if path else 0.0,
+        "tasks": [
+            {"name": t.name, "stage": t.stage, "status": t.status, "error": t.error,
+             "deps": [d.name for d in t.deps],
+             "ready_s": round(t.ready_at, 3), "start_s": round(t.started_at, 3), "end_s": round(t.ended_at, 3),
+             "duration_s": round(t.ended_at - t.started_at, 3)}
+            for t in tasks
+        ],
+        "estimates": update_estimates(tasks, estimates),
+    }
+    os.makedirs(os.path.dirname(REPORT_PATH), exist_ok=True)
+    with open(REPORT_PATH, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=4, ensure_ascii=False)
+    print(f"📝 Rapport du DAG : {REPORT_PATH}")
+    sys.exit(0 if all(t.status in SUCCESS for t in tasks if t.stage in ("discovery", "processing", "consolidation"))
+             else 1)
+
+
+if __name__ == "__main__":
+    main()
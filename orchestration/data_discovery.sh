@@ -14,34 +14,23 @@ RAW_ARCHIVE="$ARCHIVE_DIR/archive_raw_$TIMESTAMP.tar.gz"
 
 mkdir -p "$ARCHIVE_DIR"
 
+# 🗂️ Manifest des contenus déjà traités (hash SHA-256, taille, mtime, sorties)
+MANIFEST="python3 $PIPELINE_ROOT/orchestration/manifest.py"
+
 echo "🟡 Démarrage du scan dans $RAW_DIR" | tee -a "$LOG_FILE"
 
-# 1. Traitement de l'archive api_logs.zip (limitée à 10 fichiers .json.gz décompressés)
+# 1. Archive api_logs.zip : plus d'extraction ni de gunzip dans staging/ ; un lien symbolique
+#    suffit, api_log_processor.py et data_validator.py lisent les membres .json.gz en flux.
+#    Les membres inchangés (CRC-32 + taille du zip) sont ensuite sautés via le manifest.
+#    Nombre de membres lus : `api_logs_max_members` de pipeline_config.yaml (tous par défaut).
 API_LOGS_ZIP="$RAW_DIR/api_logs.zip"
-API_LOGS_DONE="$RAW_DIR/api_logs.zip.done"
-API_LOGS_TMP="$STAGING_DIR/api_logs_tmp"
-
-if [ -f "$API_LOGS_ZIP" ] && [ ! -f "$API_LOGS_DONE" ]; then
-    echo "📦 Extraction limitée de api_logs.zip (10 fichiers)" | tee -a "$LOG_FILE"
-    mkdir -p "$API_LOGS_TMP" "$STAGING_DIR/api_logs"
-    
-    # Liste les fichiers .json.gz dans l'archive et extrait les 10 premiers
-    unzip -Z1 "$API_LOGS_ZIP" '*.json.gz' | while read -r file; do
-        unzip -j "$API_LOGS_ZIP" "$file" -d "$API_LOGS_TMP" >> "$LOG_FILE"
-    done
-
-    # Décompression gunzip
-    for gzfile in "$API_LOGS_TMP"/*.json.gz; do
-        filename=$(basename "$gzfile" .gz)
-        gunzip -c "$gzfile" > "$STAGING_DIR/api_logs/$filename"
-        # echo "📄 Décompressé : $filename" | tee -a "$LOG_FILE"
-    done
 
-    rm -rf "$API_LOGS_TMP"
-    touch "$API_LOGS_DONE"
-    echo "✅ api_logs.zip extrait (10 fichiers) et marqué .done" | tee -a "$LOG_FILE"
+if [ -f "$API_LOGS_ZIP" ]; then
+    mkdir -p "$STAGING_DIR/api_logs"
+    ln -sfn "$(realpath "$API_LOGS_ZIP")" "$STAGING_DIR/api_logs/api_logs.zip"
+    echo "📦 api_logs.zip référencé dans staging (lecture en flux, sans extraction)" | tee -a "$LOG_FILE"
 else
-    echo "⏭️  api_logs.zip déjà traité ou absent" | tee -a "$LOG_FILE"
+    echo "⏭️  api_logs.zip absent" | tee -a "$LOG_FILE"
 fi
 
 
@@ -53,14 +42,13 @@ mkdir -p "$SESSION_DEST"
 if [ -d "$SESSION_SRC" ]; then
     find "$SESSION_SRC" -maxdepth 1 -type f -name "sessions_*.csv" | while read -r file; do
         filename=$(basename "$file")
-        done_marker="$SESSION_SRC/$filename.done"
 
-        if [ ! -f "$done_marker" ]; then
-            cp "$file" "$SESSION_DEST/$filename"
-            touch "$done_marker"
+        # Contenu inchangé et sorties du traitement présentes : pas de re-staging
+        if ! $MANIFEST check --input "$file"; then
+            cp -p "$file" "$SESSION_DEST/$filename"
             echo "📥 Session copiée : $filename" | tee -a "$LOG_FILE"
         else
-            echo "⏭️  Session déjà traitée : $filename" | tee -a "$LOG_FILE"
+            echo "⏭️  Session inchangée déjà traitée : $filename" | tee -a "$LOG_FILE"
         fi
     done
 else
@@ -72,13 +60,11 @@ fi
 mkdir -p "$STAGING_DIR/sales_data"
 for sales_file in "products_catalog.csv" "products_catalog.xlsx" "users_database.csv"; do
     src_file="$RAW_DIR/$sales_file"
-    done_marker="$RAW_DIR/$sales_file.done"
-    if [ -f "$src_file" ] && [ ! -f "$done_marker" ]; then
-        cp "$src_file" "$STAGING_DIR/sales_data/$sales_file"
-        touch "$done_marker"
+    if [ -f "$src_file" ] && ! $MANIFEST check --input "$src_file"; then
+        cp -p "$src_file" "$STAGING_DIR/sales_data/$sales_file"
         echo "📥 Fichier ventes copié : $sales_file" | tee -a "$LOG_FILE"
     else
-        echo "⏭️  Fichier déjà traité ou absent : $sales_file" | tee -a "$LOG_FILE"
+        echo "⏭️  Fichier inchangé déjà traité ou absent : $sales_file" | tee -a "$LOG_FILE"
     fi
 done
 
@@ -0,0 +1,251 @@
+#!/usr/bin/env python3
+# 🗂️ Manifest persistant (SQLite) des entrées traitées : hash de contenu, taille, mtime, sorties
+
+import os
+import sys
+import json
+import sqlite3
+import hashlib
+import argparse
+from datetime import datetime, timezone
+from typing import Iterable, List, Optional
+
+PIPELINE_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, PIPELINE_ROOT)
+
+from transformations.data_zip import input_exists, member_fingerprint, split_archive_path
+
+DEFAULT_DB = os.path.join(PIPELINE_ROOT, "data", "manifest.sqlite")
+HASH_BLOCK_SIZE = 1024 * 1024
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS inputs (
+    stage TEXT NOT NULL,
+    name TEXT NOT NULL,
+    content_hash TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    mtime REAL NOT NULL,
+    processed_at TEXT NOT NULL,
+    PRIMARY KEY (stage, name)
+);
+CREATE TABLE IF NOT EXISTS outputs (
+    stage TEXT NOT NULL,
+    name TEXT NOT NULL,
+    output_path TEXT NOT NULL,
+    PRIMARY KEY (stage, name, output_path)
+);
+CREATE TABLE IF NOT EXISTS hash_cache (
+    path TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    mtime REAL NOT NULL,
+    content_hash TEXT NOT NULL
+);
+"""
+
+
+def infer_stage(filename: str) -> Optional[str]:
+    """
+    Étape de traitement associée à un fichier (mêmes règles que worker_manager.sh).
+    """
+    if filename.startswith("api_logs_") and filename.endswith((".json", ".json.gz")):
+        return "api_logs"
+    elif filename == "api_logs.zip":
+        return "api_logs"
+    elif filename.startswith("sessions_") and filename.endswith(".csv"):
+        return "sessions"
+    elif filename == "users_database.csv":
+        return "users"
+    elif filename in ("products_catalog.csv", "products_catalog.xlsx"):
+        return "products"
+    return None
+
+
+def connect(db_path: str = DEFAULT_DB) -> sqlite3.Connection:
+    """
+    Ouvre le manifest (WAL + timeout pour les workers concurrents) et crée le schéma.
+    """
+    os.makedirs(os.path.dirname(db_path), exist_ok=True)
+    conn = sqlite3.connect(db_path, timeout=30)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.executescript(SCHEMA)
+    return conn
+
+
+def content_hash(conn: sqlite3.Connection, path: str) -> str:
+    """
+    SHA-256 du contenu, réutilisé depuis le cache tant que taille et mtime sont inchangées.
+    Pour un membre d'archive zip : CRC-32 + taille du répertoire central, sans décompression.
+    """
+    if split_archive_path(path) is not None:
+        return member_fingerprint(path)[0]
+    abs_path = os.path.abspath(path)
+    stat = os.stat(abs_path)
+    value = cached_hash(conn, abs_path, stat)
+    if value:
+        return value
+
+    digest = hashlib.sha256()
+    with open(abs_path, "rb") as f:
+        for block in iter(lambda: f.read(HASH_BLOCK_SIZE), b""):
+            digest.update(block)
+    value = digest.hexdigest()
+    with conn:
+        store_hash(conn, abs_path, stat, value)
+    return value
+
+
+def cached_hash(conn: sqlite3.Connection, abs_path: str, stat: os.stat_result) -> Optional[str]:
+    """
+    SHA-256 en cache pour ce fichier s'il n'a changé ni de taille ni de mtime.
+    """
+    row = conn.execute(
+        "SELECT content_hash FROM hash_cache WHERE path = ? AND size = ? AND mtime = ?",
+        (abs_path, stat.st_size, stat.st_mtime),
+    ).fetchone()
+    return row[0] if row else None
+
+
+def store_hash(conn: sqlite3.Connection, abs_path: str, stat: os.stat_result, value: str) -> None:
+    conn.execute(
+        "INSERT OR REPLACE INTO hash_cache (path, size, mtime, content_hash) VALUES (?, ?, ?, ?)",
+        (abs_path, stat.st_size, stat.st_mtime, value),
+    )
+
+
+def file_hash(path: str, db_path: str = DEFAULT_DB) -> str:
+    """
+    Hash de contenu d'un fichier ou d'un membre d'archive (cache du manifest).
+    """
+    conn = connect(db_path)
+    try:
+        return content_hash(conn, path)
+    finally:
+        conn.close()
+
+
+def _to_relative(path: str) -> str:
+    return os.path.relpath(os.path.abspath(path), PIPELINE_ROOT)
+
+
+def is_up_to_date(stage: str, input_path: str, db_path: str = DEFAULT_DB) -> bool:
+    """
+    Vrai si ce contenu (même nom, même hash) a déjà été traité par `stage`
+    et que toutes les sorties enregistrées existent encore. Chaque étape produit au
+    moins une sortie (pièce enrichie) : aucune sortie enregistrée → à retraiter.
+    """
+    conn = connect(db_path)
+    try:
+        name = os.path.basename(input_path)
+        row = conn.execute(
+            "SELECT content_hash FROM inputs WHERE stage = ? AND name = ?", (stage, name)
+        ).fetchone()
+        if row is None or row[0] != content_hash(conn, input_path):
+            return False
+        outputs = conn.execute(
+            "SELECT output_path FROM outputs WHERE stage = ? AND name = ?", (stage, name)
+        ).fetchall()
+        return bool(outputs) and all(os.path.exists(os.path.join(PIPELINE_ROOT, o[0])) for o in outputs)
+    finally:
+        conn.close()
+
+
+def record_processing(stage: str, input_path: str, outputs: Iterable[str] = (),
+                      db_path: str = DEFAULT_DB) -> None:
+    """
+    Enregistre le traitement d'une entrée (hash, taille, mtime) et les sorties produites.
+    """
+    conn = connect(db_path)
+    try:
+        name = os.path.basename(input_path)
+        if split_archive_path(input_path) is not None:
+            value, size, mtime = member_fingerprint(input_path)
+        else:
+            stat = os.stat(input_path)
+            value, size, mtime = content_hash(conn, input_path), stat.st_size, stat.st_mtime
+        with conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO inputs (stage, name, content_hash, size, mtime, processed_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (stage, name, value, size, mtime, datetime.now(timezone.utc).isoformat().replace("+00:00", "Z")),
+            )
+            conn.execute("DELETE FROM outputs WHERE stage = ? AND name = ?", (stage, name))
+            conn.executemany(
+                "INSERT OR IGNORE INTO outputs (stage, name, output_path) VALUES (?, ?, ?)",
+                [(stage, name, _to_relative(o)) for o in outputs],
+            )
+    finally:
+        conn.close()
+
+
+def recorded_outputs(stage: str, input_path: str, db_path: str = DEFAULT_DB) -> List[str]:
+    """
+    Sorties enregistrées lors du dernier traitement de cette entrée (chemins absolus).
+    """
+    conn = connect(db_path)
+    try:
+        rows = conn.execute(
+            "SELECT output_path FROM outputs WHERE stage = ? AND name = ?", (stage, os.path.basename(input_path))
+        ).fetchall()
+    finally:
+        conn.close()
+    return [os.path.join(PIPELINE_ROOT, row[0]) for row in rows]
+
+
+def list_entries(db_path: str = DEFAULT_DB) -> List[dict]:
+    """
+    Contenu du manifest (une entrée par étape / fichier) avec le nombre de sorties.
+    """
+    conn = connect(db_path)
+    try:
+        rows = conn.execute(
+            "SELECT i.stage, i.name, i.content_hash, i.size, i.processed_at, COUNT(o.output_path) "
+            "FROM inputs i LEFT JOIN outputs o ON o.stage = i.stage AND o.name = i.name "
+            "GROUP BY i.stage, i.name ORDER BY i.stage, i.name"
+        ).fetchall()
+    finally:
+        conn.close()
+    keys = ["stage", "name", "content_hash", "size", "processed_at", "nb_outputs"]
+    return [dict(zip(keys, row)) for row in rows]
+
+
+# ===============================
+# 🌟 CLI (utilisée par data_discovery.sh)
+# ===============================
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Manifest des entrées traitées (traitement incrémental)")
+    parser.add_argument('--db', default=DEFAULT_DB, help="Chemin de la base SQLite du manifest")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    check = sub.add_parser("check", help="Code retour 0 si l'entrée est inchangée et ses sorties à jour")
+    check.add_argument('--input', required=True)
+    check.add_argument('--stage', help="Étape (déduite du nom de fichier par défaut)")
+
+    record = sub.add_parser("record", help="Enregistre une entrée traitée et ses sorties")
+    record.add_argument('--input', required=True)
+    record.add_argument('--stage', help="Étape (déduite du nom de fichier par défaut)")
+    record.add_argument('--output', action='append', default=[], help="Sortie produite (répétable)")
+
+    sub.add_parser("status", help="Affiche le contenu du manifest (JSON)")
+    args = parser.parse_args()
+
+    if args.command == "status":
+        print(json.dumps(list_entries(args.db), indent=4, ensure_ascii=False))
+        sys.exit(0)
+
+    stage = args.stage or infer_stage(os.path.basename(args.input))
+    if stage is None:
+        print(f"⚠️  Étape inconnue pour : {args.input}")
+        sys.exit(2)
+    if not input_exists(args.input):
+        print(f"❌ Fichier introuvable : {args.input}")
+        sys.exit(2)
+
+    if args.command == "check":
+        sys.exit(0 if is_up_to_date(stage, args.input, args.db) else 1)
+    record_processing(stage, args.input, args.output, args.db)
+    sys.exit(0)
+
+
+if __name__ == "__main__":
+    main()
@@ -6,6 +6,8 @@ PIPELINE_ROOT="$(dirname "$0")/.."   # Répertoire racine du pipeline
 LOG_DIR="$PIPELINE_ROOT/logs"        # Répertoire pour stocker les fichiers de log
 mkdir -p "$LOG_DIR"                  # Création du dossier logs si nécessaire
 LOG_FILE="$LOG_DIR/pipeline_$(date '+%Y%m%d_%H%M%S').log"  # Fichier de log horodaté
+export PIPELINE_RUN_ID="$(date '+%Y%m%d_%H%M%S')"   # Identifiant du run dans les métriques de ressources
+MONITOR="$PIPELINE_ROOT/orchestration/resource_monitor.sh"  # Mesure des ressources de chaque étape
 
 
 
@@ -36,7 +38,7 @@ initialize_data_pipeline() {
     echo "🔧 Initialisation de l'environnement..." | tee -a "$LOG_FILE"
 
     # Vérifie que tous les répertoires de données existent (création si nécessaire)
-    for dir in raw staging processed quality archive; do
+    for dir in raw staging processed quality archive metrics; do
         mkdir -p "$PIPELINE_ROOT/data/$dir"
     done
 
@@ -88,18 +90,18 @@ initialize_data_pipeline() {
 scan_data_sources() {
     echo "🔎 Scan des nouvelles sources de données..." | tee -a "$LOG_FILE"
     # Appel du script dédié à la découverte des fichiers à traiter
-    "$PIPELINE_ROOT/orchestration/data_discovery.sh" >> "$LOG_FILE" 2>&1
+    bash "$MONITOR" discovery "$PIPELINE_ROOT/orchestration/data_discovery.sh" >> "$LOG_FILE" 2>&1
 }
 
 distribute_processing() {
     echo "⚙️ Lancement du traitement avec $DATA_WORKERS workers..." | tee -a "$LOG_FILE"
     # Appel du gestionnaire de traitement parallèle avec passage du nombre de workers
-    "$PIPELINE_ROOT/orchestration/worker_manager.sh" "$DATA_WORKERS" "$CHUNK_SIZE_MB" >> "$LOG_FILE" 2>&1
+    bash "$MONITOR" processing "$PIPELINE_ROOT/orchestration/worker_manager.sh" "$DATA_WORKERS" "$CHUNK_SIZE_MB" >> "$LOG_FILE" 2>&1
 }
 
 monitor_data_quality() {
     echo "🧪 Vérification qualité..." | tee -a "$LOG_FILE"
-    bash "$PIPELINE_ROOT/orchestration/quality_monitor.sh" "$QUALITY_THRESHOLD" >> "$LOG_FILE" 2>&1
+    bash "$MONITOR" quality bash "$PIPELINE_ROOT/orchestration/quality_monitor.sh" "$QUALITY_THRESHOLD" >> "$LOG_FILE" 2>&1
 }
 run_alert_manager() {
     echo "📣 Analyse des alertes qualité..." | tee -a "$LOG_FILE"
@@ -117,7 +119,7 @@ consolidate_data_results() {
     echo "📦 consolidation des résultats multi-sources..." | tee -a "$LOG_FILE"
 
     # Appel du script de jointure Python
-    python3  "$PIPELINE_ROOT/transformations/data_joiner.py" >> "$LOG_FILE" 2>&1
+    bash "$MONITOR" consolidation python3 "$PIPELINE_ROOT/transformations/data_joiner.py" >> "$LOG_FILE" 2>&1
 
     # Vérification du résultat
     if [ $? -eq 0 ]; then
@@ -131,37 +133,47 @@ consolidate_data_results() {
 archive_processed_data() {
     echo "📁 Archivage complet des données..." | tee -a "$LOG_FILE"
 
-    ARCHIVE_ROOT="$PIPELINE_ROOT/data/archive"
-    TIMESTAMP=$(date +"%Y%m%d_%H%M")
-    ARCHIVE_DIR="$ARCHIVE_ROOT/archive_$TIMESTAMP"
-    mkdir -p "$ARCHIVE_DIR"
-
-    # 1. Archiver les données traitées
-    echo "📦 Archivage de data/processed" | tee -a "$LOG_FILE"
-    cp -r "$PIPELINE_ROOT/data/processed" "$ARCHIVE_DIR/processed"
-
-    # 2. Archiver les rapports qualité
-    echo "📦 Archivage de data/quality" | tee -a "$LOG_FILE"
-    cp -r "$PIPELINE_ROOT/data/quality" "$ARCHIVE_DIR/quality"
-
-    # 3. Compression unique
-    TAR_PATH="$ARCHIVE_ROOT/archive_$TIMESTAMP.tar.gz"
-    tar -czf "$TAR_PATH" -C "$ARCHIVE_ROOT" "archive_$TIMESTAMP"
-    echo "🗜️ Archive compressée : $TAR_PATH" | tee -a "$LOG_FILE"
-
-    # 4. Nettoyage du dossier temporaire d'archive
-    rm -rf "$ARCHIVE_DIR"
-    echo "🧹 Dossier intermédiaire supprimé." | tee -a "$LOG_FILE"
+    # 1. Magasin adressé par contenu (data/archive/objects) : seuls les fichiers nouveaux ou
+    #    modifiés depuis le run précédent sont compressés et écrits, un manifeste JSON par run
+    echo "📦 Archivage de data/processed et data/quality" | tee -a "$LOG_FILE"
+    python3 "$PIPELINE_ROOT/orchestration/archive_store.py" --workers "$DATA_WORKERS" archive 2>&1 | tee -a "$LOG_FILE"
+    if [ "${PIPESTATUS[0]}" -ne 0 ]; then
+        echo "❌ Échec de l'archivage, staging conservé" | tee -a "$LOG_FILE"
+        return 1
+    fi
 
-    # 5. Suppression des fichiers raw et staging (sans supprimer les dossiers)
+    # 2. Suppression des fichiers raw et staging (sans supprimer les dossiers)
     echo "🧼 Nettoyage de data/raw et data/staging" | tee -a "$LOG_FILE"
     # find "$PIPELINE_ROOT/data/raw" -type f ! -name "*.zip" -exec rm -f {} \;
     find "$PIPELINE_ROOT/data/staging" -type f -exec rm -f {} \;
+    # Copies Arrow des entrées parsées (transformations/data_cache.py) : leurs fichiers de staging sont purgés
+    rm -rf "$PIPELINE_ROOT/data/cache/parsed"
+    # Anciens marqueurs .done (remplacés par le manifest data/manifest.sqlite, conservé)
     find "$PIPELINE_ROOT/data/raw" -type f -name "*.done" -exec rm -f {} \;
 
     echo "✅ Archivage complet terminé." | tee -a "$LOG_FILE"
 }
 
+run_pipeline_dag() {
+    echo "🕸️  Exécution en graphe de tâches ($DATA_WORKERS workers)..." | tee -a "$LOG_FILE"
+    # Staging, traitement et validation par fichier, jointure dès que ses entrées existent,
+    # puis alertes et dashboard ; chemin critique dans logs/dag_report.json
+    python3 "$PIPELINE_ROOT/orchestration/dag_runner.py" --workers "$DATA_WORKERS" >> "$LOG_FILE" 2>&1
+
+    if [ $? -eq 0 ]; then
+        echo "✅ Graphe de tâches terminé." | tee -a "$LOG_FILE"
+    else
+        echo "❌ Des tâches de staging, traitement ou consolidation ont échoué (voir logs/dag_report.json)." | tee -a "$LOG_FILE"
+    fi
+    # Chemin critique du run
+    sed -n '/Chemin critique/,/Total/p' "$LOG_FILE" | tail -n 20
+}
+
+report_resource_usage() {
+    echo "⏱️ Ressources par étape (data/metrics/pipeline_metrics.prom) :" | tee -a "$LOG_FILE"
+    python3 "$PIPELINE_ROOT/monitoring/data_metrics.py" show | tee -a "$LOG_FILE"
+}
+
 generate_dashboard() {
     echo "📊 Génération du dashboard HTML..." | tee -a "$LOG_FILE"
     "$PIPELINE_ROOT/monitoring/dashboard_gen.py" >> "$LOG_FILE" 2>&1
@@ -181,12 +193,18 @@ generate_dashboard() {
 echo "🚀 DÉMARRAGE DU PIPELINE À $(date)" | tee -a "$LOG_FILE"
 
 initialize_data_pipeline        # Étape d'initialisation => dev ok
-scan_data_sources               # Détection des fichiers nouveaux => dev ok
-distribute_processing           # Lancement du traitement des données => dev ok
-consolidate_data_results          # (optionnel) Fusion des résultats => dev ok
-monitor_data_quality            # Contrôle qualité avant-traitement => dev ok
-run_alert_manager
-generate_dashboard              # Génére le tableau de bord html de la qualité de donnée
+if [ "${PIPELINE_MODE:-dag}" = "sequential" ]; then
+    # Enchaînement historique, étape par étape
+    scan_data_sources               # Détection des fichiers nouveaux => dev ok
+    distribute_processing           # Lancement du traitement des données => dev ok
+    consolidate_data_results          # (optionnel) Fusion des résultats => dev ok
+    monitor_data_quality            # Contrôle qualité avant-traitement => dev ok
+    run_alert_manager
+    generate_dashboard              # Génére le tableau de bord html de la qualité de donnée
+else
+    run_pipeline_dag                # Découverte, traitement, qualité, consolidation, alertes, dashboard
+fi
+report_resource_usage           # Durée, CPU, mémoire et volumes par étape / par tâche
 # archive_processed_data          # Archivage des fichiers traités
 echo "✅ PIPELINE TERMINÉ À $(date)" | tee -a "$LOG_FILE"
 # 🧹 Correction des permissions pour le runner GitHub
@@ -17,44 +17,26 @@ QUALITY_THRESHOLD=$(yq '.global_threshold' "$CONFIG_DIR/quality_thresholds.yaml"
 
 echo "🔍 Début des contrôles qualité sur $STAGING_DIR"
 
-# Parcours des fichiers en staging
-find "$STAGING_DIR" -type f | while read -r file; do
-    filename=$(basename "$file")
-    echo "➡️  Analyse de $filename"
-
-    # Déduire le type (logs, sessions, users, etc.)
-    if [[ "$filename" == api_logs_* ]]; then
-        source_type="logs"
-    elif [[ "$filename" == sessions_* ]]; then
-        source_type="sessions"
-    elif [[ "$filename" == users_* ]]; then
-        source_type="users"
-    elif [[ "$filename" == products_* ]]; then
-        source_type="products"
-    else
-        echo "⚠️  Type inconnu (tag) : $filename" >> "$QUALITY_LOG"
-        continue
-    fi
-
-    # Appel du validateur Python
-    # Appel du script Python de validation (nouvelle version)
-    python3 "$PIPELINE_ROOT/processing/data_validator.py" \
-        --input "$file" \
-        --source "$source_type" \
-        --threshold "$QUALITY_THRESHOLD" \
-        --check-schema \
-        --check-anomalies \
-        --check-coherence
-
-
-    # Récupération du code retour
-    if [[ $? -ne 0 ]]; then
-        echo "🚫 Fichier rejeté : $filename" >> "$QUALITY_LOG"
-    else
-        echo "✅ Qualité OK : $filename"
-    fi
-
-done
+# Nombre de processus de validation (un seul interpréteur Python, configs chargées une fois)
+DATA_WORKERS=$(yq '.data_workers' "$CONFIG_DIR/pipeline_config.yaml")
+SUMMARY_FILE="$PIPELINE_ROOT/data/quality/validation_summary.json"
+rm -f "$SUMMARY_FILE"
+
+# Appel du validateur Python en mode batch sur tout le staging
+python3 "$PIPELINE_ROOT/processing/data_validator.py" \
+    --input-dir "$STAGING_DIR" \
+    --workers "$DATA_WORKERS" \
+    --threshold "$QUALITY_THRESHOLD" \
+    --check-schema \
+    --check-anomalies \
+    --check-coherence
+
+# Récupération des fichiers rejetés / non reconnus depuis le résumé
+if [ -f "$SUMMARY_FILE" ]; then
+    jq -r '.skipped[] | "⚠️  Type inconnu (tag) : \(.)"' "$SUMMARY_FILE" >> "$QUALITY_LOG"
+    jq -r '.files[] | select(.status != "passed") | "🚫 Fichier rejeté : \(.filename)"' "$SUMMARY_FILE" >> "$QUALITY_LOG"
+    jq -r '.files[] | select(.status == "passed") | "✅ Qualité OK : \(.filename)"' "$SUMMARY_FILE"
+fi
 
 echo "🧪 Contrôle qualité terminé."
 
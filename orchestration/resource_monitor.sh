@@ -0,0 +1,24 @@
+#!/bin/bash
+# ======================================
+# ⏱️ resource_monitor.sh - Mesure des ressources d'une étape du pipeline
+# ======================================
+# Usage : resource_monitor.sh <étape> <commande> [arguments...]
+# Lance la commande et enregistre durée, temps CPU, pic de RSS, lignes et octets
+# (somme des tâches de l'étape) dans data/metrics/pipeline_metrics.jsonl, puis met à
+# jour l'export Prometheus data/metrics/pipeline_metrics.prom. Le code retour est
+# celui de la commande.
+
+PIPELINE_ROOT="$(dirname "$0")/.."
+
+if [ "$#" -lt 2 ]; then
+    echo "❌ Usage : $0 <étape> <commande> [arguments...]"
+    exit 2
+fi
+
+STAGE="$1"
+shift
+
+# Identifiant commun à toutes les étapes d'un même run (fixé par pipeline_master.sh)
+export PIPELINE_RUN_ID="${PIPELINE_RUN_ID:-$(date '+%Y%m%d_%H%M%S')}"
+
+python3 "$PIPELINE_ROOT/monitoring/data_metrics.py" run --stage "$STAGE" -- "$@"
@@ -7,6 +7,7 @@ NB_WORKERS="$1"
 
 PIPELINE_ROOT="$(dirname "$0")/.."
 STAGING_DIR="$PIPELINE_ROOT/data/staging"
+CONFIG_DIR="$PIPELINE_ROOT/config"
 LOG_FILE="$PIPELINE_ROOT/logs/pipeline.log"
 
 echo "⚙️ Lancement des workers ($NB_WORKERS)..." | tee -a "$LOG_FILE"
@@ -18,49 +19,19 @@ if [ -z "$FILES_TO_PROCESS" ]; then
     exit 0
 fi
 
-# Fonction locale pour déterminer le type de traitement à appliquer selon le nom du fichier
-process_file() {
-    file="$1"
-    chunk_size="$2"
-    filename=$(basename "$file")
+# Timeout par fichier (secondes) depuis la configuration
+PROCESSING_TIMEOUT=$(yq '.processing_timeout' "$CONFIG_DIR/pipeline_config.yaml")
 
-    echo "▶️  Traitement de $filename" | tee -a "$LOG_FILE"
+# Pool de workers Python persistants : un seul import de pandas/openpyxl par worker,
+# les fichiers du staging sont distribués depuis une file d'attente (statut + durée par tâche
+# dans logs/processing_report.json)
+python3 "$PIPELINE_ROOT/orchestration/worker_pool.py" \
+    --staging-dir "$STAGING_DIR" \
+    --workers "$NB_WORKERS" \
+    --timeout "$PROCESSING_TIMEOUT" 2>&1 | tee -a "$LOG_FILE"
 
-    case "$filename" in
-        api_logs_*.json)
-            python3 "$PIPELINE_ROOT/processing/api_log_processor.py" --input "$file" ---chunksize "$chunk_size"
-            echo "🚀 Démarrage du worker $((i+1)) sur le fichier : $file" | tee -a "$LOG_FILE"
-            echo "🆔 PID du worker : $!" | tee -a "$LOG_FILE"
-            pids+=($!)
-            ;;
-        sessions_*.csv)
-            python3 "$PIPELINE_ROOT/processing/session_processor.py" --input "$file" 
-            echo "🚀 Démarrage du worker $((i+1)) sur le fichier : $file" | tee -a "$LOG_FILE"
-            echo "🆔 PID du worker : $!" | tee -a "$LOG_FILE"
-            pids+=($!)
-            ;;
-        users_database.csv)
-            python3 "$PIPELINE_ROOT/processing/business_processor.py" --input "$file"
-            echo "🚀 Démarrage du worker $((i+1)) sur le fichier : $file" | tee -a "$LOG_FILE"
-            echo "🆔 PID du worker : $!" | tee -a "$LOG_FILE"
-            pids+=($!)
-            ;;
-        products_catalog.csv|products_catalog.xlsx)
-            python3 "$PIPELINE_ROOT/processing/product_processor.py" --input "$file"
-            echo "🚀 Démarrage du worker $((i+1)) sur le fichier : $file" | tee -a "$LOG_FILE"
-            echo "🆔 PID du worker : $!" | tee -a "$LOG_FILE"
-            pids+=($!)
-            ;;
-        *)
-            echo "⚠️  Type de fichier inconnu ou non pris en charge : $filename" | tee -a "$LOG_FILE"
-            ;;
-    esac
-}
-
-# Utilisation de xargs pour exécuter les traitements en parallèle
-export -f process_file
-export PIPELINE_ROOT LOG_FILE
-
-find "$STAGING_DIR" -type f | xargs -P "$NB_WORKERS" -I{} bash -c 'process_file "$@"' _ {}
+if [ "${PIPESTATUS[0]}" -ne 0 ]; then
+    echo "⚠️  Certains fichiers n'ont pas pu être traités (voir logs/processing_report.json)" | tee -a "$LOG_FILE"
+fi
 
 echo "✅ Tous les fichiers ont été traités." | tee -a "$LOG_FILE"
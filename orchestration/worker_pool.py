@@ -0,0 +1,209 @@
+#!/usr/bin/env python3
+# ⚙️ Pool de workers Python persistants : chaque worker importe les processeurs une seule fois
+# puis enchaîne les fichiers du staging, avec un timeout par tâche (processing_timeout)
+
+import os
+import sys
+import json
+import time
+import argparse
+import importlib
+import multiprocessing
+from collections import deque
+from datetime import datetime, timezone
+from multiprocessing.connection import wait
+from typing import Dict, List, Optional, Tuple
+
+PIPELINE_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, PIPELINE_ROOT)
+
+from monitoring.data_metrics import track
+from orchestration.manifest import infer_stage
+from transformations.data_storage import load_pipeline_config
+
+# Étape (cf. manifest.infer_stage) → module processeur exposant run(input_path, **options)
+PROCESSOR_MODULES = {
+    "api_logs": "processing.api_log_processor",
+    "sessions": "processing.session_processor",
+    "users": "processing.business_processor",
+    "products": "processing.product_processor",
+}
+REPORT_PATH = os.path.join(PIPELINE_ROOT, "logs", "processing_report.json")
+
+
+def _worker_loop(conn, options: Dict[str, dict]) -> None:
+    """
+    Boucle d'un worker : imports une seule fois, puis une tâche à la fois reçue sur `conn`.
+    """
+    modules = {stage: importlib.import_module(name) for stage, name in PROCESSOR_MODULES.items()}
+    while True:
+        try:
+            task = conn.recv()
+        except EOFError:  # Parent disparu
+            break
+        if task is None:
+            break
+        task_id, stage, input_path = task
+        started = time.perf_counter()
+        error = None
+        try:
+            # Métriques de ressources de la tâche (data/metrics/pipeline_metrics.jsonl)
+            with track(f"{stage}:{os.path.basename(input_path)}", input_path=input_path) as metrics:
+                code = modules[stage].run(input_path, **options.get(stage, {}))
+                status = metrics["status"] = "ok" if code == 0 else "failed"
+        except BaseException as e:  # SystemExit inclus : un processeur ne doit pas tuer le worker
+            status, error = "error", repr(e)
+        sys.stdout.flush()
+        conn.send({"task_id": task_id, "status": status, "error": error,
+                   "duration_s": round(time.perf_counter() - started, 3), "pid": os.getpid()})
+    conn.close()
+
+
+def _spawn(ctx, options: Dict[str, dict]):
+    parent_conn, child_conn = ctx.Pipe()
+    # Non daemon : un processeur peut lui-même lancer des processus (découpage en plages d'octets)
+    process = ctx.Process(target=_worker_loop, args=(child_conn, options))
+    process.start()
+    child_conn.close()
+    return process, parent_conn
+
+
+def collect_tasks(files: List[str]) -> Tuple[List[tuple], List[str]]:
+    """
+    Associe chaque fichier à son processeur ; renvoie (tâches, fichiers non pris en charge).
+    """
+    tasks, unsupported = [], []
+    for path in files:
+        stage = infer_stage(os.path.basename(path))
+        if stage is None:
+            unsupported.append(path)
+        else:
+            tasks.append((len(tasks), stage, path))
+    return tasks, unsupported
+
+
+def run_pool(tasks: List[tuple], workers: int, timeout: Optional[float],
+             options: Dict[str, dict]) -> List[dict]:
+    """
+    Distribue les tâches sur `workers` processus persistants (file d'attente côté parent).
+    Une tâche qui dépasse `timeout` secondes est interrompue (worker remplacé).
+    """
+    ctx = multiprocessing.get_context()
+    pool = {}
+    for wid in range(min(workers, len(tasks))):
+        pool[wid] = _spawn(ctx, options)
+
+    pending = deque(tasks)
+    idle = set(pool)
+    running = {}  # wid -> (task, début)
+    results = []
+
+    def record(task, status, duration, error=None, pid=None):
+        task_id, stage, input_path = task
+        results.append({"task_id": task_id, "stage": stage, "input": input_path, "status": status,
+                        "duration_s": round(duration, 3), "error": error, "pid": pid})
+        print(f"{'✅' if status == 'ok' else '❌'} [{stage}] {os.path.basename(input_path)} : "
+              f"{status} ({duration:.1f} s)")
+
+    def replace(wid):
+        process, conn = pool[wid]
+        if process.is_alive():
+            process.terminate()
+        process.join()
+        conn.close()
+        pool[wid] = _spawn(ctx, options)
+
+    try:
+        while pending or running:
+            while idle and pending:
+                wid = idle.pop()
+                task = pending.popleft()
+                pool[wid][1].send(task)
+                running[wid] = (task, time.perf_counter())
+
+            conns = {pool[wid][1]: wid for wid in running}
+            for conn in wait(list(conns), timeout=1):
+                wid = conns[conn]
+                task, started = running.pop(wid)
+                try:
+                    msg = conn.recv()
+                    record(task, msg["status"], msg["duration_s"], msg["error"], msg["pid"])
+                except EOFError:
+                    # Le worker est mort pendant la tâche (crash, OOM killer...)
+                    record(task, "crashed", time.perf_counter() - started, "worker terminé")
+                    replace(wid)
+                idle.add(wid)
+
+            if timeout:
+                now = time.perf_counter()
+                for wid, (task, started) in list(running.items()):
+                    if now - started > timeout:
+                        del running[wid]
+                        record(task, "timeout", now - started, f"processing_timeout ({timeout} s) dépassé")
+                        replace(wid)
+                        idle.add(wid)
+    finally:
+        for process, conn in pool.values():
+            try:
+                conn.send(None)
+            except (BrokenPipeError, OSError):
+                pass
+        for process, conn in pool.values():
+            process.join(timeout=5)
+            if process.is_alive():
+                process.terminate()
+
+    return sorted(results, key=lambda r: r["task_id"])
+
+
+def main() -> None:
+    config = load_pipeline_config()
+    parser = argparse.ArgumentParser(description="Traitement parallèle du staging par un pool de workers persistants")
+    parser.add_argument('--staging-dir', default=os.path.join(PIPELINE_ROOT, "data", "staging"))
+    parser.add_argument('--workers', type=int, default=config.get("data_workers", 1))
+    parser.add_argument('--timeout', type=float, default=config.get("processing_timeout"),
+                        help="Timeout par tâche en secondes (processing_timeout)")
+    parser.add_argument('--chunksize', type=int, default=100_000, help="Taille des chunks des logs API (lignes)")
+    parser.add_argument('--force', action='store_true', help="Ignorer le manifest et tout retraiter")
+    args = parser.parse_args()
+
+    files = []
+    for root, _, names in os.walk(args.staging_dir):
+        files.extend(os.path.join(root, name) for name in sorted(names))
+    tasks, unsupported = collect_tasks(files)
+    for path in unsupported:
+        print(f"⚠️  Type de fichier inconnu ou non pris en charge : {os.path.basename(path)}")
+    if not tasks:
+        print("ℹ️ Aucun fichier à traiter dans staging/")
+        sys.exit(0)
+
+    options = {stage: {"force": args.force} for stage in PROCESSOR_MODULES}
+    options["api_logs"]["chunksize"] = args.chunksize
+    # Moins de fichiers que de workers : les cœurs restants servent à découper les gros fichiers
+    for stage in ("api_logs", "sessions"):
+        options[stage]["workers"] = max(1, args.workers // len(tasks))
+
+    print(f"⚙️ Lancement de {min(args.workers, len(tasks))} workers pour {len(tasks)} fichiers...")
+    started_at = datetime.now(timezone.utc).isoformat().replace("+00:00", "Z")
+    started = time.perf_counter()
+    results = run_pool(tasks, max(1, args.workers), args.timeout, options)
+
+    report = {
+        "started_at": started_at,
+        "workers": args.workers,
+        "timeout_s": args.timeout,
+        "duration_s": round(time.perf_counter() - started, 3),
+        "nb_tasks": len(results),
+        "nb_ok": sum(r["status"] == "ok" for r in results),
+        "unsupported": unsupported,
+        "tasks": results,
+    }
+    os.makedirs(os.path.dirname(REPORT_PATH), exist_ok=True)
+    with open(REPORT_PATH, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=4, ensure_ascii=False)
+    print(f"📝 Rapport des tâches : {REPORT_PATH}")
+    sys.exit(0 if report["nb_ok"] == report["nb_tasks"] else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -5,47 +5,185 @@ import os
 import sys
 import argparse
 import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
+from functools import partial
 
 # Ajout du chemin racine pour import des modules de transformations
 pipeline_root = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
 sys.path.insert(0, pipeline_root)
 
+from monitoring.data_metrics import add_counts, run_counted
+from monitoring.data_profiler import NO_PROFILER, StepProfiler
+from orchestration.manifest import is_up_to_date, record_processing, recorded_outputs
 from transformations.data_cleaner import clean_api_logs
 from transformations.data_enricher import enrich_api_logs
-from transformations.data_aggregator import aggregate_api_logs
+from transformations.data_aggregator import (
+    api_logs_state,
+    partial_aggregate_api_logs,
+    merge_api_logs_partials,
+)
 from transformations.data_formatter import export_api_logs_partitioned
+from transformations.data_categories import encode_categoricals
+from transformations.data_enricher import ENRICHED_DIR
+from transformations.data_reader import api_log_members, iter_source
+from transformations.data_splitter import should_split, split_chunk_ranges
+from transformations.data_storage import dataset_pieces, load_pipeline_config, remove_dataset_pieces
+from transformations.data_zip import input_exists
 
-# 🎯 Arguments CLI
-parser = argparse.ArgumentParser(description="Traitement des logs API")
-parser.add_argument('--input', required=True, help="Fichier JSONL (logs API ligne par ligne)")
-parser.add_argument('--chunksize', type=int, default=100_000, help="Taille des chunks (lignes)")
-args = parser.parse_args()
-
-input_path = args.input
-chunksize = args.chunksize
-
-if not os.path.exists(input_path):
-    print(f"❌ Fichier introuvable : {input_path}")
-    sys.exit(1)
-
-# 📥 Lecture du JSON ligne par ligne en chunks
-try:
-    chunks = pd.read_json(input_path, lines=True, chunksize=chunksize)
-except Exception as e:
-    print(f"❌ Erreur de lecture JSONL en chunks : {e}")
-    sys.exit(1)
-
-# 💾 Accumulation des morceaux nettoyés et enrichis
-processed_chunks = []
-
-for i, chunk in enumerate(chunks):
-    print(f"🔢 Traitement du chunk {i + 1}...")
-    chunk_cleaned = clean_api_logs(chunk)
-    chunk_enriched = enrich_api_logs(chunk_cleaned, input_path)
-    processed_chunks.append(chunk_enriched)
-
-# 🧱 Concaténation + agrégation
-df_full = pd.concat(processed_chunks, ignore_index=True)
-df_agg = aggregate_api_logs(df_full)
-export_api_logs_partitioned(df_agg, input_path)
+
+def process_chunk(chunk: pd.DataFrame, input_path: str, chunk_id: int, streaming: bool,
+                  profiler: StepProfiler = NO_PROFILER) -> pd.DataFrame:
+    """
+    Nettoie et enrichit un chunk ; en streaming, le réduit en agrégat partiel.
+    """
+    print(f"🔢 Traitement du chunk {chunk_id + 1}...")
+    with profiler.step("clean"):
+        chunk_cleaned = clean_api_logs(chunk)
+    with profiler.step("enrich"):
+        chunk_enriched = enrich_api_logs(chunk_cleaned, input_path, chunk_id=chunk_id)
+    if streaming:
+        with profiler.step("aggregate"):
+            return partial_aggregate_api_logs(chunk_enriched)
+    return chunk_enriched
+
+
+def process_range(task: tuple) -> list:
+    """
+    Traite une plage d'octets du fichier (alignée sur les chunks) dans un processus à part.
+    """
+    input_path, start, end, first_chunk_id, chunksize, streaming = task
+    chunks = iter_source(input_path, "logs", chunksize, byte_range=(start, end))
+    return [process_chunk(chunk, input_path, first_chunk_id + i, streaming) for i, chunk in enumerate(chunks)]
+
+
+def run_archive(zip_path: str, chunksize: int = 100_000, streaming: bool = True, force: bool = False,
+                workers: int = 1, profile: bool = False) -> int:
+    """
+    Traite les membres .json.gz d'une archive (api_logs.zip) sans rien extraire : chaque
+    membre est décompressé en flux, par chunks, et traité comme un fichier à part entière
+    (manifest, pièces enrichies). Avec workers > 1, les membres sont traités en parallèle
+    (en séquence avec profile, pour profiler chaque membre dans ce processus).
+    """
+    members = api_log_members(zip_path)
+    if not members:
+        print(f"ℹ️ Aucun fichier .json.gz dans {zip_path}")
+        return 0
+    print(f"📦 {len(members)} fichiers lus en flux depuis {os.path.basename(zip_path)}")
+
+    options = {"chunksize": chunksize, "streaming": streaming, "force": force, "profile": profile}
+    if workers <= 1 or len(members) == 1 or profile:
+        return max(run(member, **options) for member in members)
+
+    codes = []
+    with ProcessPoolExecutor(max_workers=min(workers, len(members))) as pool:
+        futures = {pool.submit(run_counted, run, member, **options): member for member in members}
+        for future, member in futures.items():
+            try:
+                code, counts = future.result()
+                add_counts(**counts)  # Volumes lus et écrits dans le sous-processus
+                codes.append(code)
+            except Exception as e:
+                print(f"❌ Erreur de traitement de {os.path.basename(member)} : {e}")
+                codes.append(1)
+    return max(codes)
+
+
+def run(input_path: str, chunksize: int = 100_000, streaming: bool = True, force: bool = False,
+        workers: int = 1, profile: bool = False) -> int:
+    """
+    Traite un fichier JSONL de logs API (éventuellement .gz ou membre d'archive zip) et
+    renvoie un code retour (0 = succès). Appelable directement par le pool de workers.
+    Avec workers > 1, un gros fichier est découpé en plages d'octets traitées en parallèle.
+    Avec profile, les étapes sont profilées dans ce processus (pas de découpage) et le
+    rapport est écrit dans data/quality/.
+    """
+    if input_path.endswith(".zip") and os.path.isfile(input_path):
+        return run_archive(input_path, chunksize=chunksize, streaming=streaming, force=force, workers=workers,
+                           profile=profile)
+
+    if not input_exists(input_path):
+        print(f"❌ Fichier introuvable : {input_path}")
+        return 1
+
+    # ⏭️ Entrée inchangée et sorties présentes : rien à refaire (manifest)
+    if not force and is_up_to_date("api_logs", input_path):
+        print(f"⏭️  Fichier inchangé déjà traité : {input_path}")
+        return 0
+
+    # 🧹 Pièces enrichies d'un traitement précédent de ce fichier (le nombre de chunks peut changer)
+    remove_dataset_pieces(os.path.join(ENRICHED_DIR, "logs_enriched"), input_path)
+
+    profiler = StepProfiler("api_logs", input_path, enabled=profile)
+    if not profile and should_split(input_path, workers):
+        # ✂️ Plages alignées sur les chunks : mêmes chunks, mêmes pièces qu'en séquentiel
+        ranges = split_chunk_ranges(input_path, chunksize, workers)
+        print(f"✂️  Fichier découpé en {len(ranges)} plages traitées en parallèle")
+        tasks = [(input_path, start, end, first_chunk_id, chunksize, streaming)
+                 for start, end, first_chunk_id in ranges]
+        try:
+            results = []
+            with ProcessPoolExecutor(max_workers=len(tasks)) as pool:
+                for range_results, counts in pool.map(partial(run_counted, process_range), tasks):
+                    add_counts(**counts)  # Volumes lus et écrits dans le sous-processus
+                    results.extend(range_results)
+        except ValueError as e:
+            print(f"❌ Erreur de lecture JSONL en chunks : {e}")
+            return 1
+    else:
+        # 📥 Lecture du JSON ligne par ligne en chunks typés (schéma logs)
+        try:
+            with profiler.step("read"):
+                chunks = iter_source(input_path, "logs", chunksize, column_profile=True)
+        except Exception as e:
+            print(f"❌ Erreur de lecture JSONL en chunks : {e}")
+            return 1
+        results = (process_chunk(chunk, input_path, i, streaming, profiler)
+                   for i, chunk in enumerate(profiler.iterate("read", chunks)))
+
+    if streaming:
+        # 🌊 Mode streaming : agrégats partiels fusionnés au fil de l'eau (dans l'ordre des chunks)
+        state = None
+        for df_part in results:
+            with profiler.step("aggregate"):
+                state = merge_api_logs_partials(state, df_part)
+        with profiler.step("aggregate"):
+            df_state = api_logs_state(state)
+    else:
+        # 🧱 Concaténation des chunks nettoyés et enrichis + agrégation
+        # (recodage : un chunk a pu compléter un dictionnaire de catégories)
+        chunks_enriched = list(results)
+        with profiler.step("aggregate"):
+            df_full = encode_categoricals(pd.concat(chunks_enriched, ignore_index=True))
+            df_state = api_logs_state(partial_aggregate_api_logs(df_full))
+
+    # 💾 État additif fusionné dans les partitions par date (KPI recalculés sur tous les fichiers)
+    with profiler.step("export"):
+        outputs = export_api_logs_partitioned(df_state, input_path,
+                                              previous_outputs=recorded_outputs("api_logs", input_path))
+        outputs += dataset_pieces(os.path.join(ENRICHED_DIR, "logs_enriched"), input_path)
+        record_processing("api_logs", input_path, outputs)
+    profiler.report()
+    return 0
+
+
+def main() -> None:
+    # 🎯 Arguments CLI
+    parser = argparse.ArgumentParser(description="Traitement des logs API")
+    parser.add_argument('--input', required=True,
+                        help="Fichier JSONL (logs API ligne par ligne), .json.gz ou archive api_logs.zip")
+    parser.add_argument('--chunksize', type=int, default=100_000, help="Taille des chunks (lignes)")
+    parser.add_argument('--streaming', action=argparse.BooleanOptionalAction, default=True,
+                        help="Agrégation en flux par agrégats partiels (mémoire constante)")
+    parser.add_argument('--force', action='store_true', help="Retraiter même si le fichier est inchangé (manifest)")
+    parser.add_argument('--workers', type=int, default=load_pipeline_config().get("data_workers", 1),
+                        help="Processus pour découper un gros fichier en plages d'octets")
+    parser.add_argument('--profile', action='store_true',
+                        help="Profiler chaque étape (cProfile + tracemalloc), rapport dans data/quality/")
+    args = parser.parse_args()
+    sys.exit(run(args.input, chunksize=args.chunksize, streaming=args.streaming, force=args.force,
+                 workers=args.workers, profile=args.profile))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+# Percentiles SLO des logs API par catégorie d'endpoint, sur plusieurs jours, à partir
+# des sketches persistés dans les KPI (aucune relecture des logs bruts)
+
+import os
+import sys
+import glob
+import json
+import argparse
+import pandas as pd
+from datetime import datetime, timezone
+
+# 📁 Ajout du chemin racine pour import relatif
+pipeline_root = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, pipeline_root)
+
+from transformations.data_aggregator import rollup_api_logs
+from transformations.data_formatter import PROCESSED_ROOT
+from transformations.data_storage import read_table
+
+QUALITY_DIR = os.path.join(pipeline_root, "data", "quality")
+
+
+def load_api_logs_kpi(start: str = None, end: str = None) -> pd.DataFrame:
+    """
+    Charge les partitions KPI data/processed/api_logs/<date>/ comprises entre start et end
+    (YYYY-MM-DD, bornes incluses) en rajoutant la colonne date.
+    """
+    frames = []
+    for partition in sorted(glob.glob(os.path.join(PROCESSED_ROOT, "api_logs", "*"))):
+        date = os.path.basename(partition)
+        if (start and date < start) or (end and date > end):
+            continue
+        for path in sorted(glob.glob(os.path.join(partition, "*_kpi.*"))):
+            frames.append(read_table(path).assign(date=date))
+    if not frames:
+        return pd.DataFrame()
+    return pd.concat(frames, ignore_index=True)
+
+
+def run(by: list, start: str = None, end: str = None) -> int:
+    """
+    Calcule et écrit data/quality/api_slo_report.json ; renvoie un code retour (0 = succès).
+    """
+    df_kpi = load_api_logs_kpi(start, end)
+    if df_kpi.empty:
+        print("❌ Aucun KPI de logs API trouvé pour la période")
+        return 1
+    missing = [col for col in by if col not in df_kpi.columns]
+    if missing:
+        print(f"❌ Colonnes inconnues : {missing}")
+        return 1
+
+    try:
+        df_slo = rollup_api_logs(df_kpi, by)
+    except ValueError as e:
+        print(e)
+        return 1
+    df_slo = df_slo[[c for c in df_slo.columns if not c.startswith(("hll_", "sketch_"))]]
+
+    print(df_slo.to_string(index=False))
+    os.makedirs(QUALITY_DIR, exist_ok=True)
+    report_path = os.path.join(QUALITY_DIR, "api_slo_report.json")
+    report = {
+        "generated_at": datetime.now(timezone.utc).isoformat().replace("+00:00", "Z"),
+        "period": {"start": df_kpi["date"].min(), "end": df_kpi["date"].max()},
+        "by": by,
+        "groups": json.loads(df_slo.to_json(orient="records")),
+    }
+    with open(report_path, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=4, ensure_ascii=False)
+    print(f"📝 Rapport SLO sauvegardé : {report_path}")
+    return 0
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Percentiles SLO des logs API (fusion des sketches journaliers)")
+    parser.add_argument('--by', nargs='+', default=["category"],
+                        help="Dimensions de regroupement (category, method, country_code, date)")
+    parser.add_argument('--start', help="Première date incluse (YYYY-MM-DD)")
+    parser.add_argument('--end', help="Dernière date incluse (YYYY-MM-DD)")
+    args = parser.parse_args()
+    sys.exit(run(args.by, start=args.start, end=args.end))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,5 @@
 import sys
 import argparse
-import pandas as pd
 import os
 from datetime import datetime
 
@@ -8,53 +7,91 @@ from datetime import datetime
 pipeline_root = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
 sys.path.insert(0, pipeline_root)
 
-# ==============================
-# 🎯 Argument en ligne de commande
-# ==============================
+from monitoring.data_profiler import StepProfiler
+from orchestration.manifest import is_up_to_date, record_processing
+from transformations.data_cleaner import clean_user_data
+from transformations.data_enricher import ENRICHED_DIR, enrich_user_data
+from transformations.data_aggregator import aggregate_user_data
+from transformations.data_formatter import export_user_data_partitioned
+from transformations.data_reader import read_source
+from transformations.data_storage import dataset_pieces, remove_dataset_pieces
 
-parser = argparse.ArgumentParser(description="Analyse des ventes web")
-parser.add_argument('--input', required=True, help="Fichier CSV des ventes utilisateur")
-args = parser.parse_args()
-input_path = args.input
 
-# ==============================
-# 📥 Lecture du fichier
-# ==============================
+def run(input_path: str, force: bool = False, profile: bool = False) -> int:
+    """
+    Traite la base utilisateurs / ventes et renvoie un code retour (0 = succès).
+    Avec profile, les étapes sont profilées et le rapport est écrit dans data/quality/.
+    """
 
-if not os.path.exists(input_path):
-    print(f"❌ Fichier introuvable : {input_path}")
-    sys.exit(1)
+    # ==============================
+    # 📥 Lecture du fichier
+    # ==============================
 
-try:
-    df = pd.read_csv(input_path)
-except Exception as e:
-    print(f"❌ Erreur de lecture CSV : {e}")
-    sys.exit(1)
+    if not os.path.exists(input_path):
+        print(f"❌ Fichier introuvable : {input_path}")
+        return 1
 
-# ============================
-# 🧹 Nettoyage
-# ============================
-from transformations.data_cleaner import clean_user_data
-df = clean_user_data(df)
-print("🧹 Nettoyage OK")
-# ============================
-# ✨ Enrichissement
-# ============================
-from transformations.data_enricher import enrich_user_data
-df = enrich_user_data(df,input_path)
-print("✨ Enrichissement OK")
-# ============================
-# 📊 Agrégation
-# ============================
-from transformations.data_aggregator import aggregate_user_data
-df_agg = aggregate_user_data(df)
-print("📊 Agrégation OK")
-# ============================
-# 💾 Export partitionné
-# ============================
+    # ⏭️ Entrée inchangée et sorties présentes : rien à refaire (manifest)
+    if not force and is_up_to_date("users", input_path):
+        print(f"⏭️  Fichier inchangé déjà traité : {input_path}")
+        return 0
 
-from transformations.data_formatter import export_user_data_partitioned
-export_user_data_partitioned(df_agg, input_path)
-print("💾 Export OK")
-print("✅ Traitement des ventes terminé.")
-sys.exit(0)
\ No newline at end of file
+    # 🧹 Pièce enrichie d'un traitement précédent de ce fichier
+    remove_dataset_pieces(os.path.join(ENRICHED_DIR, "sales_enriched"), input_path)
+
+    profiler = StepProfiler("users", input_path, enabled=profile)
+    try:
+        with profiler.step("read"):
+            df = read_source(input_path, "users", column_profile=True)
+    except Exception as e:
+        print(f"❌ Erreur de lecture CSV : {e}")
+        return 1
+
+    # ============================
+    # 🧹 Nettoyage
+    # ============================
+    with profiler.step("clean"):
+        df = clean_user_data(df)
+    print("🧹 Nettoyage OK")
+    # ============================
+    # ✨ Enrichissement
+    # ============================
+    with profiler.step("enrich"):
+        df = enrich_user_data(df, input_path)
+    print("✨ Enrichissement OK")
+    # ============================
+    # 📊 Agrégation
+    # ============================
+    with profiler.step("aggregate"):
+        df_agg = aggregate_user_data(df)
+    print("📊 Agrégation OK")
+    # ============================
+    # 💾 Export partitionné
+    # ============================
+
+    with profiler.step("export"):
+        outputs = export_user_data_partitioned(df_agg, input_path)
+        outputs += dataset_pieces(os.path.join(ENRICHED_DIR, "sales_enriched"), input_path)
+        record_processing("users", input_path, outputs)
+    profiler.report()
+    print("💾 Export OK")
+    print("✅ Traitement des ventes terminé.")
+    return 0
+
+
+def main() -> None:
+    # ==============================
+    # 🎯 Argument en ligne de commande
+    # ==============================
+
+    parser = argparse.ArgumentParser(description="Analyse des ventes web")
+    parser.add_argument('--input', required=True, help="Fichier CSV des ventes utilisateur")
+    parser.add_argument('--force', action='store_true', help="Retraiter même si le fichier est inchangé (manifest)")
+    parser.add_argument('--profile', action='store_true',
+                        help="Profiler chaque étape (cProfile + tracemalloc), rapport dans data/quality/")
+    args = parser.parse_args()
+    sys.exit(run(args.input, force=args.force, profile=args.profile))
+
+
+if __name__ == "__main__":
+    main()
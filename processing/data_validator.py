@@ -3,205 +3,533 @@
 
 import sys
 import argparse
+import numpy as np
 import pandas as pd
 import os
 import json
+import time
 import yaml
-from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from typing import List, Optional
 
-# ===============================
-# 🌟 CLI Arguments
-# ===============================
-
-parser = argparse.ArgumentParser(description="Validation de qualité des fichiers de données")
-parser.add_argument('--input', required=True, help="Fichier CSV à valider")
-parser.add_argument('--source', required=True, help="Type de données : logs, sessions, products, users")
-parser.add_argument('--threshold', type=int, help="Seuil de complétude minimum (%)")
-parser.add_argument('--check-schema', action='store_true', help="Valider le schéma")
-parser.add_argument('--check-anomalies', action='store_true', help="Détecter les anomalies statistiques")
-parser.add_argument('--check-coherence', action='store_true', help="Contrôles inter-fichiers")
-args = parser.parse_args()
-
-# ===============================
-# 💾 Chargement des fichiers
-# ===============================
-
-if not os.path.exists(args.input):
-    print(f"❌ Fichier introuvable : {args.input}")
-    sys.exit(1)
-
-ext = os.path.splitext(args.input)[1].lower()
+PIPELINE_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, PIPELINE_ROOT)
 
-try:
-    if ext == ".csv":
-        df = pd.read_csv(args.input)
-    elif ext == ".json":
-        df = pd.read_json(args.input, lines=False)  # ajuste si JSONL
-    elif ext == ".xlsx":
-        df = pd.read_excel(args.input, engine="openpyxl")
-    else:
-        raise ValueError(f"Format non supporté : {ext}")
-except Exception as e:
-    print(f"❌ Erreur de lecture : {e}")
-    sys.exit(1)
+from monitoring.anomaly_detector import AnomalyDetector, anomaly_settings
+from monitoring.data_metrics import run_id
+from monitoring.data_profiler import StepProfiler
+from monitoring.quality_store import record_report
+from transformations.data_profile import ColumnProfile, load_profile
+from transformations.data_reader import api_log_members, read_source
 
-filename = os.path.basename(args.input)
-validation_passed = True
-errors = []
+CONFIG_DIR = os.path.join(PIPELINE_ROOT, "config")
+QUALITY_DIR = os.path.join(PIPELINE_ROOT, "data", "quality")
 
 # ===============================
 # 📚 Chargement des configurations
 # ===============================
-PIPELINE_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
-CONFIG_DIR = os.path.join(PIPELINE_ROOT, "config")
 
-try:
+def load_configs() -> dict:
+    """
+    Charge une seule fois les schémas, règles métier, seuils qualité et config pipeline.
+    """
     with open(os.path.join(CONFIG_DIR, "data_schemas.json")) as f:
         schema_config = json.load(f)
     with open(os.path.join(CONFIG_DIR, "business_rules.yaml")) as f:
-        business_rules = yaml.safe_load(f)
+        business_rules = yaml.safe_load(f) or {}
     with open(os.path.join(CONFIG_DIR, "quality_thresholds.yaml")) as f:
-        thresholds = yaml.safe_load(f)
-        global_threshold = thresholds.get("global_threshold", 95)
-except Exception as e:
-    print(f"❌ Erreur chargement des fichiers de configuration : {e}")
-    sys.exit(1)
+        thresholds = yaml.safe_load(f) or {}
+    pipeline_config = {}
+    if os.path.exists(os.path.join(CONFIG_DIR, "pipeline_config.yaml")):
+        with open(os.path.join(CONFIG_DIR, "pipeline_config.yaml")) as f:
+            pipeline_config = yaml.safe_load(f) or {}
+    return {
+        "schemas": schema_config,
+        "business_rules": business_rules,
+        "thresholds": thresholds,
+        "pipeline": pipeline_config,
+    }
+
 
 # ===============================
-# 🔢 Validation du schéma
+# 💾 Chargement des fichiers
 # ===============================
 
-source_schema = schema_config.get(args.source)
-
-if source_schema is None or "required_columns" not in source_schema:
-    errors.append(f"⚠️ Aucun schéma défini pour la source : {args.source}")
-    validation_passed = False
-else:
-    expected_columns = list(source_schema["required_columns"].keys())
-    missing_columns = [col for col in expected_columns if col not in df.columns]
-    if missing_columns:
-        for col in missing_columns:
-            errors.append(f"Colonne manquante (schema) : {col}")
-        validation_passed = False
+def read_input(input_path: str, source: Optional[str] = None, columns: Optional[List[str]] = None) -> pd.DataFrame:
+    """
+    Lit un fichier CSV, JSONL ou XLSX à valider, typé selon le schéma de la source.
+    Les valeurs non conformes restent brutes pour être comptées par les contrôles de type,
+    et ne sont pas encodées (elles n'ont pas à entrer dans les dictionnaires de catégories).
+    Une lecture complète calcule au passage le profil de colonnes s'il n'est pas en cache.
+    """
+    return read_source(input_path, source, columns=columns, coerce=False, categorical=False,
+                       column_profile=columns is None)
+
+
+def infer_source(filename: str) -> Optional[str]:
+    """
+    Déduit le type de données à partir du nom de fichier (mêmes règles que quality_monitor.sh).
+    """
+    if filename.startswith("api_logs_"):
+        return "logs"
+    elif filename.startswith("sessions_"):
+        return "sessions"
+    elif filename.startswith("users_"):
+        return "users"
+    elif filename.startswith("products_"):
+        return "products"
+    return None
 
 
 # ===============================
-# 🔍 Règles métier (business rules)
+# 🔍 Règles métier + types (moteur compilé, une seule passe)
 # ===============================
 
-if args.source in business_rules:
-    rules = business_rules[args.source]
-    for col, constraints in rules.items():
-        if col not in df.columns:
-            continue
+def _compile_business_rules(source_rules: dict) -> list:
+    """
+    Compile les règles YAML d'une source en une liste de règles
+    (nom, colonne, fonction masque, message, test sur profil) évaluées sans copie de lignes.
+    Le test sur profil est vrai quand le profil de colonne prouve l'absence de violation.
+    """
+    compiled = []
+    for col, constraints in (source_rules or {}).items():
         for rule, value in constraints.items():
             if rule == "allowed_range":
                 min_v, max_v = value
-                violations = df[~df[col].between(min_v, max_v)]
-                if not violations.empty:
-                    errors.append(f"{len(violations)} valeurs hors intervalle {value} pour '{col}'")
-                    validation_passed = False
-
+                mask = lambda s, a=min_v, b=max_v: ~s.between(a, b)
+                clean = lambda p, a=min_v, b=max_v: p["nulls"] == 0 and _within(p, a, b)
+                message = f"{{n}} valeurs hors intervalle {value} pour '{col}'"
             elif rule == "min_value":
-                violations = df[df[col] < value]
-                if not violations.empty:
-                    errors.append(f"{len(violations)} valeurs < {value} pour '{col}'")
-                    validation_passed = False
-
+                mask = lambda s, v=value: s < v
+                clean = lambda p, v=value: _within(p, low=v)
+                message = f"{{n}} valeurs < {value} pour '{col}'"
             elif rule == "max_value":
-                violations = df[df[col] > value]
-                if not violations.empty:
-                    errors.append(f"{len(violations)} valeurs > {value} pour '{col}'")
-                    validation_passed = False
-
+                mask = lambda s, v=value: s > v
+                clean = lambda p, v=value: _within(p, high=v)
+                message = f"{{n}} valeurs > {value} pour '{col}'"
             elif rule == "allowed_values":
-                violations = df[~df[col].isin(value)]
-                if not violations.empty:
-                    errors.append(f"{len(violations)} valeurs non autorisées pour '{col}'")
-                    validation_passed = False
-
+                mask = lambda s, v=value: ~s.isin(v)
+                clean = lambda p, v=value: p["nulls"] == 0 and p["values"] is not None and all(x in v for x in p["values"])
+                message = f"{{n}} valeurs non autorisées pour '{col}'"
             elif rule == "not_allowed_values":
-                violations = df[df[col].isin(value)]
-                if not violations.empty:
-                    errors.append(f"{len(violations)} valeurs interdites pour '{col}'")
-                    validation_passed = False
+                mask = lambda s, v=value: s.isin(v)
+                clean = lambda p, v=value: p["values"] is not None and not any(x in v for x in p["values"])
+                message = f"{{n}} valeurs interdites pour '{col}'"
+            else:
+                continue
+            compiled.append((f"{col}.{rule}", col, mask, message, clean))
+    return compiled
+
+
+def _within(column_profile: dict, low=None, high=None) -> bool:
+    """
+    Vrai si les valeurs (numériques) d'une colonne profilée restent dans [low, high].
+    """
+    if not column_profile["numeric"]:
+        return False
+    if column_profile["min"] is None:
+        return True  # Aucune valeur non nulle
+    return (low is None or column_profile["min"] >= low) and (high is None or column_profile["max"] <= high)
+
+
+BOOLEAN_VALUES = [True, False, "True", "False", "true", "false"]
+
+
+def _invalid_type_mask(s: pd.Series, expected: str) -> pd.Series:
+    """
+    Masque des valeurs non nulles qui ne respectent pas le type attendu du schéma.
+    """
+    if expected in ("integer", "float"):
+        if pd.api.types.is_bool_dtype(s):
+            return s.notna()
+        if pd.api.types.is_integer_dtype(s):
+            return pd.Series(False, index=s.index)
+        numeric = s if pd.api.types.is_float_dtype(s) else pd.to_numeric(s, errors="coerce")
+        invalid = s.notna() & numeric.isna()
+        if expected == "integer":
+            invalid |= numeric.notna() & (numeric % 1 != 0)
+        return invalid
+    if expected == "datetime":
+        if pd.api.types.is_datetime64_any_dtype(s):
+            return pd.Series(False, index=s.index)
+        parsed = pd.to_datetime(s, errors="coerce")
+        invalid = s.notna() & parsed.isna()
+        if invalid.any():
+            # Deuxième chance, uniquement sur les lignes en échec, pour les formats hétérogènes
+            reparsed = pd.to_datetime(s[invalid], errors="coerce", format="mixed")
+            invalid[invalid] = reparsed.isna()
+        return invalid
+    if expected == "boolean":
+        if pd.api.types.is_bool_dtype(s):
+            return pd.Series(False, index=s.index)
+        return s.notna() & ~s.isin(BOOLEAN_VALUES)
+    # "string" : toute valeur non nulle est acceptée
+    return pd.Series(False, index=s.index)
+
+
+def _compile_type_checks(required_columns: dict) -> list:
+    """
+    Transforme les types attendus de data_schemas.json en règles du même moteur.
+    """
+    return [
+        (f"{col}.type", col,
+         lambda s, t=expected: _invalid_type_mask(s, t),
+         f"{{n}} valeurs de type invalide (attendu : {expected}) pour '{col}'",
+         lambda p: p["conforms"] is True)
+        for col, expected in required_columns.items()
+        if expected != "string"
+    ]
+
+
+def evaluate_rules(df: pd.DataFrame, compiled_rules: list, sample_size: int = 10,
+                   clean: Optional[set] = None) -> dict:
+    """
+    Évalue toutes les règles compilées en une passe vectorisée. Les règles de `clean`
+    (tranchées par le profil de colonnes) sont comptées sans violation, sans lire la colonne.
+
+    Returns:
+        dict: violations par règle, messages d'erreur, bitmap ligne à ligne
+        (True = ligne en échec) et échantillons d'indices (positions) fautifs.
+    """
+    failed_rows = np.zeros(len(df), dtype=bool)
+    violations, samples, messages = {}, {}, []
+
+    for name, col, mask_fn, message, _ in compiled_rules:
+        if clean and name in clean:
+            violations[name] = 0
+            continue
+        if col not in df.columns:
+            continue
+        try:
+            mask = np.asarray(mask_fn(df[col]), dtype=bool)
+        except TypeError as e:
+            messages.append(f"Règle '{name}' inapplicable (type incompatible) : {e}")
+            continue
+        n = int(mask.sum())
+        violations[name] = n
+        if n:
+            failed_rows |= mask
+            samples[name] = np.flatnonzero(mask)[:sample_size].tolist()
+            messages.append(message.format(n=n))
+
+    return {
+        "violations": violations,
+        "messages": messages,
+        "failed_rows": failed_rows,
+        "samples": samples,
+    }
+
 
 # ===============================
-# 🔢 Anomalies simples
+# 🧪 Validation d'un fichier
 # ===============================
 
-if args.check_anomalies:
-    if 'duration_min' in df.columns:
-        anomalies = df[df['duration_min'] > 180]
-        if not anomalies.empty:
-            errors.append(f"{len(anomalies)} sessions > 3h détectées")
+def validate_file(input_path: str, source: str, configs: dict, threshold: Optional[int] = None,
+                  check_schema: bool = False, check_anomalies: bool = False,
+                  check_coherence: bool = False, profile: bool = False) -> dict:
+    """
+    Valide un fichier (schéma, règles métier, anomalies, complétude), écrit son rapport
+    JSON dans data/quality/, l'ajoute à l'historique des rapports et renvoie ce rapport.
+    Les erreurs de lecture sont propagées à l'appelant.
+    Si le profil de colonnes de ce contenu est en cache (calculé par le processeur),
+    complétude et règles qu'il suffit à trancher en sont déduites : seules les colonnes
+    restant à contrôler sont lues.
+    Avec profile, chaque étape est profilée (rapport profile_validator_<fichier> à côté).
+    """
+    profiler = StepProfiler("validator", input_path, enabled=profile)
+    filename = os.path.basename(input_path)
+    with profiler.step("read"):
+        file_profile = load_profile(input_path, source)
+        df = None
+        if file_profile is None:
+            df = read_input(input_path, source)
+            file_profile = load_profile(input_path, source) or _profile_frame(df)
+    profile_columns = list(file_profile["columns"])
+
+    validation_passed = True
+    errors = []
+
+    # 🔢 Validation du schéma
+    source_schema = configs["schemas"].get(source)
+
+    if source_schema is None or "required_columns" not in source_schema:
+        errors.append(f"⚠️ Aucun schéma défini pour la source : {source}")
+        validation_passed = False
+    else:
+        expected_columns = list(source_schema["required_columns"].keys())
+        missing_columns = [col for col in expected_columns if col not in profile_columns]
+        if missing_columns:
+            for col in missing_columns:
+                errors.append(f"Colonne manquante (schema) : {col}")
             validation_passed = False
 
-    if 'total_spent' in df.columns:
-        max_total = df['total_spent'].max()
-        if max_total > 10000:
-            errors.append(f"Montant très élevé : {max_total}")
-            validation_passed = False
+    # 🔍 Règles métier + types
+    compiled_rules = _compile_business_rules(configs["business_rules"].get(source))
+    if check_schema and source_schema is not None:
+        compiled_rules += _compile_type_checks(source_schema.get("required_columns", {}))
+
+    detector = None
+    if check_anomalies:
+        detector = AnomalyDetector(source, filename, anomaly_settings(configs["thresholds"]))
+
+    # Profil en cache : lecture limitée aux colonnes que le profil ne suffit pas à contrôler
+    clean = set()
+    if df is None:
+        clean = {name for name, col, _, _, is_clean in compiled_rules
+                 if col in file_profile["columns"] and is_clean(file_profile["columns"][col])}
+        needed = {col for name, col, *_ in compiled_rules if name not in clean}
+        if detector is not None:
+            needed.update(detector.columns)
+        columns_read = [col for col in profile_columns if col in needed]
+        with profiler.step("read"):
+            if columns_read:
+                df = read_input(input_path, source, columns=columns_read)
+            else:
+                df = pd.DataFrame(index=pd.RangeIndex(file_profile["rows"]))
+    else:
+        columns_read = profile_columns
 
-# ===============================
-# 🔄 Cohérence inter-fichiers
-# ===============================
+    with profiler.step("rules"):
+        rules_result = evaluate_rules(df, compiled_rules, sample_size=configs["thresholds"].get("violation_samples", 10),
+                                      clean=clean)
+    if rules_result["messages"]:
+        errors.extend(rules_result["messages"])
+        validation_passed = False
 
-# if args.check_coherence and 'user_id' in df.columns:
-#     duplicated_users = df[df['user_id'].duplicated(keep=False)]
-#     if not duplicated_users.empty:
-#         sample_duplicates = duplicated_users['user_id'].unique()[:10].tolist()
-#         errors.append(f"Duplications de user_id détectées : exemples {sample_duplicates}")
-#         validation_passed = False
+    # 🔢 Anomalies statistiques (limites absolues + écarts à la référence des fichiers précédents)
+    anomalies = None
+    if check_anomalies:
+        with profiler.step("anomalies"):
+            detector.update(df)
+            anomalies = detector.finish()
+        if anomalies["findings"]:
+            errors.extend(f["message"] for f in anomalies["findings"])
+            validation_passed = False
+
+    # 🔄 Cohérence inter-fichiers
+    # if check_coherence and 'user_id' in df.columns:
+    #     duplicated_users = df[df['user_id'].duplicated(keep=False)]
+    #     if not duplicated_users.empty:
+    #         sample_duplicates = duplicated_users['user_id'].unique()[:10].tolist()
+    #         errors.append(f"Duplications de user_id détectées : exemples {sample_duplicates}")
+    #         validation_passed = False
+
+    # 📊 Complétude (comptes de nulls du profil : pas de nouveau parcours des données)
+    total_cells = file_profile["rows"] * len(profile_columns)
+    missing_cells = sum(c["nulls"] for c in file_profile["columns"].values())
+    completeness = 100 * (1 - (missing_cells / total_cells)) if total_cells else 0.0
+    threshold = threshold if threshold else configs["thresholds"].get("global_threshold", 95)
+
+    if completeness < threshold:
+        errors.append(f"Complétude insuffisante ({completeness:.2f}%) < seuil {threshold}%")
+        validation_passed = False
+    else:
+        print(f"✅ Complétude : {completeness:.2f}%")
+
+    # 📃 Rapport JSON
+    report = {
+        "filename": filename,
+        "source": source,
+        "rows": int(file_profile["rows"]),
+        "columns": len(profile_columns),
+        "missing_values": int(missing_cells),
+        "completeness": round(completeness, 2),
+        "threshold": threshold,
+        "status": "passed" if validation_passed else "failed",
+        "validated_at": datetime.now(timezone.utc).isoformat().replace("+00:00", "Z"),
+        "rule_violations": rules_result["violations"],
+        "failed_rows": int(rules_result["failed_rows"].sum()),
+        "violation_samples": rules_result["samples"],
+        "anomalies": anomalies,
+        "profile": {"content_hash": file_profile.get("content_hash"), "columns_read": columns_read},
+        "errors": errors if errors else None
+    }
+
+    with profiler.step("report"):
+        write_report(report, rules_result["failed_rows"], filename)
+        record_report(report)
+    profiler.report()
+    return report
+
+
+def _profile_frame(df: pd.DataFrame) -> dict:
+    """
+    Profil calculé en mémoire quand le cache n'a pas pu être écrit ni relu.
+    """
+    column_profile = ColumnProfile()
+    column_profile.update_frame(df)
+    return column_profile.to_dict()
+
+
+def write_report(report: dict, failed_rows: np.ndarray, filename: str) -> str:
+    """
+    Écrit le rapport JSON et le bitmap des lignes en échec dans data/quality/.
+    """
+    # 📁 Chemin vers le dossier quality
+    os.makedirs(QUALITY_DIR, exist_ok=True)
+
+    # 📄 Nom du rapport JSON
+    report_path = os.path.join(QUALITY_DIR, f"validation_report_{filename}.json")
+
+    # 🧮 Bitmap ligne à ligne (1 bit par ligne, 1 = ligne en échec)
+    bitmap_path = os.path.join(QUALITY_DIR, f"validation_bitmap_{filename}.bin")
+    np.packbits(failed_rows).tofile(bitmap_path)
+    report["row_bitmap"] = {"path": os.path.relpath(bitmap_path, PIPELINE_ROOT), "encoding": "packbits", "rows": report["rows"]}
+
+    # 💾 Écriture
+    with open(report_path, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=4, ensure_ascii=False)
+
+    print(f"📝 Rapport sauvegardé : {report_path}")
+    return report_path
 
 
 # ===============================
-# 📊 Complétude
+# 📦 Mode batch (pool de processus)
 # ===============================
 
-total_cells = df.shape[0] * df.shape[1]
-missing_cells = df.isnull().sum().sum()
-completeness = 100 * (1 - (missing_cells / total_cells))
-threshold = args.threshold if args.threshold else global_threshold
+_WORKER_CONFIGS = None
+
+
+def _init_worker(configs: dict) -> None:
+    """
+    Initialise un worker du pool avec les configurations déjà chargées par le parent.
+    """
+    global _WORKER_CONFIGS
+    _WORKER_CONFIGS = configs
+
+
+def _validate_task(task: tuple) -> dict:
+    """
+    Valide un fichier dans un worker et renvoie une entrée du résumé.
+    """
+    input_path, source, options = task
+    started = time.perf_counter()
+    entry = {"filename": os.path.basename(input_path), "path": input_path, "source": source}
+    try:
+        report = validate_file(input_path, source, _WORKER_CONFIGS, **options)
+        entry.update({
+            "status": report["status"],
+            "completeness": report["completeness"],
+            "nb_errors": len(report["errors"] or []),
+        })
+    except Exception as e:
+        print(f"❌ Erreur de lecture : {input_path} : {e}")
+        entry.update({"status": "error", "completeness": None, "nb_errors": 1, "error": str(e)})
+    entry["duration_s"] = round(time.perf_counter() - started, 3)
+    return entry
+
+
+def collect_input_files(input_dir: Optional[str], inputs: Optional[List[str]]) -> List[str]:
+    """
+    Liste des fichiers à valider : fichiers explicites et/ou parcours récursif d'un dossier.
+    Une archive zip (api_logs.zip) est remplacée par ses membres, validés en flux sans extraction.
+    """
+    files = list(inputs or [])
+    if input_dir:
+        for root, _, names in os.walk(input_dir):
+            files.extend(os.path.join(root, name) for name in sorted(names))
+
+    expanded = []
+    for path in files:
+        if path.endswith(".zip") and os.path.isfile(path):
+            expanded.extend(api_log_members(path))
+        else:
+            expanded.append(path)
+    return expanded
+
+
+def validate_batch(files: List[str], configs: dict, workers: int, source: Optional[str] = None,
+                   **options) -> dict:
+    """
+    Valide une liste de fichiers en parallèle et écrit data/quality/validation_summary.json.
+    """
+    tasks, skipped = [], []
+    for path in files:
+        file_source = source or infer_source(os.path.basename(path))
+        if file_source is None:
+            skipped.append(os.path.basename(path))
+            continue
+        tasks.append((path, file_source, options))
+
+    run_id()  # Fixe PIPELINE_RUN_ID avant le pool : tous les workers enregistrent le même run
+    started = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(configs,)) as pool:
+        results = list(pool.map(_validate_task, tasks))
+
+    summary = {
+        "validated_at": datetime.now(timezone.utc).isoformat().replace("+00:00", "Z"),
+        "workers": workers,
+        "duration_s": round(time.perf_counter() - started, 3),
+        "nb_files": len(results),
+        "nb_passed": sum(r["status"] == "passed" for r in results),
+        "nb_failed": sum(r["status"] != "passed" for r in results),
+        "skipped": skipped,
+        "files": results,
+    }
+
+    os.makedirs(QUALITY_DIR, exist_ok=True)
+    summary_path = os.path.join(QUALITY_DIR, "validation_summary.json")
+    with open(summary_path, "w", encoding="utf-8") as f:
+        json.dump(summary, f, indent=4, ensure_ascii=False)
+    print(f"📝 Résumé sauvegardé : {summary_path}")
+    return summary
 
-if completeness < threshold:
-    errors.append(f"Complétude insuffisante ({completeness:.2f}%) < seuil {threshold}%")
-    validation_passed = False
-else:
-    print(f"✅ Complétude : {completeness:.2f}%")
 
 # ===============================
-# 📃 Rapport JSON
+# 🌟 CLI
 # ===============================
 
-report = {
-    "filename": filename,
-    "source": args.source,
-    "rows": int(df.shape[0]),
-    "columns": int(df.shape[1]),
-    "missing_values": int(missing_cells),
-    "completeness": round(completeness, 2),
-    "threshold": threshold,
-    "status": "passed" if validation_passed else "failed",
-    "validated_at": datetime.utcnow().isoformat() + "Z",
-    "errors": errors if errors else None
-}
-
-# 🔧 Déduire le chemin racine du projet (PIPELINE_ROOT)
-script_dir = os.path.abspath(os.path.dirname(__file__))
-pipeline_root = os.path.abspath(os.path.join(script_dir, ".."))
-
-# 📁 Chemin vers le dossier quality
-quality_dir = os.path.join(pipeline_root, "data", "quality")
-os.makedirs(quality_dir, exist_ok=True)
-
-# 📄 Nom du rapport JSON
-report_path = os.path.join(quality_dir, f"validation_report_{filename}.json")
-
-# 💾 Écriture
-with open(report_path, "w", encoding="utf-8") as f:
-    json.dump(report, f, indent=4, ensure_ascii=False)
-
-print(f"📝 Rapport sauvegardé : {report_path}")
-
-sys.exit(0 if validation_passed else 1)
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Validation de qualité des fichiers de données")
+    inputs = parser.add_mutually_exclusive_group(required=True)
+    inputs.add_argument('--input', help="Fichier CSV à valider")
+    inputs.add_argument('--input-dir', help="Dossier à valider récursivement (mode batch)")
+    inputs.add_argument('--inputs', nargs='+', help="Liste de fichiers à valider (mode batch)")
+    parser.add_argument('--source', help="Type de données : logs, sessions, products, users (déduit du nom en mode batch)")
+    parser.add_argument('--workers', type=int, help="Nombre de processus en mode batch (défaut : data_workers)")
+    parser.add_argument('--threshold', type=int, help="Seuil de complétude minimum (%)")
+    parser.add_argument('--check-schema', action='store_true', help="Valider le schéma")
+    parser.add_argument('--check-anomalies', action='store_true', help="Détecter les anomalies statistiques")
+    parser.add_argument('--check-coherence', action='store_true', help="Contrôles inter-fichiers")
+    parser.add_argument('--profile', action='store_true',
+                        help="Profiler chaque étape (cProfile + tracemalloc), rapport dans data/quality/")
+    args = parser.parse_args()
+
+    try:
+        configs = load_configs()
+    except Exception as e:
+        print(f"❌ Erreur chargement des fichiers de configuration : {e}")
+        sys.exit(1)
+
+    options = {
+        "threshold": args.threshold,
+        "check_schema": args.check_schema,
+        "check_anomalies": args.check_anomalies,
+        "check_coherence": args.check_coherence,
+        "profile": args.profile,
+    }
+
+    if args.input:
+        if not args.source:
+            parser.error("--source est requis avec --input")
+        if not os.path.exists(args.input):
+            print(f"❌ Fichier introuvable : {args.input}")
+            sys.exit(1)
+        try:
+            report = validate_file(args.input, args.source, configs, **options)
+        except Exception as e:
+            print(f"❌ Erreur de lecture : {e}")
+            sys.exit(1)
+        sys.exit(0 if report["status"] == "passed" else 1)
+
+    files = collect_input_files(args.input_dir, args.inputs)
+    workers = args.workers or configs["pipeline"].get("data_workers") or os.cpu_count() or 1
+    summary = validate_batch(files, configs, workers, source=args.source, **options)
+    print(f"✅ {summary['nb_passed']}/{summary['nb_files']} fichiers valides ({summary['duration_s']} s)")
+    sys.exit(0 if summary["nb_failed"] == 0 else 1)
+
+
+if __name__ == "__main__":
+    main()
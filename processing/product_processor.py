@@ -3,60 +3,92 @@
 import argparse
 import os
 import sys
-import pandas as pd
 
 # 📁 Ajout du chemin racine pour import relatif
 pipeline_root = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
 sys.path.insert(0, pipeline_root)
 
-# === CLI ===
-parser = argparse.ArgumentParser(description="Traitement des données produits")
-parser.add_argument('--input', required=True, help="Fichier CSV ou Excel contenant les données produits")
-args = parser.parse_args()
-input_path = args.input
-
-# === Lecture ===
-if not os.path.exists(input_path):
-    print(f"❌ Fichier introuvable : {input_path}")
-    sys.exit(1)
-
-try:
-    if input_path.endswith(".csv"):
-        df = pd.read_csv(input_path)
-    elif input_path.endswith(".xlsx"):
-        df = pd.read_excel(input_path)
-    else:
-        raise ValueError("Format de fichier non supporté (CSV ou XLSX attendu)")
-except Exception as e:
-    print(f"❌ Erreur de lecture du fichier : {e}")
-    sys.exit(1)
-
-# ==============================
-# 🧹 Nettoyage
-# ==============================
+from monitoring.data_profiler import StepProfiler
+from orchestration.manifest import is_up_to_date, record_processing
 from transformations.data_cleaner import clean_product_data
-df = clean_product_data(df)
-print("✅ Lecture et nettoyage effectués.")
-# ==============================
-# 🧠 Enrichissement
-# ==============================
+from transformations.data_enricher import ENRICHED_DIR, enrich_product_data
+from transformations.data_aggregator import aggregate_product_data
+from transformations.data_formatter import export_product_data_partitioned
+from transformations.data_reader import read_source
+from transformations.data_storage import dataset_pieces, remove_dataset_pieces
 
-from transformations.data_enricher import enrich_product_data
-df = enrich_product_data(df,input_path)
 
-# ==============================
-# 📊 Agrégation
-# ==============================
+def run(input_path: str, force: bool = False, profile: bool = False) -> int:
+    """
+    Traite un catalogue produits (CSV ou XLSX) et renvoie un code retour (0 = succès).
+    Avec profile, les étapes sont profilées et le rapport est écrit dans data/quality/.
+    """
+    # === Lecture ===
+    if not os.path.exists(input_path):
+        print(f"❌ Fichier introuvable : {input_path}")
+        return 1
+
+    # ⏭️ Entrée inchangée et sorties présentes : rien à refaire (manifest)
+    if not force and is_up_to_date("products", input_path):
+        print(f"⏭️  Fichier inchangé déjà traité : {input_path}")
+        return 0
+
+    # 🧹 Pièce enrichie d'un traitement précédent de ce fichier
+    remove_dataset_pieces(os.path.join(ENRICHED_DIR, "products_enriched"), input_path)
+
+    profiler = StepProfiler("products", input_path, enabled=profile)
+    try:
+        if input_path.endswith((".csv", ".xlsx")):
+            with profiler.step("read"):
+                df = read_source(input_path, "products", column_profile=True)
+        else:
+            raise ValueError("Format de fichier non supporté (CSV ou XLSX attendu)")
+    except Exception as e:
+        print(f"❌ Erreur de lecture du fichier : {e}")
+        return 1
+
+    # ==============================
+    # 🧹 Nettoyage
+    # ==============================
+    with profiler.step("clean"):
+        df = clean_product_data(df)
+    print("✅ Lecture et nettoyage effectués.")
+    # ==============================
+    # 🧠 Enrichissement
+    # ==============================
+
+    with profiler.step("enrich"):
+        df = enrich_product_data(df, input_path)
+
+    # ==============================
+    # 📊 Agrégation
+    # ==============================
+
+    with profiler.step("aggregate"):
+        df_agg = aggregate_product_data(df)
+    # ==============================
+    # 💾 Export partitionné
+    # ==============================
+    with profiler.step("export"):
+        outputs = export_product_data_partitioned(df_agg, input_path)
+        outputs += dataset_pieces(os.path.join(ENRICHED_DIR, "products_enriched"), input_path)
+        record_processing("products", input_path, outputs)
+    profiler.report()
+
+    print("✅ Traitement des produits terminé.")
+    return 0
 
-from transformations.data_aggregator import aggregate_product_data
-df_agg = aggregate_product_data(df)
-# ==============================
-# 💾 Export partitionné
-# ==============================
-from transformations.data_formatter import export_product_data_partitioned
-export_product_data_partitioned(df_agg, input_path)
 
-print("✅ Traitement des produits terminé.")
-sys.exit(0)
+def main() -> None:
+    # === CLI ===
+    parser = argparse.ArgumentParser(description="Traitement des données produits")
+    parser.add_argument('--input', required=True, help="Fichier CSV ou Excel contenant les données produits")
+    parser.add_argument('--force', action='store_true', help="Retraiter même si le fichier est inchangé (manifest)")
+    parser.add_argument('--profile', action='store_true',
+                        help="Profiler chaque étape (cProfile + tracemalloc), rapport dans data/quality/")
+    args = parser.parse_args()
+    sys.exit(run(args.input, force=args.force, profile=args.profile))
 
 
+if __name__ == "__main__":
+    main()
@@ -5,66 +5,139 @@ import sys
 import argparse
 import pandas as pd
 import os
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
+from functools import partial
 
 # 📁 Ajout du chemin racine pour import relatif
 pipeline_root = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
 sys.path.insert(0, pipeline_root)
 
-# ==============================
-# 🎯 Argument en ligne de commande
-# ==============================
-
-parser = argparse.ArgumentParser(description="Analyse des sessions web")
-parser.add_argument('--input', required=True, help="Fichier CSV des sessions utilisateur")
-args = parser.parse_args()
-input_path = args.input
-
-# ==============================
-# 📥 Lecture du fichier
-# ==============================
-
-if not os.path.exists(input_path):
-    print(f"❌ Fichier introuvable : {input_path}")
-    sys.exit(1)
-
-try:
-    df = pd.read_csv(input_path)
-except Exception as e:
-    print(f"❌ Erreur de lecture CSV : {e}")
-    sys.exit(1)
-
-# ==============================
-# 🧹 Nettoyage
-# ==============================
-
+from monitoring.data_metrics import add_counts, run_counted
+from monitoring.data_profiler import StepProfiler
+from orchestration.manifest import is_up_to_date, record_processing, recorded_outputs
 from transformations.data_cleaner import clean_session_data
-df = clean_session_data(df)
-
-# ==============================
-# 🧠 Enrichissement
-# ==============================
-
-from transformations.data_enricher import enrich_session_data
-df = enrich_session_data(df,input_path)
-
-# ==============================
-# 📊 Agrégation
-# ==============================
-
-from transformations.data_aggregator import aggregate_session_data
-# Liste des dimensions disponibles dans le fichier de sessions
-dimensions = ["device_type", "browser", "referrer", "country", "city", "conversion"]
-
-# Appel correct
-df_agg = aggregate_session_data(df, dimensions)
-
-# ==============================
-# 💾 Export partitionné
-# ==============================
-
+from transformations.data_enricher import ENRICHED_DIR, enrich_session_data
+from transformations.data_aggregator import SESSION_DIMENSIONS, session_state
 from transformations.data_formatter import export_session_data_partitioned
-export_session_data_partitioned(df_agg, input_path)
-
-print("✅ Traitement des sessions terminé.")
-sys.exit(0)
+from transformations.data_categories import encode_categoricals
+from transformations.data_reader import read_source
+from transformations.data_splitter import read_header, should_split, split_line_ranges
+from transformations.data_storage import dataset_pieces, load_pipeline_config, remove_dataset_pieces
+
+
+def process_range(task: tuple) -> pd.DataFrame:
+    """
+    Lit, nettoie et enrichit une plage d'octets du CSV (en-tête rajouté) dans un processus à part.
+    """
+    input_path, start, end, header, range_id = task
+    df = read_source(input_path, "sessions", byte_range=(start, end, header))
+    return enrich_session_data(clean_session_data(df), input_path, chunk_id=range_id)
+
+
+def run(input_path: str, force: bool = False, workers: int = 1, profile: bool = False) -> int:
+    """
+    Traite un fichier de sessions et renvoie un code retour (0 = succès).
+    Appelable directement par le pool de workers (imports déjà chargés).
+    Avec workers > 1, un gros fichier est lu, nettoyé et enrichi par plages d'octets en parallèle.
+    Avec profile, les étapes sont profilées dans ce processus (pas de découpage) et le
+    rapport est écrit dans data/quality/.
+    """
+
+    # ==============================
+    # 📥 Lecture du fichier
+    # ==============================
+
+    if not os.path.exists(input_path):
+        print(f"❌ Fichier introuvable : {input_path}")
+        return 1
+
+    # ⏭️ Entrée inchangée et sorties présentes : rien à refaire (manifest)
+    if not force and is_up_to_date("sessions", input_path):
+        print(f"⏭️  Fichier inchangé déjà traité : {input_path}")
+        return 0
+
+    # 🧹 Pièces enrichies d'un traitement précédent de ce fichier (séquentiel ou par plages)
+    remove_dataset_pieces(os.path.join(ENRICHED_DIR, "sessions_enriched"), input_path)
+
+    profiler = StepProfiler("sessions", input_path, enabled=profile)
+    if not profile and should_split(input_path, workers):
+        # ✂️ Nettoyage et enrichissement ligne à ligne : les plages sont traitées
+        # indépendamment puis recollées dans l'ordre du fichier
+        header = read_header(input_path)
+        ranges = split_line_ranges(input_path, workers, header=True)
+        print(f"✂️  Fichier découpé en {len(ranges)} plages traitées en parallèle")
+        tasks = [(input_path, start, end, header, i) for i, (start, end) in enumerate(ranges)]
+        try:
+            parts = []
+            with ProcessPoolExecutor(max_workers=len(tasks)) as pool:
+                for df_part, counts in pool.map(partial(run_counted, process_range), tasks):
+                    add_counts(**counts)  # Volumes lus et écrits dans le sous-processus
+                    parts.append(df_part)
+            df = encode_categoricals(pd.concat(parts, ignore_index=True))
+        except Exception as e:
+            print(f"❌ Erreur de lecture CSV : {e}")
+            return 1
+    else:
+        try:
+            with profiler.step("read"):
+                df = read_source(input_path, "sessions", column_profile=True)
+        except Exception as e:
+            print(f"❌ Erreur de lecture CSV : {e}")
+            return 1
+
+        # ==============================
+        # 🧹 Nettoyage
+        # ==============================
+
+        with profiler.step("clean"):
+            df = clean_session_data(df)
+
+        # ==============================
+        # 🧠 Enrichissement
+        # ==============================
+
+        with profiler.step("enrich"):
+            df = enrich_session_data(df, input_path)
+
+    # ==============================
+    # 📊 Agrégation
+    # ==============================
+
+    # État additif (sommes, comptes, HLL) par date et dimensions du fichier de sessions
+    with profiler.step("aggregate"):
+        df_state = session_state(df, SESSION_DIMENSIONS)
+
+    # ==============================
+    # 💾 Export partitionné (fusion dans les partitions par date)
+    # ==============================
+
+    with profiler.step("export"):
+        outputs = export_session_data_partitioned(df_state, input_path,
+                                                  previous_outputs=recorded_outputs("sessions", input_path))
+        outputs += dataset_pieces(os.path.join(ENRICHED_DIR, "sessions_enriched"), input_path)
+        record_processing("sessions", input_path, outputs)
+    profiler.report()
+
+    print("✅ Traitement des sessions terminé.")
+    return 0
+
+
+def main() -> None:
+    # ==============================
+    # 🎯 Argument en ligne de commande
+    # ==============================
+
+    parser = argparse.ArgumentParser(description="Analyse des sessions web")
+    parser.add_argument('--input', required=True, help="Fichier CSV des sessions utilisateur")
+    parser.add_argument('--force', action='store_true', help="Retraiter même si le fichier est inchangé (manifest)")
+    parser.add_argument('--workers', type=int, default=load_pipeline_config().get("data_workers", 1),
+                        help="Processus pour découper un gros fichier en plages d'octets")
+    parser.add_argument('--profile', action='store_true',
+                        help="Profiler chaque étape (cProfile + tracemalloc), rapport dans data/quality/")
+    args = parser.parse_args()
+    sys.exit(run(args.input, force=args.force, workers=args.workers, profile=args.profile))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,44 +1,342 @@
 # transformations/data_aggregator.py
 
+import numpy as np
 import pandas as pd
-from typing import List
+from typing import Dict, List, Optional, Tuple
+
+from transformations.data_sketches import (
+    HLL,
+    QUANTILES,
+    decode_sketches,
+    encode_sketches,
+    hll_estimate,
+    hll_sketch,
+    merge_sketches,
+    quantile_sketch,
+    sketch_quantiles,
+)
+
+# Clés de regroupement communes aux agrégats partiels des logs API
+API_LOGS_KEYS = ["date", "category", "method", "country_code"]
+
+# ===============================
+# 🧮 Sketches par groupe (distincts HLL, percentiles)
+# ===============================
+
+# Sketch -> (colonne source, type, colonne sérialisée persistée avec les KPI)
+API_LOGS_SKETCHES = {
+    "users": ("user_id", HLL, "hll_users"),
+    "sessions": ("session_id", HLL, "hll_sessions"),
+    "response_time_ms": ("response_time_ms", QUANTILES, "sketch_response_time_ms"),
+}
+SESSION_SKETCHES = {
+    "users": ("user_id", HLL, "hll_users"),
+}
+PERCENTILES = (0.5, 0.95, 0.99)
+
+
+def _group_codes(df: pd.DataFrame, keys: List[str]) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    (numéro de groupe de chaque ligne, lignes rattachées à un groupe) dans l'ordre du groupby.
+    """
+    codes = df.groupby(keys, observed=True, sort=True).ngroup().to_numpy(dtype=np.float64, na_value=-1)
+    valid = codes >= 0
+    return codes.astype(np.int64), valid
+
+
+def build_sketches(df: pd.DataFrame, keys: List[str], specs: dict) -> Dict[str, pd.DataFrame]:
+    """
+    Sketches de chaque groupe de `keys`, calculés en une passe vectorisée sur le chunk.
+    """
+    codes, valid = _group_codes(df, keys)
+    sketches = {}
+    for name, (column, kind, _) in specs.items():
+        if column not in df.columns:
+            continue
+        build = hll_sketch if kind == HLL else quantile_sketch
+        sketches[name] = build(df[column][valid], codes[valid])
+    return sketches
+
+
+def sketch_columns(sketches: Dict[str, pd.DataFrame], n_groups: int, specs: dict) -> Dict[str, object]:
+    """
+    Colonnes finales d'un lot de sketches : distincts, p50/p95/p99 et sketches sérialisés.
+    """
+    columns = {}
+    for name, (_, kind, stored) in specs.items():
+        if name not in sketches:
+            continue
+        if kind == HLL:
+            columns[f"distinct_{name}"] = hll_estimate(sketches[name], n_groups)
+        else:
+            values = sketch_quantiles(sketches[name], n_groups, PERCENTILES)
+            for k, q in enumerate(PERCENTILES):
+                columns[f"p{round(q * 100)}_{name}"] = values[:, k]
+    for name, (_, kind, stored) in specs.items():
+        if name in sketches:
+            columns[stored] = encode_sketches(sketches[name], n_groups, kind)
+    return columns
+
+
+def rollup_sketched(df_kpi: pd.DataFrame, by: List[str], sums: List[str], means: Dict[str, str],
+                    specs: dict) -> pd.DataFrame:
+    """
+    Regroupe des KPI déjà agrégés (plusieurs fichiers, jours...) sur `by` sans relire les
+    données brutes : comptes sommés, moyennes pondérées (colonne -> poids), sketches
+    fusionnés puis distincts et percentiles recalculés.
+    """
+    codes, valid = _group_codes(df_kpi, by)
+    df_kpi = df_kpi[valid]
+    codes = codes[valid]
+    grouped = df_kpi.groupby(by, observed=True, sort=True)
+    result = grouped[sums].sum()
+    for column, weight in means.items():
+        weighted = (df_kpi[column] * df_kpi[weight]).groupby([df_kpi[k] for k in by], observed=True, sort=True).sum()
+        result[column] = weighted / result[weight]
+
+    sketches = {}
+    for name, (_, kind, stored) in specs.items():
+        if stored in df_kpi.columns:
+            sketches[name] = merge_sketches([decode_sketches(df_kpi[stored], kind)], [codes], kind)
+    for column, values in sketch_columns(sketches, len(result), specs).items():
+        result[column] = values
+    return result.reset_index()
+
+
+# ===============================
+# ➕ Agrégats partiels additifs (fusion entre chunks, fichiers et jours)
+# ===============================
+# Un agrégat partiel est un tuple (comptes et sommes indexés par les clés, sketches) :
+# deux partiels se fusionnent exactement, les moyennes et estimations n'étant
+# calculées qu'à la finalisation.
+
+def partial_aggregate(df: pd.DataFrame, keys: List[str], additive: dict, specs: dict) -> tuple:
+    """
+    Réduit un DataFrame en agrégat partiel : colonnes additives (agrégation nommée
+    `additive`, sommes et comptes) et sketches de chaque groupe de `keys`.
+    """
+    counts = df.groupby(keys, observed=True, sort=True).agg(**additive)
+    return counts, build_sketches(df, keys, specs)
+
+
+def merge_partials(state: Optional[tuple], part: tuple, specs: dict) -> tuple:
+    """
+    Fusionne un agrégat partiel dans l'état courant (taille bornée par le nombre de groupes).
+    """
+    if state is None or state[0].empty:
+        return part
+    if part[0].empty:
+        return state
+    keys = list(state[0].index.names)
+    combined = pd.concat([state[0], part[0]])
+    codes = combined.groupby(level=keys, observed=True, sort=True).ngroup().to_numpy()
+    group_maps = [codes[:len(state[0])], codes[len(state[0]):]]
+    sketches = {
+        name: merge_sketches([state[1][name], part[1][name]], group_maps, specs[name][1])
+        for name in state[1]
+    }
+    return combined.groupby(level=keys, observed=True, sort=True).sum(), sketches
+
+
+def _sorted_partial(partial: tuple, specs: dict) -> tuple:
+    """
+    Trie l'agrégat par clés et renumérote ses sketches comme l'index trié.
+    """
+    counts, sketches = partial
+    positions = pd.Series(np.arange(len(counts)), index=counts.index).sort_index().to_numpy()
+    order = np.empty(len(positions), dtype=np.int64)
+    order[positions] = np.arange(len(positions))
+    sketches = {name: merge_sketches([sketch], [order], specs[name][1]) for name, sketch in sketches.items()}
+    return counts.sort_index(), sketches
+
+
+def partial_to_state(partial: tuple, specs: dict) -> pd.DataFrame:
+    """
+    Aplatit un agrégat partiel en table persistable : clés, colonnes additives et
+    sketches sérialisés (état fusionnable des partitions KPI).
+    """
+    counts, sketches = _sorted_partial(partial, specs)
+    df_state = counts.reset_index()
+    for name, (_, kind, stored) in specs.items():
+        if name in sketches:
+            df_state[stored] = encode_sketches(sketches[name], len(df_state), kind)
+    return df_state
+
+
+def state_to_partial(df_state: pd.DataFrame, keys: List[str], additive: dict, specs: dict) -> tuple:
+    """
+    Reconstruit l'agrégat partiel d'une table d'état (plusieurs lignes par groupe possibles,
+    ex : une par fichier source) en fusionnant ses lignes.
+    """
+    codes, valid = _group_codes(df_state, keys)
+    df_state = df_state[valid]
+    counts = df_state.groupby(keys, observed=True, sort=True)[list(additive)].sum()
+    sketches = {}
+    for name, (_, kind, stored) in specs.items():
+        if stored in df_state.columns:
+            sketches[name] = merge_sketches([decode_sketches(df_state[stored], kind)], [codes[valid]], kind)
+    return counts, sketches
+
+
+# ===============================
+# 🌐 Logs API
+# ===============================
+
+API_LOGS_ADDITIVE = {
+    "count_requests": ("request_id", "count"),
+    "sum_response_time_ms": ("response_time_ms", "sum"),
+    "count_response_time_ms": ("response_time_ms", "count"),
+    "sum_payload_bytes": ("payload_size_bytes", "sum"),
+    "count_payload_bytes": ("payload_size_bytes", "count"),
+    "nb_cache_hits": ("cache_hit", "sum"),
+}
+
 
 def aggregate_api_logs(df: pd.DataFrame) -> pd.DataFrame:
     """
     Agrège les logs API par date, catégorie, méthode, pays
+    (+ utilisateurs et sessions distincts, percentiles des temps de réponse).
     """
-    df_agg = df.groupby(["date", "category", "method", "country_code"]).agg(
-        count_requests=("request_id", "count"),
-        avg_response_time_ms=("response_time_ms", "mean"),
-        avg_payload_bytes=("payload_size_bytes", "mean"),
-        nb_cache_hits=("cache_hit", "sum")
-    ).reset_index()
-    return df_agg
+    return finalize_api_logs_partials(partial_aggregate_api_logs(df))
 
 
-def aggregate_session_data(df: pd.DataFrame, dimensions: List[str]) -> pd.DataFrame:
+def partial_aggregate_api_logs(df: pd.DataFrame) -> Tuple[pd.DataFrame, Dict[str, pd.DataFrame]]:
     """
-    Agrégation des sessions utilisateur selon les dimensions fournies.
+    Réduit un chunk de logs API en agrégats partiels fusionnables : comptes et sommes
+    par date, catégorie, méthode, pays, et sketches (HLL, quantiles) de chaque groupe.
     """
+    return partial_aggregate(df, API_LOGS_KEYS, API_LOGS_ADDITIVE, API_LOGS_SKETCHES)
+
+
+def merge_api_logs_partials(state: Optional[tuple], part: tuple) -> tuple:
+    """
+    Fusionne un agrégat partiel dans l'état courant (taille bornée par le nombre de groupes).
+    """
+    return merge_partials(state, part, API_LOGS_SKETCHES)
+
+
+def finalize_api_logs_partials(state: Optional[tuple]) -> pd.DataFrame:
+    """
+    Transforme l'état fusionné en KPI finaux (mêmes colonnes que aggregate_api_logs).
+    """
+    columns = API_LOGS_KEYS + ["count_requests", "avg_response_time_ms", "avg_payload_bytes", "nb_cache_hits"]
+    if state is None or state[0].empty:
+        return pd.DataFrame(columns=columns)
+
+    counts, sketches = _sorted_partial(state, API_LOGS_SKETCHES)
+    df_agg = pd.DataFrame({
+        "count_requests": counts["count_requests"],
+        "avg_response_time_ms": counts["sum_response_time_ms"] / counts["count_response_time_ms"],
+        "avg_payload_bytes": counts["sum_payload_bytes"] / counts["count_payload_bytes"],
+        "nb_cache_hits": counts["nb_cache_hits"]
+    }, index=counts.index).reset_index()
+    return df_agg[columns].assign(**sketch_columns(sketches, len(df_agg), API_LOGS_SKETCHES))
+
+
+def api_logs_state(state: Optional[tuple]) -> pd.DataFrame:
+    """
+    Table d'état additive (sommes, comptes, sketches) des logs API, fusionnée dans les partitions KPI.
+    """
+    if state is None:
+        return pd.DataFrame(columns=API_LOGS_KEYS + list(API_LOGS_ADDITIVE))
+    return partial_to_state(state, API_LOGS_SKETCHES)
+
+
+def finalize_api_logs_state(df_state: pd.DataFrame) -> pd.DataFrame:
+    """
+    KPI finaux d'une table d'état de logs API (lignes de plusieurs fichiers fusionnées).
+    """
+    return finalize_api_logs_partials(
+        state_to_partial(df_state, API_LOGS_KEYS, API_LOGS_ADDITIVE, API_LOGS_SKETCHES))
+
+
+def rollup_api_logs(df_kpi: pd.DataFrame, by: List[str]) -> pd.DataFrame:
+    """
+    Regroupe des KPI de logs API (ex : plusieurs jours) sur `by` (ex : ["category"]) :
+    percentiles et distincts exacts au sens des sketches, sans relire les logs bruts.
+    """
+    return rollup_sketched(
+        df_kpi, by,
+        sums=["count_requests", "nb_cache_hits"],
+        means={"avg_response_time_ms": "count_requests", "avg_payload_bytes": "count_requests"},
+        specs=API_LOGS_SKETCHES,
+    )
+
+
+# ===============================
+# 🧭 Sessions
+# ===============================
+
+# Dimensions d'agrégation des sessions (la date est toujours ajoutée en tête)
+SESSION_DIMENSIONS = ["device_type", "browser", "referrer", "country", "city", "conversion"]
+
+# Moyenne finale -> colonne source (état additif : somme et nombre de valeurs)
+SESSION_MEANS = {
+    "avg_duration_min": "duration_min",
+    "avg_pages_visited": "pages_visited",
+    "avg_products_viewed": "products_viewed",
+    "avg_products_added": "products_added_to_cart",
+    "conversion_rate": "is_conversion",
+    "bounce_rate": "is_bounce",
+    "avg_total_spent": "total_spent",
+    "cart_abandonment_rate": "abandoned_cart",
+}
+SESSION_ADDITIVE = {"nb_sessions": ("session_id", "count")}
+for _column in SESSION_MEANS.values():
+    SESSION_ADDITIVE[f"sum_{_column}"] = (_column, "sum")
+    SESSION_ADDITIVE[f"count_{_column}"] = (_column, "count")
+
+
+def _session_keys(df: pd.DataFrame, dimensions: List[str]) -> List[str]:
     if "date" not in dimensions:
         dimensions = ["date"] + dimensions
     if not set(dimensions).issubset(df.columns):
         missing = list(set(dimensions) - set(df.columns))
         raise ValueError(f"Colonnes manquantes pour l'aggrégation : {missing}")
+    return dimensions
 
-    grouped = df.groupby(dimensions).agg(
-        nb_sessions=('session_id', 'count'),
-        avg_duration_min=('duration_min', 'mean'),
-        avg_pages_visited=('pages_visited', 'mean'),
-        avg_products_viewed=('products_viewed', 'mean'),
-        avg_products_added=('products_added_to_cart', 'mean'),
-        conversion_rate=('is_conversion', 'mean'),
-        bounce_rate=('is_bounce', 'mean'),
-        avg_total_spent=('total_spent', 'mean'),
-        cart_abandonment_rate=('abandoned_cart', 'mean')
-    ).reset_index()
 
-    return grouped
+def partial_aggregate_session_data(df: pd.DataFrame, dimensions: List[str]) -> tuple:
+    """
+    Agrégat partiel additif des sessions (comptes, sommes, HLL des utilisateurs).
+    """
+    return partial_aggregate(df, _session_keys(df, dimensions), SESSION_ADDITIVE, SESSION_SKETCHES)
+
+
+def finalize_session_partials(state: tuple) -> pd.DataFrame:
+    """
+    KPI finaux des sessions (moyennes et taux) à partir d'un agrégat partiel.
+    """
+    counts, sketches = _sorted_partial(state, SESSION_SKETCHES)
+    grouped = pd.DataFrame({"nb_sessions": counts["nb_sessions"]}, index=counts.index)
+    for name, column in SESSION_MEANS.items():
+        grouped[name] = counts[f"sum_{column}"] / counts[f"count_{column}"]
+    grouped = grouped.reset_index()
+
+    # 🧮 Utilisateurs distincts (HLL fusionnable entre fichiers et jours)
+    return grouped.assign(**sketch_columns(sketches, len(grouped), SESSION_SKETCHES))
+
+
+def aggregate_session_data(df: pd.DataFrame, dimensions: List[str]) -> pd.DataFrame:
+    """
+    Agrégation des sessions utilisateur selon les dimensions fournies.
+    """
+    return finalize_session_partials(partial_aggregate_session_data(df, dimensions))
+
+
+def session_state(df: pd.DataFrame, dimensions: List[str]) -> pd.DataFrame:
+    """
+    Table d'état additive des sessions, fusionnée dans les partitions KPI.
+    """
+    return partial_to_state(partial_aggregate_session_data(df, dimensions), SESSION_SKETCHES)
+
+
+def finalize_session_state(df_state: pd.DataFrame, dimensions: List[str] = SESSION_DIMENSIONS) -> pd.DataFrame:
+    """
+    KPI finaux d'une table d'état de sessions (lignes de plusieurs fichiers fusionnées).
+    """
+    keys = _session_keys(df_state, dimensions)
+    return finalize_session_partials(state_to_partial(df_state, keys, SESSION_ADDITIVE, SESSION_SKETCHES))
 
 import pandas as pd
 
@@ -56,7 +354,7 @@ def aggregate_product_data(df: pd.DataFrame) -> pd.DataFrame:
         if col not in df.columns:
             raise ValueError(f"❌ Colonne manquante : {col}")
 
-    grouped = df.groupby(["date", "category", "stock_status", "is_active"]).agg(
+    grouped = df.groupby(["date", "category", "stock_status", "is_active"], observed=True).agg(
         nb_products=('product_id', 'count'),
         avg_price=('price', 'mean'),
         avg_cost=('cost', 'mean'),
@@ -81,7 +379,7 @@ def aggregate_user_data(df: pd.DataFrame) -> pd.DataFrame:
         if col not in df.columns:
             raise ValueError(f"❌ Colonne manquante : {col}")
 
-    grouped = df.groupby(["country", "customer_type", "is_premium"]).agg(
+    grouped = df.groupby(["country", "customer_type", "is_premium"], observed=True).agg(
         nb_users=("user_id", "count"),
         avg_age=("age", "mean"),
         avg_total_orders=("total_orders", "mean"),
@@ -0,0 +1,317 @@
+# transformations/data_cache.py
+# 🗃️ Cache de parsing : chaque entrée du staging, une fois parsée (CSV, JSONL, XLSX), est
+# conservée au format Arrow IPC (Feather v2, non compressé) sous un nom portant le hash de
+# son contenu. Les lectures suivantes (processeur, validation) projettent le fichier en
+# mémoire (mmap) au lieu de reparser ; un contenu modifié change de hash, donc de cache.
+
+import json
+import os
+from typing import Iterator, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from transformations.data_profile import profile_key
+from transformations.data_storage import PIPELINE_ROOT, load_pipeline_config
+
+CACHE_DIR = os.path.join(PIPELINE_ROOT, "data", "cache", "parsed")
+MIXED_COLUMNS_KEY = b"pipeline_mixed_columns"  # Colonnes objet aux types mélangés
+COLUMNS_KEY = b"pipeline_columns"              # Ordre d'origine des colonnes
+
+# Type Python d'une valeur d'une colonne mélangée → code (0 : None, puis champs bool, int, float, str)
+MIXED_FIELDS = ("kind", "bool", "int", "float", "str")
+KIND_BY_TYPE = {
+    type(None): 0, bool: 1, np.bool_: 1, int: 2, np.int64: 2, float: 3, np.float64: 3, str: 4,
+}
+
+
+def cache_enabled() -> bool:
+    """
+    Cache actif (`parse_cache` de pipeline_config.yaml) ; nécessite pyarrow.
+    """
+    if not load_pipeline_config().get("parse_cache", False):
+        return False
+    try:
+        import pyarrow  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+def _prefix(input_path: str, source: Optional[str]) -> str:
+    return f"{source or 'raw'}_{os.path.basename(input_path)}."
+
+
+def cache_path(input_path: str, source: Optional[str]) -> str:
+    """
+    <source>_<fichier>.<hash de contenu>.arrow (CRC du répertoire central pour un membre d'archive).
+    """
+    return os.path.join(CACHE_DIR, f"{_prefix(input_path, source)}{profile_key(input_path)}.arrow")
+
+
+# ===============================
+# 🔁 Conversion DataFrame ↔ Arrow
+# ===============================
+
+def _encode_mixed(s: pd.Series):
+    """
+    Colonne objet aux types mélangés (ex : "n/a" parmi des entiers, à compter par la
+    validation) → structure Arrow {kind, bool, int, float, str} : chaque valeur garde son type.
+    """
+    import pyarrow as pa
+
+    kinds = s.map(type).map(KIND_BY_TYPE)
+    if kinds.isna().any():
+        raise TypeError(f"types non pris en charge dans la colonne {s.name}")
+    kinds = kinds.to_numpy(dtype=np.int8)
+    values = s.to_numpy(dtype=object)
+    fields = [pa.array(kinds)]
+    for kind, dtype in ((1, bool), (2, np.int64), (3, np.float64)):
+        mask = kinds == kind
+        typed = np.zeros(len(values), dtype=dtype)
+        typed[mask] = values[mask].astype(dtype)
+        fields.append(pa.array(typed, mask=~mask))  # NaN conservés (pas de from_pandas)
+    fields.append(pa.array(np.where(kinds == 4, values, None), type=pa.string()))
+    return pa.StructArray.from_arrays(fields, names=list(MIXED_FIELDS))
+
+
+def _decode_mixed(column) -> np.ndarray:
+    """
+    Structure Arrow → tableau objet NumPy aux types Python d'origine.
+    """
+    import pyarrow.compute as pc
+
+    struct = column.combine_chunks() if hasattr(column, "combine_chunks") else column
+    kinds = struct.field("kind").to_numpy()
+    values = np.full(len(struct), None, dtype=object)
+    for kind, name, default in ((1, "bool", False), (2, "int", 0), (3, "float", 0.0)):
+        mask = kinds == kind
+        if mask.any():
+            values[mask] = pc.fill_null(struct.field(name), default).to_numpy()[mask].astype(object)
+    mask = kinds == 4
+    if mask.any():
+        values[mask] = struct.field("str").to_numpy(zero_copy_only=False)[mask]
+    return values
+
+
+def _to_arrow(df: pd.DataFrame, mixed_columns: Optional[List[str]] = None):
+    """
+    Table Arrow du DataFrame brut ; les colonnes objet que pyarrow ne sait pas typer sont
+    encodées par _encode_mixed. `mixed_columns` impose ces colonnes (celles du premier
+    chunk d'une écriture en flux).
+    """
+    import pyarrow as pa
+
+    detected = []
+    for col in df.columns:
+        if df[col].dtype == object and col not in (mixed_columns or []):
+            try:
+                pa.array(df[col], from_pandas=True)
+            except (pa.ArrowInvalid, pa.ArrowTypeError, pa.ArrowNotImplementedError):
+                detected.append(col)
+    if mixed_columns is None:
+        mixed_columns = detected
+    elif detected:
+        raise TypeError(f"types mélangés dans {detected} (absents du premier chunk)")
+    mixed_columns = [col for col in mixed_columns if col in df.columns]
+    table = pa.Table.from_pandas(df.drop(columns=mixed_columns), preserve_index=False)
+    for col in mixed_columns:
+        table = table.append_column(col, _encode_mixed(df[col]))
+    metadata = dict(table.schema.metadata or {})
+    metadata[MIXED_COLUMNS_KEY] = json.dumps(mixed_columns).encode()
+    metadata[COLUMNS_KEY] = json.dumps([str(col) for col in df.columns]).encode()
+    return table.replace_schema_metadata(metadata)
+
+
+def _to_pandas(table, mixed_columns: List[str], columns: List[str]) -> pd.DataFrame:
+    """
+    DataFrame brut d'une table du cache (colonnes dans l'ordre d'origine).
+    """
+    mixed = [col for col in mixed_columns if col in table.column_names]
+    # split_blocks : un bloc par colonne, les colonnes numériques sans nulls restent des vues sur le mmap
+    df = table.drop_columns(mixed).to_pandas(split_blocks=True) if mixed else table.to_pandas(split_blocks=True)
+    for col in mixed:
+        df[col] = pd.Series(_decode_mixed(table.column(col)), index=df.index, dtype=object)
+    return df[[col for col in columns if col in df.columns]] if mixed else df
+
+
+# ===============================
+# 📤 Lecture
+# ===============================
+
+def _open_cached(input_path: str, source: Optional[str]):
+    """
+    Lecteur IPC projeté en mémoire du cache de ce contenu, None s'il n'existe pas.
+    """
+    import pyarrow as pa
+
+    path = cache_path(input_path, source)
+    if not os.path.exists(path):
+        return None, [], []
+    try:
+        reader = pa.ipc.open_file(pa.memory_map(path, "r"))
+        os.utime(path)  # Dernier usage : les entrées les plus anciennes sont évincées en premier
+    except (OSError, pa.ArrowInvalid):
+        return None, [], []  # Fichier tronqué ou évincé entre-temps : reparsé puis réécrit
+    metadata = reader.schema.metadata or {}
+    mixed_columns = json.loads(metadata.get(MIXED_COLUMNS_KEY, b"[]"))
+    columns = json.loads(metadata.get(COLUMNS_KEY, b"[]")) or reader.schema.names
+    return reader, mixed_columns, columns
+
+
+def load_cached(input_path: str, source: Optional[str],
+                columns: Optional[List[str]] = None) -> Optional[pd.DataFrame]:
+    """
+    DataFrame brut (avant apply_schema) en cache pour ce contenu, None sinon.
+    Seules les colonnes demandées sont projetées.
+    """
+    reader, mixed_columns, order = _open_cached(input_path, source)
+    if reader is None:
+        return None
+    table = reader.read_all()
+    if columns is not None:
+        missing = [c for c in columns if c not in table.column_names]
+        if missing:
+            raise ValueError(f"Colonnes absentes : {missing}")  # Comme usecols à la lecture
+        table = table.select([c for c in order if c in columns])
+    return _to_pandas(table, mixed_columns, order)
+
+
+def iter_cached(input_path: str, source: Optional[str], chunksize: int) -> Optional[Iterator[pd.DataFrame]]:
+    """
+    Chunks bruts de `chunksize` lignes lus depuis le cache, None s'il n'existe pas.
+    """
+    reader, mixed_columns, order = _open_cached(input_path, source)
+    if reader is None:
+        return None
+    table = reader.read_all()
+
+    def chunks():
+        for offset in range(0, table.num_rows, chunksize):
+            chunk = _to_pandas(table.slice(offset, chunksize), mixed_columns, order)
+            chunk.index = pd.RangeIndex(offset, offset + len(chunk))  # Comme read_json / read_csv par chunks
+            yield chunk
+
+    return chunks()
+
+
+# ===============================
+# 💾 Écriture
+# ===============================
+
+def _remove(path: str) -> None:
+    try:
+        os.remove(path)
+    except OSError:
+        pass  # Déjà supprimé par un autre worker
+
+
+def _remove_stale(input_path: str, source: Optional[str], keep: str) -> None:
+    """
+    Supprime les caches d'anciens contenus du même fichier.
+    """
+    prefix = _prefix(input_path, source)
+    for name in os.listdir(CACHE_DIR):
+        path = os.path.join(CACHE_DIR, name)
+        if name.startswith(prefix) and name.endswith(".arrow") and path != keep:
+            _remove(path)
+
+
+def _enforce_limit(keep: str) -> None:
+    """
+    Borne la taille du cache (`parse_cache_max_mb`) : les entrées les moins récemment
+    utilisées sont supprimées, y compris celles de fichiers déjà purgés du staging.
+    """
+    max_mb = load_pipeline_config().get("parse_cache_max_mb")
+    if not max_mb:
+        return
+    entries = []
+    for name in os.listdir(CACHE_DIR):
+        path = os.path.join(CACHE_DIR, name)
+        if not name.endswith(".arrow"):
+            continue
+        try:
+            stat = os.stat(path)
+        except OSError:
+            continue  # Évincée par un autre worker
+        entries.append((stat.st_mtime, stat.st_size, path))
+    total = sum(size for _, size, _ in entries)
+    for _, size, path in sorted(entries):
+        if total <= max_mb * 1024 ** 2:
+            break
+        if path != keep:
+            _remove(path)
+            total -= size
+
+
+class CacheWriter:
+    """
+    Écriture du cache chunk par chunk (lecture en flux) ; abandonnée si un chunk ne
+    respecte pas le schéma du premier (types différents d'un chunk à l'autre).
+    """
+
+    def __init__(self, input_path: str, source: Optional[str]):
+        self.input_path = input_path
+        self.source = source
+        self.path = cache_path(input_path, source)
+        self.tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        self.sink = None
+        self.writer = None
+        self.schema = None
+        self.mixed_columns = None
+        self.failed = False
+
+    def write(self, df: pd.DataFrame) -> None:
+        import pyarrow as pa
+
+        if self.failed:
+            return
+        try:
+            table = _to_arrow(df, self.mixed_columns)
+            if self.writer is None:
+                os.makedirs(CACHE_DIR, exist_ok=True)
+                self.schema = table.schema
+                self.mixed_columns = json.loads(self.schema.metadata[MIXED_COLUMNS_KEY])
+                self.sink = pa.OSFile(self.tmp_path, "wb")
+                self.writer = pa.ipc.new_file(self.sink, self.schema)
+            elif not table.schema.equals(self.schema):
+                # Ex : entiers du premier chunk, flottants (valeurs manquantes) ensuite
+                table = table.cast(self.schema)
+            self.writer.write_table(table)
+        except (TypeError, ValueError, OverflowError, OSError, pa.ArrowException) as e:
+            print(f"⚠️  Cache de parsing abandonné pour {os.path.basename(self.input_path)} : {e}")
+            self.abort()
+
+    def abort(self) -> None:
+        self.failed = True
+        self._close()
+        if os.path.exists(self.tmp_path):
+            os.remove(self.tmp_path)
+
+    def _close(self) -> None:
+        if self.writer is not None:
+            self.writer.close()
+        if self.sink is not None:
+            self.sink.close()
+        self.writer = self.sink = None
+
+    def close(self) -> Optional[str]:
+        """
+        Publie le cache (remplacement atomique) ; renvoie son chemin, None si abandonné.
+        """
+        if self.failed or self.writer is None:
+            return None
+        self._close()
+        os.replace(self.tmp_path, self.path)
+        _remove_stale(self.input_path, self.source, self.path)
+        _enforce_limit(self.path)
+        return self.path
+
+
+def save_cached(input_path: str, source: Optional[str], df: pd.DataFrame) -> Optional[str]:
+    """
+    Met en cache le DataFrame brut d'une lecture complète.
+    """
+    writer = CacheWriter(input_path, source)
+    writer.write(df)
+    return writer.close()
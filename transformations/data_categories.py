@@ -0,0 +1,110 @@
+# transformations/data_categories.py
+
+import fcntl
+import json
+import os
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+
+import pandas as pd
+
+from transformations.data_storage import PIPELINE_ROOT, load_pipeline_config
+
+DICTIONARIES_DIR = os.path.join(PIPELINE_ROOT, "data", "dictionaries")
+
+# Dictionnaires déjà chargés dans ce processus : {colonne: catégories}
+_dictionaries: Dict[str, List[str]] = {}
+
+
+def categorical_columns() -> List[str]:
+    """
+    Dimensions encodées en catégories (`categorical_columns`) si `categorical_encoding` est actif.
+    """
+    config = load_pipeline_config()
+    if not config.get("categorical_encoding", False):
+        return []
+    return list(config.get("categorical_columns", []))
+
+
+@contextmanager
+def _locked():
+    """
+    Verrou inter-processus sur les dictionnaires (workers parallèles).
+    """
+    os.makedirs(DICTIONARIES_DIR, exist_ok=True)
+    with open(os.path.join(DICTIONARIES_DIR, ".lock"), "w") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+
+
+def _dictionary_path(column: str) -> str:
+    return os.path.join(DICTIONARIES_DIR, f"{column}.json")
+
+
+def _read_dictionary(column: str) -> List[str]:
+    path = _dictionary_path(column)
+    if not os.path.exists(path):
+        return []
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def get_dictionary(column: str, values: Optional[pd.Index] = None) -> List[str]:
+    """
+    Catégories persistées d'une colonne, complétées des `values` inconnues. Elles sont
+    gardées triées : les groupby sur catégories sortent dans le même ordre que sur du texte.
+    """
+    categories = _dictionaries.get(column)
+    if categories is None:
+        categories = _dictionaries[column] = _read_dictionary(column)
+    if values is None:
+        return categories
+
+    known = set(categories)
+    if all(v in known for v in values):
+        return categories
+
+    with _locked():
+        # Relecture sous verrou : un autre worker a pu compléter le dictionnaire
+        categories = _read_dictionary(column)
+        known = set(categories)
+        new_values = [v for v in values if v not in known]
+        if new_values:
+            categories = sorted(categories + new_values)
+            tmp_path = f"{_dictionary_path(column)}.tmp-{os.getpid()}"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(categories, f, ensure_ascii=False, indent=1)
+            os.replace(tmp_path, _dictionary_path(column))
+    _dictionaries[column] = categories
+    return categories
+
+
+def encode_column(s: pd.Series, column: Optional[str] = None) -> pd.Series:
+    """
+    Encode une colonne avec son dictionnaire persisté (sans effet si elle n'est pas
+    configurée comme catégorielle).
+    """
+    column = column or s.name
+    if column not in categorical_columns():
+        return s
+    values = pd.Index(s.dropna().unique()).astype(str)
+    categories = get_dictionary(column, values)
+    if isinstance(s.dtype, pd.CategoricalDtype):
+        if list(s.cat.categories) == categories:
+            return s
+        # Recodage (catégories d'un autre chunk, résultat de pd.cut...) sans repasser par les chaînes
+        return s.cat.rename_categories(s.cat.categories.astype(str)).cat.set_categories(categories)
+    return s.astype(str).where(s.notna()).astype(pd.CategoricalDtype(categories))
+
+
+def encode_categoricals(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Encode en catégories toutes les dimensions configurées présentes dans le DataFrame.
+    """
+    for column in categorical_columns():
+        if column in df.columns:
+            df[column] = encode_column(df[column], column)
+    return df
@@ -0,0 +1,198 @@
+# transformations/data_classifier.py
+
+import os
+import re
+from datetime import datetime
+from functools import lru_cache
+from typing import Callable, Dict
+
+import numpy as np
+import pandas as pd
+import yaml
+
+from transformations.data_categories import encode_column
+
+CONFIG_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "config"))
+RULES_PATH = os.path.join(CONFIG_DIR, "enrichment_rules.yaml")
+
+Classifier = Callable[[pd.DataFrame], pd.Series]
+
+
+# ===============================
+# 🧱 Compilation des règles
+# ===============================
+
+def _compile_buckets(rule: dict) -> Classifier:
+    """
+    Sous-chaînes / regex : une seule regex combinée, dont chaque alternative est un
+    lookahead ancré en début de chaîne, ce qui conserve l'ordre de priorité des buckets
+    (et non la position du match dans la chaîne).
+    """
+    source = rule["source"]
+    default = rule.get("default", "other")
+    na_label = rule.get("na", default)
+    labels = np.array([bucket["label"] for bucket in rule["buckets"]] + [default], dtype=object)
+
+    alternatives = []
+    for i, bucket in enumerate(rule["buckets"]):
+        patterns = [re.escape(s) for s in bucket.get("contains", [])] + list(bucket.get("regex", []))
+        if not patterns:
+            raise ValueError(f"❌ Bucket sans motif pour '{source}' : {bucket['label']}")
+        alternatives.append(f"(?=.*?(?:{'|'.join(patterns)}))(?P<b{i}>)")
+    combined = re.compile("^(?:" + "|".join(alternatives) + ")", re.DOTALL)
+
+    def classify(df: pd.DataFrame) -> pd.Series:
+        values = df[source]
+        result = pd.Series(na_label, index=df.index, dtype=object)
+        mask = values.notna()
+        if mask.any():
+            matched = values[mask].astype(str).str.extract(combined).notna().to_numpy()
+            # Premier bucket qui matche, sinon le label par défaut (dernier indice)
+            first = np.where(matched.any(axis=1), matched.argmax(axis=1), len(labels) - 1)
+            result[mask] = labels[first]
+        return result
+
+    return classify
+
+
+def _compile_values(rule: dict) -> Classifier:
+    """
+    Correspondance exacte valeur -> label.
+    """
+    source = rule["source"]
+    default = rule.get("default", "unknown")
+    mapping = rule["values"]
+
+    def classify(df: pd.DataFrame) -> pd.Series:
+        return df[source].map(mapping).astype(object).fillna(default)
+
+    return classify
+
+
+def _compile_bins(rule: dict) -> Classifier:
+    """
+    Intervalles numériques avec pd.cut (bornes supérieures incluses).
+    """
+    source = rule["source"]
+    edges = [-np.inf] + list(rule["bins"]) + [np.inf]
+    labels = rule["labels"]
+    if len(labels) != len(edges) - 1:
+        raise ValueError(f"❌ {len(labels)} labels pour {len(edges) - 1} intervalles sur '{source}'")
+    na_label = rule.get("na")
+
+    def classify(df: pd.DataFrame) -> pd.Series:
+        values = pd.to_numeric(df[source], errors="coerce")
+        result = pd.cut(values, bins=edges, labels=labels, right=True).astype(object)
+        return result.where(result.notna(), na_label)
+
+    return classify
+
+
+def _compile_condition(cond: dict) -> Callable[[pd.DataFrame], np.ndarray]:
+    """
+    Une condition élémentaire {column, op, value[, measure]} en masque booléen.
+    """
+    column = cond["column"]
+    op = cond["op"]
+    value = cond.get("value")
+    measure = cond.get("measure")
+
+    def mask(df: pd.DataFrame) -> np.ndarray:
+        values = df[column]
+        if measure == "age_days":
+            values = (pd.Timestamp(datetime.now()) - pd.to_datetime(values, errors="coerce")).dt.days
+        elif measure is not None:
+            raise ValueError(f"❌ Mesure inconnue : {measure}")
+
+        if op == "truthy":
+            return values.astype(bool).to_numpy()
+        if op == "isin":
+            return values.isin(value).to_numpy()
+        comparators = {"eq": "eq", "ne": "ne", "lt": "lt", "le": "le", "gt": "gt", "ge": "ge"}
+        if op not in comparators:
+            raise ValueError(f"❌ Opérateur inconnu : {op}")
+        return getattr(values, comparators[op])(value).fillna(False).to_numpy(dtype=bool)
+
+    return mask
+
+
+def _compile_all(conditions: list) -> Callable[[pd.DataFrame], np.ndarray]:
+    masks = [_compile_condition(c) for c in conditions]
+
+    def combined(df: pd.DataFrame) -> np.ndarray:
+        result = np.ones(len(df), dtype=bool)
+        for m in masks:
+            result &= m(df)
+        return result
+
+    return combined
+
+
+def _compile_condition_rule(rule: dict) -> Classifier:
+    """
+    Colonne booléenne : ET logique de toutes les conditions.
+    """
+    mask = _compile_all(rule["when"])
+
+    def classify(df: pd.DataFrame) -> pd.Series:
+        return pd.Series(mask(df), index=df.index)
+
+    return classify
+
+
+def _compile_cases(rule: dict) -> Classifier:
+    """
+    Premier cas vrai (np.select), sinon default.
+    """
+    cases = [(case["label"], _compile_all(case["when"])) for case in rule["cases"]]
+    default = rule.get("default", "other")
+
+    def classify(df: pd.DataFrame) -> pd.Series:
+        conditions = [mask(df) for _, mask in cases]
+        choices = [np.full(len(df), label, dtype=object) for label, _ in cases]
+        return pd.Series(np.select(conditions, choices, default=default), index=df.index, dtype=object)
+
+    return classify
+
+
+COMPILERS = {
+    "buckets": _compile_buckets,
+    "values": _compile_values,
+    "bins": _compile_bins,
+    "condition": _compile_condition_rule,
+    "cases": _compile_cases,
+}
+
+
+# ===============================
+# 🏷️ API publique
+# ===============================
+
+@lru_cache(maxsize=None)
+def load_classifiers(rules_path: str = RULES_PATH) -> Dict[str, Dict[str, Classifier]]:
+    """
+    Charge enrichment_rules.yaml et compile chaque règle une seule fois par processus.
+    """
+    with open(rules_path) as f:
+        rules = yaml.safe_load(f) or {}
+
+    compiled = {}
+    for source, targets in rules.items():
+        compiled[source] = {}
+        for target, rule in targets.items():
+            kind = rule.get("type")
+            if kind not in COMPILERS:
+                raise ValueError(f"❌ Type de règle inconnu pour {source}.{target} : {kind}")
+            compiled[source][target] = COMPILERS[kind](rule)
+    return compiled
+
+
+def classify(df: pd.DataFrame, source: str, target: str) -> pd.Series:
+    """
+    Applique la règle compilée `source.target` au DataFrame et renvoie la colonne produite
+    (encodée en catégories si `target` fait partie des dimensions catégorielles).
+    """
+    classifiers = load_classifiers()
+    if source not in classifiers or target not in classifiers[source]:
+        raise ValueError(f"❌ Aucune règle de classification pour {source}.{target}")
+    return encode_column(classifiers[source][target](df), target)
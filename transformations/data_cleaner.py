@@ -7,6 +7,9 @@ def clean_api_logs(df: pd.DataFrame) -> pd.DataFrame:
     df = df[df["status_code"] != 500]
     df = df.drop_duplicates(subset=["request_id"])
     df = df.dropna()
+    # Colonne hors schéma : lue en object dès qu'elle contient des nulls
+    if "cache_hit" in df.columns:
+        df["cache_hit"] = df["cache_hit"].astype(bool)
     return df
 
 def clean_session_data(df: pd.DataFrame) -> pd.DataFrame:
@@ -70,7 +73,8 @@ def clean_user_data(df: pd.DataFrame) -> pd.DataFrame:
     df = df.dropna(subset=["user_id", "registration_date", "last_login"])
     
     # Conversion des types
-    df["is_premium"] = df["is_premium"].astype(bool)
+    # Valeur manquante → True, comme le astype(bool) historique (NaN est vrai)
+    df["is_premium"] = df["is_premium"].fillna(True).astype(bool)
     df["age"] = pd.to_numeric(df["age"], errors="coerce")
     df["total_orders"] = pd.to_numeric(df["total_orders"], errors="coerce")
     df["total_spent"] = pd.to_numeric(df["total_spent"], errors="coerce")
@@ -0,0 +1,49 @@
+# transformations/data_counters.py
+# 🔢 Compteurs de volume (lignes lues / produites, octets lus / écrits) alimentés par la
+# couche de transformation ; les mesures de monitoring/data_metrics.py s'y abonnent.
+# Bibliothèque standard uniquement.
+
+import threading
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Tuple
+
+COUNTERS = ("rows_in", "rows_out", "bytes_read", "bytes_written")
+
+# Compteurs actifs dans ce processus (mesures imbriquées) : add_counts les incrémente tous
+_active: List[Dict[str, int]] = []
+_lock = threading.Lock()  # Écritures de partitions en parallèle (threads)
+
+
+def add_counts(rows_in: int = 0, rows_out: int = 0, bytes_read: int = 0, bytes_written: int = 0) -> None:
+    """
+    Ajoute des volumes aux mesures en cours (sans effet hors mesure).
+    """
+    with _lock:
+        for counts in _active:
+            counts["rows_in"] += int(rows_in)
+            counts["rows_out"] += int(rows_out)
+            counts["bytes_read"] += int(bytes_read)
+            counts["bytes_written"] += int(bytes_written)
+
+
+@contextmanager
+def counting() -> Iterator[Dict[str, int]]:
+    """
+    Volumes signalés par add_counts pendant le bloc (dictionnaire mis à jour en place).
+    """
+    counts = dict.fromkeys(COUNTERS, 0)
+    _active.append(counts)
+    try:
+        yield counts
+    finally:
+        _active.remove(counts)
+
+
+def run_counted(fn: Callable, *args, **kwargs) -> Tuple[object, Dict[str, int]]:
+    """
+    Exécute fn et renvoie (résultat, volumes comptés pendant l'appel). Sert dans les
+    sous-processus (plages d'octets, membres d'archive) : le parent reporte les volumes
+    avec add_counts(**volumes).
+    """
+    with counting() as counts:
+        return fn(*args, **kwargs), counts
@@ -1,101 +1,219 @@
 # transformations/data_formatter.py
 
 import os
+import fcntl
 import pandas as pd
-
-def export_api_logs_partitioned(df_agg: pd.DataFrame, input_path: str):
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Callable, Iterable, List, Optional
+
+from transformations.data_aggregator import SESSION_DIMENSIONS, finalize_api_logs_state, finalize_session_state
+from transformations.data_categories import encode_categoricals
+from transformations.data_counters import add_counts
+from transformations.data_storage import (
+    SUPPORTED_FORMATS,
+    load_pipeline_config,
+    read_table,
+    resolve_table,
+    table_path,
+    write_table,
+)
+
+PROCESSED_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "data", "processed"))
+
+
+def write_partitions(df: pd.DataFrame, processed_root: str, partition_col: str,
+                     file_name: Callable[[str], str]) -> List[str]:
     """
-    Écrit les fichiers agrégés dans /data/processed/api_logs/YYYY-MM-DD/
+    Écrit un fichier par valeur de `partition_col` dans processed_root/<valeur>/.
+
+    Le DataFrame est découpé en une seule passe (groupby) puis les partitions sont
+    écrites en parallèle sur un pool de threads ; chaque fichier est publié de façon
+    atomique (temporaire puis rename) par write_table.
+
+    Args:
+        df (pd.DataFrame): Données à exporter.
+        processed_root (str): Répertoire racine des partitions.
+        partition_col (str): Colonne de partitionnement (date, country...).
+        file_name (Callable): Nom de fichier (sans extension) pour une valeur de partition.
+
+    Returns:
+        List[str]: Chemins des fichiers générés.
     """
-    processed_root = os.path.abspath(
-        os.path.join(os.path.dirname(__file__), "..", "data", "processed", "api_logs")
-    )
     os.makedirs(processed_root, exist_ok=True)
+    add_counts(rows_out=len(df))
+    max_workers = load_pipeline_config().get("partition_writer_threads", 4)
 
-    for date_str in df_agg["date"].unique():
-        partition_path = os.path.join(processed_root, date_str)
+    def flush(key, df_part: pd.DataFrame) -> str:
+        partition_path = os.path.join(processed_root, str(key))
         os.makedirs(partition_path, exist_ok=True)
+        return write_table(df_part.drop(columns=[partition_col]), os.path.join(partition_path, file_name(key)))
 
-        df_day = df_agg[df_agg["date"] == date_str].drop(columns=["date"])
-        output_file = os.path.join(partition_path, f"api_logs_{date_str}_kpi.csv")
-        df_day.to_csv(output_file, index=False)
-        # print(f"✅ Fichier généré : {output_file}")
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        futures = [pool.submit(flush, key, df_part) for key, df_part in df.groupby(partition_col, sort=False, observed=True)]
+        return [future.result() for future in futures]
 
-def export_session_data_partitioned(df: pd.DataFrame, input_path: str, data_type: str = "sessions") -> None:
+
+# ===============================
+# ➕ Partitions KPI fusionnées à l'écriture (merge-on-write)
+# ===============================
+# Chaque partition garde, à côté de son fichier KPI, une table d'état additive (_state :
+# sommes, comptes, sketches) avec une série de lignes par fichier source (input_file).
+# Un fichier qui arrive (même en retard) remplace ses propres lignes dans les seules
+# partitions qu'il touche, puis le KPI de ces partitions est recalculé depuis l'état :
+# coût proportionnel au fichier et aux partitions touchées, jamais de rescan des données brutes.
+
+STATE_NAME = "_state"
+STATE_SOURCE_COL = "input_file"
+
+
+@contextmanager
+def _partition_lock(partition_path: str):
+    """
+    Verrou inter-processus d'une partition (workers parallèles écrivant la même date).
     """
-    Exporte un DataFrame analysé vers un fichier CSV partitionné par date.
+    with open(os.path.join(partition_path, ".lock"), "w") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+
+
+def _remove_table(base_path: str) -> None:
+    for fmt in SUPPORTED_FORMATS:
+        if os.path.exists(table_path(base_path, fmt)):
+            os.remove(table_path(base_path, fmt))
+
+
+def merge_partitions(df_state: pd.DataFrame, processed_root: str, partition_col: str,
+                     file_name: Callable[[str], str], input_path: str,
+                     finalize: Callable[[pd.DataFrame], pd.DataFrame],
+                     previous_outputs: Iterable[str] = ()) -> List[str]:
+    """
+    Fusionne l'état additif d'un fichier source dans les partitions de processed_root.
 
     Args:
-        df (pd.DataFrame): DataFrame contenant une colonne 'date' pour partition.
-        input_path (str): Chemin du fichier source (utilisé pour nommer le fichier de sortie).
+        df_state (pd.DataFrame): État additif du fichier (clés, sommes, comptes, sketches).
+        processed_root (str): Répertoire racine des partitions.
+        partition_col (str): Colonne de partitionnement (date).
+        file_name (Callable): Nom du fichier KPI (sans extension) d'une partition.
+        input_path (str): Fichier source : ses lignes d'état précédentes sont remplacées.
+        finalize (Callable): Table d'état fusionnée (colonne de partition comprise) -> KPI.
+        previous_outputs (Iterable[str]): Sorties d'un traitement précédent du même fichier
+            (manifest) : ses partitions sont aussi recalculées, sans sa contribution périmée.
+
+    Returns:
+        List[str]: Chemins des fichiers KPI des partitions alimentées par ce fichier.
+    """
+    os.makedirs(processed_root, exist_ok=True)
+    add_counts(rows_out=len(df_state))
+    source = os.path.basename(input_path)
+    max_workers = load_pipeline_config().get("partition_writer_threads", 4)
+
+    parts = {str(key): df_part for key, df_part in df_state.groupby(partition_col, sort=False, observed=True)}
+    previous_outputs = [os.path.abspath(p) for p in previous_outputs]
+    for path in previous_outputs:
+        if os.path.dirname(os.path.dirname(path)) == os.path.abspath(processed_root):
+            parts.setdefault(os.path.basename(os.path.dirname(path)), None)
+
+    def merge(key: str, df_part: Optional[pd.DataFrame]) -> Optional[str]:
+        partition_path = os.path.join(processed_root, key)
+        os.makedirs(partition_path, exist_ok=True)
+        state_base = os.path.join(partition_path, STATE_NAME)
+        kpi_base = os.path.join(partition_path, file_name(key))
+        with _partition_lock(partition_path):
+            frames = []
+            try:
+                df_existing = read_table(resolve_table(state_base))
+                frames.append(df_existing[df_existing[STATE_SOURCE_COL] != source])
+            except FileNotFoundError:
+                pass
+            if df_part is not None:
+                frames.append(df_part.drop(columns=[partition_col]).assign(**{STATE_SOURCE_COL: source}))
+            df_merged = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+            if df_merged.empty:
+                _remove_table(state_base)
+                _remove_table(kpi_base)
+                return None
+
+            write_table(encode_categoricals(df_merged), state_base)
+            df_kpi = finalize(df_merged.drop(columns=[STATE_SOURCE_COL]).assign(**{partition_col: key}))
+            return write_table(encode_categoricals(df_kpi.drop(columns=[partition_col])), kpi_base)
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        futures = {key: pool.submit(merge, key, df_part) for key, df_part in parts.items()}
+        outputs = {key: future.result() for key, future in futures.items()}
+
+    # Anciennes sorties propres à ce fichier (nommage par fichier source) : remplacées par le KPI de partition
+    for path in previous_outputs:
+        key = os.path.basename(os.path.dirname(path))
+        if key in outputs and path != outputs[key] and not os.path.basename(path).startswith(file_name(key) + "."):
+            if os.path.exists(path):
+                os.remove(path)
+    return [output for output in outputs.values() if output]
+
+
+def export_api_logs_partitioned(df_state: pd.DataFrame, input_path: str,
+                                previous_outputs: Iterable[str] = ()) -> List[str]:
+    """
+    Fusionne l'état des logs API d'un fichier dans /data/processed/api_logs/YYYY-MM-DD/
+    (KPI api_logs_<date>_kpi recalculé sur tous les fichiers de la date).
+    """
+    processed_root = os.path.join(PROCESSED_ROOT, "api_logs")
+    return merge_partitions(df_state, processed_root, "date", lambda date_str: f"api_logs_{date_str}_kpi",
+                            input_path, finalize_api_logs_state, previous_outputs)
+
+
+def export_session_data_partitioned(df: pd.DataFrame, input_path: str, data_type: str = "sessions",
+                                    previous_outputs: Iterable[str] = (),
+                                    dimensions: List[str] = SESSION_DIMENSIONS) -> List[str]:
+    """
+    Fusionne l'état additif des sessions d'un fichier dans les partitions par date.
+
+    Args:
+        df (pd.DataFrame): État additif (session_state) contenant une colonne 'date' pour partition.
+        input_path (str): Chemin du fichier source (ses lignes d'état précédentes sont remplacées).
         data_type (str): Type de données (par défaut : 'sessions', peut être 'api_logs'...).
+        previous_outputs (Iterable[str]): Sorties d'un traitement précédent du fichier (manifest).
+        dimensions (List[str]): Dimensions d'agrégation de l'état.
+
+    Returns:
+        List[str]: Chemins des fichiers générés (sessions_<date>_aggregated, tous fichiers confondus).
     """
 
-    if df.empty:
+    if df.empty and not previous_outputs:
         print("⚠️  Le DataFrame est vide, aucun fichier généré.")
-        return
+        return []
 
     if "date" not in df.columns:
         raise ValueError("❌ La colonne 'date' est requise pour effectuer un export partitionné.")
 
-    processed_root = os.path.abspath(
-        os.path.join(os.path.dirname(__file__), "..", "data", "processed", "sessions")
-    )
-    os.makedirs(processed_root, exist_ok=True)
-
-    # Nom de base du fichier (ex: sessions_20250723.csv → sessions_20250723_aggregated.csv)
-    base_name = os.path.basename(input_path).replace(".csv", "").replace(".json", "")
-    output_base = f"{base_name}_aggregated.csv"
+    processed_root = os.path.join(PROCESSED_ROOT, data_type)
 
-    # Export pour chaque date
-    for date_str in df["date"].unique():
-        partition_path = os.path.join(processed_root, date_str)
-        os.makedirs(partition_path, exist_ok=True)
-
-        df_day = df[df["date"] == date_str].drop(columns=["date"])
-        output_path = os.path.join(partition_path, output_base)
-        df_day.to_csv(output_path, index=False)
+    # Un KPI par date (ex : sessions_2025-07-23_aggregated.<csv|parquet>), fusion de tous les fichiers
+    return merge_partitions(df, processed_root, "date", lambda date_str: f"{data_type}_{date_str}_aggregated",
+                            input_path, lambda df_state: finalize_session_state(df_state, dimensions),
+                            previous_outputs)
 
-        # print(f"✅ Fichier généré : {output_path}")
 
-def export_product_data_partitioned(df_agg: pd.DataFrame, input_path: str):
+def export_product_data_partitioned(df_agg: pd.DataFrame, input_path: str) -> List[str]:
     """
     Export des données produits agrégées dans /data/processed/products/YYYY-MM-DD/
     """
     if "date" not in df_agg.columns:
         raise ValueError("❌ La colonne 'date' est requise pour effectuer un export partitionné.")
 
-    processed_root = os.path.abspath(
-        os.path.join(os.path.dirname(__file__), "..", "data", "processed", "products")
-    )
-    os.makedirs(processed_root, exist_ok=True)
-
-    for date_str in df_agg["date"].unique():
-        partition_path = os.path.join(processed_root, date_str)
-        os.makedirs(partition_path, exist_ok=True)
+    processed_root = os.path.join(PROCESSED_ROOT, "products")
+    return write_partitions(df_agg, processed_root, "date", lambda date_str: f"products_{date_str}_summary")
 
-        df_day = df_agg[df_agg["date"] == date_str].drop(columns=["date"])
-        output_file = os.path.join(partition_path, f"products_{date_str}_summary.csv")
-        df_day.to_csv(output_file, index=False)
-        # print(f"✅ Fichier généré : {output_file}")
 
-def export_user_data_partitioned(df_agg: pd.DataFrame, input_path: str):
+def export_user_data_partitioned(df_agg: pd.DataFrame, input_path: str) -> List[str]:
     """
     Exporte les données agrégées des utilisateurs dans /data/processed/users/<country>/...
     """
     if "country" not in df_agg.columns:
         raise ValueError("❌ La colonne 'country' est requise pour effectuer un export partitionné.")
 
-    processed_root = os.path.abspath(
-        os.path.join(os.path.dirname(__file__), "..", "data", "processed", "sales")
-    )
-    os.makedirs(processed_root, exist_ok=True)
-
-    for country in df_agg["country"].unique():
-        partition_path = os.path.join(processed_root, country)
-        os.makedirs(partition_path, exist_ok=True)
-
-        df_country = df_agg[df_agg["country"] == country].drop(columns=["country"])
-        output_file = os.path.join(partition_path, f"users_{country}_summary.csv")
-        df_country.to_csv(output_file, index=False)
-        # print(f"✅ Fichier généré : {output_file}")
\ No newline at end of file
+    processed_root = os.path.join(PROCESSED_ROOT, "sales")
+    return write_partitions(df_agg, processed_root, "country", lambda country: f"users_{country}_summary")
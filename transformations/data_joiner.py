@@ -1,6 +1,30 @@
 import os
 import sys
+import glob
+import shutil
+import argparse
+import tempfile
+import numpy as np
 import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+
+# 📁 Ajout du chemin racine pour import relatif
+pipeline_root = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, pipeline_root)
+
+from monitoring.data_metrics import track
+from monitoring.data_profiler import NO_PROFILER, StepProfiler
+from transformations.data_categories import encode_categoricals
+from transformations.data_counters import add_counts
+from transformations.data_storage import (
+    iter_dataset,
+    list_dataset,
+    load_pipeline_config,
+    read_dataset,
+    read_table,
+    write_table,
+    write_table_batches,
+)
 
 # =======================================
 # 📁 Localisation des fichiers enrichis
@@ -11,44 +35,255 @@ ENRICHED_DIR = os.path.abspath(
 OUTPUT_DIR = os.path.abspath(
     os.path.join(os.path.dirname(__file__), "..", "data", "processed", "joined")
 )
-os.makedirs(OUTPUT_DIR, exist_ok=True)
 
-# =======================================
-# 📥 Chargement des fichiers enrichis
-# =======================================
-try:
-    df_users = pd.read_csv(os.path.join(ENRICHED_DIR, "sales_enriched.csv"))
-    df_sessions = pd.read_csv(os.path.join(ENRICHED_DIR, "sessions_enriched.csv"))
-    df_logs = pd.read_csv(os.path.join(ENRICHED_DIR, "logs_enriched.csv"))
-except Exception as e:
-    print(f"❌ Erreur de lecture des fichiers enrichis : {e}")
-    sys.exit(1)
+INPUTS = {
+    "users": "sales_enriched",
+    "sessions": "sessions_enriched",
+    "logs": "logs_enriched",
+}
+SHARD_KEY = "user_id"
+ROW_COL = "_row"  # Position d'origine des sessions, pour restituer l'ordre du merge en mémoire
 
-# =======================================
-# 🔗 Jointure utilisateurs ↔ sessions
-# =======================================
-try:
+
+def join_frames(df_sessions: pd.DataFrame, df_users: pd.DataFrame, df_logs: pd.DataFrame) -> pd.DataFrame:
+    """
+    Jointures sessions ↔ utilisateurs puis ↔ logs API (left joins). Les dimensions
+    catégorielles sont recodées sur les dictionnaires communs (pièces écrites à des
+    moments différents) pour rester catégorielles dans le résultat.
+    """
+    df_sessions, df_users, df_logs = (encode_categoricals(df) for df in (df_sessions, df_users, df_logs))
+    # 🔗 Jointure utilisateurs ↔ sessions
     df_merged = pd.merge(df_sessions, df_users, on="user_id", how="left")
-except Exception as e:
-    print(f"❌ Erreur lors de la jointure sessions ↔ utilisateurs : {e}")
-    sys.exit(1)
+    # 🔗 Jointure avec les logs API
+    return pd.merge(df_merged, df_logs, on=["session_id", "user_id"], how="left", suffixes=("", "_log"))
+
 
 # =======================================
-# 🔗 Jointure avec les logs API
+# 🧠 Mode mémoire (historique)
 # =======================================
-try:
-    df_merged = pd.merge(df_merged, df_logs, on=["session_id", "user_id"], how="left", suffixes=("", "_log"))
-except Exception as e:
-    print(f"❌ Erreur lors de la jointure avec les logs API : {e}")
-    sys.exit(1)
+
+def join_in_memory(profiler: StepProfiler = NO_PROFILER) -> str:
+    """
+    Charge les trois datasets enrichis (toutes leurs pièces) et les joint en mémoire.
+    """
+    try:
+        with profiler.step("read"):
+            df_users = read_dataset(os.path.join(ENRICHED_DIR, INPUTS["users"]))
+            df_sessions = read_dataset(os.path.join(ENRICHED_DIR, INPUTS["sessions"]))
+            df_logs = read_dataset(os.path.join(ENRICHED_DIR, INPUTS["logs"]))
+    except Exception as e:
+        print(f"❌ Erreur de lecture des fichiers enrichis : {e}")
+        sys.exit(1)
+
+    try:
+        with profiler.step("join"):
+            df_merged = join_frames(df_sessions, df_users, df_logs)
+    except Exception as e:
+        print(f"❌ Erreur lors de la jointure : {e}")
+        sys.exit(1)
+
+    add_counts(rows_out=len(df_merged))
+    with profiler.step("export"):
+        return write_table(df_merged, os.path.join(OUTPUT_DIR, "combined_sessions_data"))
+
 
 # =======================================
-# 💾 Export final du dataset joint
+# 🧩 Mode shardé (hors mémoire)
 # =======================================
-output_path = os.path.join(OUTPUT_DIR, "combined_sessions_data.csv")
-try:
-    df_merged.to_csv(output_path, index=False)
-    print(f"✅ Fichier de données jointes exporté : {output_path}")
-except Exception as e:
-    print(f"❌ Erreur lors de l'export du fichier final : {e}")
-    sys.exit(1)
+
+def shard_ids(keys: pd.Series, n_shards: int) -> np.ndarray:
+    """
+    Numéro de shard de chaque clé (hash stable, les clés égales tombent dans le même shard).
+    """
+    if pd.api.types.is_numeric_dtype(keys) and not pd.api.types.is_bool_dtype(keys):
+        keys = keys.astype("float64")
+    else:
+        keys = keys.astype(object)
+    return (pd.util.hash_pandas_object(keys, index=False).to_numpy() % n_shards).astype(np.int64)
+
+
+def partition_table(dataset_path: str, table_dir: str, n_shards: int, chunksize: int, add_row: bool = False) -> int:
+    """
+    Découpe un dataset enrichi sur disque en n_shards morceaux selon le hash de user_id.
+    Chaque bloc lu produit au plus un fichier par shard ; un fichier vide garde le schéma.
+    """
+    offset = 0
+    os.makedirs(table_dir, exist_ok=True)
+    empty_path = os.path.join(table_dir, "_empty.parquet")
+    for k, chunk in enumerate(iter_dataset(dataset_path, chunksize)):
+        if add_row:
+            chunk[ROW_COL] = np.arange(offset, offset + len(chunk), dtype=np.int64)
+        offset += len(chunk)
+        if k == 0:
+            chunk.iloc[:0].to_parquet(empty_path, index=False)
+
+        for shard, part in chunk.groupby(shard_ids(chunk[SHARD_KEY], n_shards), sort=False):
+            shard_dir = os.path.join(table_dir, f"shard_{shard:04d}")
+            os.makedirs(shard_dir, exist_ok=True)
+            part.to_parquet(os.path.join(shard_dir, f"part_{k:06d}.parquet"), index=False)
+
+    if not os.path.exists(empty_path):
+        # Dataset sans aucune ligne (aucun bloc lu) : schéma repris de sa première pièce
+        empty = read_table(list_dataset(dataset_path)[0]).iloc[:0]
+        if add_row:
+            empty[ROW_COL] = np.array([], dtype=np.int64)
+        empty.to_parquet(empty_path, index=False)
+    return offset
+
+
+def read_shard(table_dir: str, shard: int) -> pd.DataFrame:
+    parts = sorted(glob.glob(os.path.join(table_dir, f"shard_{shard:04d}", "*.parquet")))
+    if not parts:
+        return pd.read_parquet(os.path.join(table_dir, "_empty.parquet"))
+    return pd.concat([pd.read_parquet(p) for p in parts], ignore_index=True)
+
+
+def join_shard(task: tuple) -> str:
+    """
+    Joint un shard (sessions, utilisateurs, logs partageant les mêmes user_id).
+    La sortie reste triée par position d'origine des sessions.
+    """
+    shard_root, shard, output_dir = task
+    df_merged = join_frames(
+        read_shard(os.path.join(shard_root, "sessions"), shard),
+        read_shard(os.path.join(shard_root, "users"), shard),
+        read_shard(os.path.join(shard_root, "logs"), shard),
+    )
+    output_path = os.path.join(output_dir, f"joined_{shard:04d}.parquet")
+    df_merged.to_parquet(output_path, index=False)
+    return output_path
+
+
+def merge_sorted_shards(paths: list, batch_size: int):
+    """
+    Fusion k-voies des sorties de shards (chacune triée par ROW_COL) : restitue l'ordre
+    exact du merge en mémoire en ne gardant qu'un bloc par shard en mémoire.
+    """
+    import pyarrow.parquet as pq
+
+    readers = [pq.ParquetFile(p).iter_batches(batch_size=batch_size) for p in paths]
+
+    def next_batch(i):
+        for batch in readers[i]:
+            if batch.num_rows:
+                return batch.to_pandas()
+        return None
+
+    active = {}
+    for i in range(len(readers)):
+        batch = next_batch(i)
+        if batch is not None:
+            active[i] = batch
+
+    while active:
+        threshold = min(buf[ROW_COL].iloc[-1] for buf in active.values())
+        ready = []
+        for i in list(active):
+            buf = active[i]
+            n = int(np.searchsorted(buf[ROW_COL].to_numpy(), threshold, side="right"))
+            ready.append(buf.iloc[:n])
+            if n < len(buf):
+                active[i] = buf.iloc[n:]
+            else:
+                batch = next_batch(i)
+                if batch is None:
+                    del active[i]
+                else:
+                    active[i] = batch
+        df_ready = pd.concat(ready, ignore_index=True).sort_values(ROW_COL, kind="stable")
+        add_counts(rows_out=len(df_ready))
+        yield df_ready.drop(columns=[ROW_COL])
+
+
+def join_sharded(n_shards: int, workers: int, chunksize: int, profiler: StepProfiler = NO_PROFILER) -> str:
+    """
+    Jointure hors mémoire : partitionnement sur disque par hash de user_id, jointure
+    shard par shard (en parallèle si workers > 1), puis fusion ordonnée des résultats.
+    La mémoire de pointe dépend de la taille d'un shard, pas du volume total.
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    os.makedirs(OUTPUT_DIR, exist_ok=True)
+    shard_root = tempfile.mkdtemp(prefix="_shards_", dir=OUTPUT_DIR)
+    try:
+        try:
+            for name, base in INPUTS.items():
+                with profiler.step("read"):
+                    rows = partition_table(os.path.join(ENRICHED_DIR, base), os.path.join(shard_root, name),
+                                           n_shards, chunksize, add_row=(name == "sessions"))
+                print(f"🧩 {name} : {rows} lignes réparties en {n_shards} shards")
+        except Exception as e:
+            print(f"❌ Erreur de lecture des fichiers enrichis : {e}")
+            sys.exit(1)
+
+        output_dir = os.path.join(shard_root, "joined")
+        os.makedirs(output_dir)
+        tasks = [(shard_root, shard, output_dir) for shard in range(n_shards)]
+        try:
+            if workers > 1 and not profiler.enabled:
+                with ProcessPoolExecutor(max_workers=workers) as pool:
+                    paths = list(pool.map(join_shard, tasks))
+            else:
+                # Profilage : shards joints dans ce processus pour être mesurés
+                with profiler.step("join"):
+                    paths = [join_shard(task) for task in tasks]
+        except Exception as e:
+            print(f"❌ Erreur lors de la jointure : {e}")
+            sys.exit(1)
+
+        # Types communs à tous les shards (ex : int d'un shard complet, float d'un shard avec NaN)
+        schema = pa.unify_schemas([pq.read_schema(p) for p in paths], promote_options="permissive")
+        schema = schema.remove(schema.get_field_index(ROW_COL)).remove_metadata()
+        with profiler.step("export"):
+            return write_table_batches(merge_sorted_shards(paths, chunksize),
+                                       os.path.join(OUTPUT_DIR, "combined_sessions_data"), schema=schema)
+    finally:
+        shutil.rmtree(shard_root, ignore_errors=True)
+
+
+def run(mode: str = "memory", shards: int = 16, workers: int = 1, chunksize: int = 500_000,
+        profile: bool = False) -> int:
+    """
+    Jointure des trois datasets enrichis et export du dataset joint (code retour 0 / 1).
+    """
+    os.makedirs(OUTPUT_DIR, exist_ok=True)
+    profiler = StepProfiler(f"joiner_{mode}", enabled=profile)
+
+    # =======================================
+    # 💾 Export final du dataset joint
+    # =======================================
+    try:
+        if mode == "sharded":
+            output_path = join_sharded(shards, workers, chunksize, profiler)
+        else:
+            output_path = join_in_memory(profiler)
+        profiler.report()
+        print(f"✅ Fichier de données jointes exporté : {output_path}")
+    except Exception as e:
+        print(f"❌ Erreur lors de l'export du fichier final : {e}")
+        return 1
+    return 0
+
+
+def main() -> None:
+    config = load_pipeline_config()
+    parser = argparse.ArgumentParser(description="Consolidation des données enrichies (sessions, utilisateurs, logs)")
+    parser.add_argument('--mode', choices=["memory", "sharded"], default=config.get("join_mode", "memory"),
+                        help="Jointure en mémoire ou hors mémoire par shards de user_id")
+    parser.add_argument('--shards', type=int, default=config.get("join_shards", 16), help="Nombre de shards")
+    parser.add_argument('--workers', type=int, default=config.get("join_workers", 1),
+                        help="Shards joints en parallèle")
+    parser.add_argument('--chunksize', type=int, default=500_000, help="Taille des blocs de lecture (lignes)")
+    parser.add_argument('--profile', action='store_true',
+                        help="Profiler chaque étape (cProfile + tracemalloc), rapport dans data/quality/")
+    args = parser.parse_args()
+
+    with track(f"data_joiner:{args.mode}") as metrics:
+        code = run(args.mode, args.shards, args.workers, args.chunksize, args.profile)
+        metrics["status"] = "ok" if code == 0 else "failed"
+    sys.exit(code)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,177 @@
+# transformations/data_profile.py
+# 🧬 Profil de colonnes calculé pendant la première lecture d'un fichier : lignes, nulls,
+# min / max, valeurs distinctes (estimation HLL, liste exacte si peu nombreuses), type et
+# conformité au schéma. Mis en cache sur disque par hash de contenu, il est relu par la
+# validation (complétude, plages) et le dashboard sans reparser le fichier.
+
+import json
+import os
+from datetime import datetime, timezone
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+from orchestration.manifest import file_hash
+from transformations.data_sketches import HLL, empty_sketch, hll_estimate, hll_from_hashes, merge_sketches
+from transformations.data_storage import PIPELINE_ROOT
+
+PROFILES_DIR = os.path.join(PIPELINE_ROOT, "data", "profiles")
+VALUES_CAP = 50  # Valeurs distinctes conservées exactement (colonnes peu cardinales)
+SINGLE_GROUP = np.zeros(1, np.int64)
+
+
+def _is_numeric(s: pd.Series) -> bool:
+    return pd.api.types.is_numeric_dtype(s) and not pd.api.types.is_bool_dtype(s)
+
+
+def _scalar(value):
+    """
+    Valeur JSON : scalaires NumPy ramenés en types Python.
+    """
+    if value is None or pd.isna(value):
+        return None
+    return value.item() if isinstance(value, np.generic) else value
+
+
+def _hashes(s: pd.Series) -> np.ndarray:
+    """
+    Hash 64 bits des valeurs non nulles d'une colonne, sans conversion en texte :
+    un fichier garde le même type par colonne, d'un chunk à l'autre.
+    """
+    s = s.dropna()
+    if pd.api.types.is_datetime64_any_dtype(s):
+        s = pd.Series(s.to_numpy(dtype="datetime64[ns]").view(np.int64))
+    elif _is_numeric(s):
+        s = s.astype("float64")
+    return pd.util.hash_pandas_object(s, index=False).to_numpy()
+
+
+class ColumnProfile:
+    """
+    Profil en construction, alimenté colonne par colonne (fichier entier ou chunk par chunk).
+    Chaque colonne est vue comme par la validation : typée si conforme au schéma, brute sinon.
+    """
+
+    def __init__(self):
+        self.rows = 0
+        self.columns = {}
+
+    def update(self, col: str, s: pd.Series, conforms: Optional[bool] = None) -> None:
+        state = self.columns.get(col)
+        if state is None:
+            state = self.columns[col] = {
+                "dtype": str(s.dtype), "numeric": _is_numeric(s), "conforms": conforms, "nulls": 0,
+                "min": None, "max": None, "sketch": empty_sketch(), "values": set(),
+            }
+        elif state["dtype"] != str(s.dtype):
+            # Chunks de types différents (ex : int64 puis float64 avec des manquants)
+            state["numeric"] = state["numeric"] and _is_numeric(s)
+            state["dtype"] = "float64" if state["numeric"] else "object"
+        if conforms is not None:
+            state["conforms"] = state["conforms"] is not False and conforms
+        state["nulls"] += int(s.isna().sum())
+
+        if _is_numeric(s) or pd.api.types.is_datetime64_any_dtype(s):
+            low, high = s.min(), s.max()
+            if not pd.isna(low):
+                state["min"] = low if state["min"] is None else min(state["min"], low)
+                state["max"] = high if state["max"] is None else max(state["max"], high)
+
+        hashes = _hashes(s)
+        sketch = hll_from_hashes(hashes, np.zeros(len(hashes), np.int64))
+        state["sketch"] = merge_sketches([state["sketch"], sketch], [SINGLE_GROUP, SINGLE_GROUP], HLL)
+        if state["values"] is not None:
+            if pd.api.types.is_datetime64_any_dtype(s) or hll_estimate(sketch, 1)[0] > 2 * VALUES_CAP:
+                state["values"] = None
+            else:
+                try:
+                    state["values"].update(_scalar(v) for v in pd.unique(s.dropna()))
+                except TypeError:
+                    state["values"] = None  # Valeurs non hachables (objets JSON imbriqués)
+                if state["values"] is not None and len(state["values"]) > VALUES_CAP:
+                    state["values"] = None
+
+    def update_frame(self, df: pd.DataFrame, conforms: Optional[dict] = None) -> None:
+        """
+        Ajoute un chunk entier (conformité au schéma par colonne, None hors schéma).
+        """
+        self.rows += len(df)
+        for col in df.columns:
+            self.update(col, df[col], (conforms or {}).get(col))
+
+    def to_dict(self) -> dict:
+        columns = {}
+        for col, state in self.columns.items():
+            low, high = state["min"], state["max"]
+            if isinstance(low, pd.Timestamp):
+                low, high = low.isoformat(), high.isoformat()
+            columns[col] = {
+                "dtype": state["dtype"],
+                "numeric": state["numeric"],
+                "conforms": state["conforms"],
+                "nulls": state["nulls"],
+                "min": _scalar(low),
+                "max": _scalar(high),
+                "distinct": int(hll_estimate(state["sketch"], 1)[0]),
+                "values": sorted(state["values"], key=str) if state["values"] is not None else None,
+            }
+        return {"rows": self.rows, "columns": columns}
+
+
+# ===============================
+# 💾 Cache sur disque (clé : hash de contenu)
+# ===============================
+
+def profile_key(input_path: str) -> str:
+    """
+    Clé du profil : hash de contenu (CRC du répertoire central pour un membre d'archive).
+    """
+    return file_hash(input_path).replace(":", "_")
+
+
+def profile_path(source: Optional[str], key: str) -> str:
+    return os.path.join(PROFILES_DIR, f"{source or 'raw'}_{key}.json")
+
+
+def load_profile_by_key(source: Optional[str], key: str) -> Optional[dict]:
+    path = profile_path(source, key)
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def load_profile(input_path: str, source: Optional[str]) -> Optional[dict]:
+    """
+    Profil en cache pour ce contenu, None s'il n'a pas encore été calculé.
+    """
+    return load_profile_by_key(source, profile_key(input_path))
+
+
+def has_profile(input_path: str, source: Optional[str]) -> bool:
+    return os.path.exists(profile_path(source, profile_key(input_path)))
+
+
+def save_profile(input_path: str, source: Optional[str], profile: ColumnProfile) -> str:
+    """
+    Écrit le profil (écriture atomique : plusieurs lecteurs du même contenu en parallèle).
+    """
+    key = profile_key(input_path)
+    data = {
+        "content_hash": key,
+        "source": source,
+        "filename": os.path.basename(input_path),
+        "profiled_at": datetime.now(timezone.utc).isoformat().replace("+00:00", "Z"),
+        **profile.to_dict(),
+    }
+    os.makedirs(PROFILES_DIR, exist_ok=True)
+    path = profile_path(source, key)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, default=str)
+    os.replace(tmp_path, path)
+    return path
@@ -0,0 +1,303 @@
+# transformations/data_reader.py
+
+import json
+import os
+from contextlib import contextmanager, nullcontext
+from functools import lru_cache
+from typing import Iterator, List, Optional, Tuple
+
+import pandas as pd
+
+from transformations.data_cache import CacheWriter, cache_enabled, iter_cached, load_cached, save_cached
+from transformations.data_categories import encode_categoricals
+from transformations.data_counters import add_counts
+from transformations.data_profile import ColumnProfile, has_profile, save_profile
+from transformations.data_splitter import open_range
+from transformations.data_storage import PIPELINE_ROOT, load_pipeline_config
+from transformations.data_zip import (
+    archive_member_path, input_size, is_stream_only, list_archive_members, open_input, source_extension,
+)
+
+SCHEMAS_PATH = os.path.join(PIPELINE_ROOT, "config", "data_schemas.json")
+
+# Types de data_schemas.json → dtypes imposés à la lecture (les entiers et booléens
+# nullables valident les valeurs au parsing, avant d'être ramenés en types NumPy)
+SCHEMA_DTYPES = {"string": str, "integer": "Int64", "float": "float64", "boolean": "boolean"}
+BOOLEAN_MAP = {True: True, False: False, "True": True, "False": False, "true": True, "false": False}
+
+
+@lru_cache(maxsize=None)
+def load_schemas(schemas_path: str = SCHEMAS_PATH) -> dict:
+    """
+    Charge data_schemas.json (une seule fois par processus).
+    """
+    if not os.path.exists(schemas_path):
+        return {}
+    with open(schemas_path) as f:
+        return json.load(f)
+
+
+def schema_columns(source: Optional[str]) -> dict:
+    """
+    Colonnes typées d'une source (logs, sessions, products, users) : {colonne: type}.
+    """
+    return load_schemas().get(source or "", {}).get("required_columns", {})
+
+
+@lru_cache(maxsize=None)
+def has_pyarrow() -> bool:
+    try:
+        import pyarrow  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+def read_options(source: Optional[str], columns: Optional[List[str]] = None) -> Tuple[dict, list]:
+    """
+    Traduit le schéma d'une source en options de lecture pandas : (dtype, parse_dates).
+    """
+    types = schema_columns(source)
+    if columns is not None:
+        types = {col: t for col, t in types.items() if col in columns}
+    dtype = {col: SCHEMA_DTYPES[t] for col, t in types.items() if t in SCHEMA_DTYPES}
+    parse_dates = [col for col, t in types.items() if t == "datetime"]
+    return dtype, parse_dates
+
+
+# ===============================
+# 🔁 Conversion vers les types du schéma
+# ===============================
+
+def _convert(s: pd.Series, expected: str, strict: bool) -> pd.Series:
+    """
+    Convertit une colonne vers le type attendu. strict=True lève une erreur sur la
+    première valeur invalide ; sinon les valeurs invalides deviennent nulles.
+    """
+    errors = "raise" if strict else "coerce"
+    if expected == "datetime":
+        if pd.api.types.is_datetime64_any_dtype(s):
+            return s
+        return pd.to_datetime(s, errors=errors)
+    if expected in ("integer", "float"):
+        if pd.api.types.is_bool_dtype(s):
+            raise TypeError(f"booléens dans une colonne numérique ({s.name})")
+        numeric = pd.to_numeric(s, errors=errors)
+        if expected == "float":
+            return numeric.astype("float64")
+        if not pd.api.types.is_integer_dtype(numeric) and not (numeric.dropna() % 1 == 0).all():
+            if strict:
+                raise ValueError(f"valeurs non entières ({s.name})")
+            return numeric.astype("float64")
+        # Même représentation que l'inférence pandas : int64, ou float64 s'il manque des valeurs
+        return numeric.astype("float64" if numeric.isna().any() else "int64")
+    if expected == "boolean":
+        if not pd.api.types.is_bool_dtype(s):
+            mapped = s.map(BOOLEAN_MAP)
+            if strict and (s.notna() & mapped.isna()).any():
+                raise ValueError(f"valeurs non booléennes ({s.name})")
+            s = mapped.astype("boolean")
+        # Sans manquants : bool NumPy ; sinon booléen nullable
+        return s.astype(bool) if not s.isna().any() else s.astype("boolean")
+    # "string" : identifiants numériques d'Excel/JSON remis en texte
+    if pd.api.types.is_numeric_dtype(s) or pd.api.types.is_bool_dtype(s):
+        return s.map(str, na_action="ignore")
+    return s
+
+
+def apply_schema(df: pd.DataFrame, source: Optional[str], coerce: bool = True,
+                 profile: Optional[ColumnProfile] = None) -> pd.DataFrame:
+    """
+    Impose les types du schéma aux colonnes présentes (quasi gratuit si la lecture les a
+    déjà produits). Une colonne invalide est convertie en mode tolérant (coerce=True,
+    valeurs invalides → nulles) ou laissée brute (coerce=False, pour la validation).
+    Le profil éventuel voit les colonnes avant toute coercition, comme la validation.
+    """
+    conforms = {}
+    invalid = {}
+    for col, expected in schema_columns(source).items():
+        if col not in df.columns:
+            continue
+        try:
+            df[col] = _convert(df[col], expected, strict=True)
+            conforms[col] = True
+        except (ValueError, TypeError, OverflowError):
+            conforms[col] = False
+            if coerce:
+                invalid[col] = df[col]
+                df[col] = _convert(df[col], expected, strict=False)
+    if profile is not None:
+        profile.update_frame(df.assign(**invalid) if invalid else df, conforms)
+    return df
+
+
+# ===============================
+# 📥 Lecture typée
+# ===============================
+
+def api_log_members(zip_path: str, member_root: Optional[str] = None) -> List[str]:
+    """
+    Membres .json.gz de api_logs.zip à lire en flux (chemins logiques <archive.zip>/<membre>,
+    sous `member_root` s'il est précisé : archive pas encore déposée dans le staging),
+    limités aux `api_logs_max_members` premiers si ce réglage est renseigné.
+    """
+    limit = load_pipeline_config().get("api_logs_max_members")
+    members = list_archive_members(zip_path, "*.json.gz", limit)
+    return [archive_member_path(member_root or zip_path, m) for m in members]
+
+
+def _bytes_read(input_path: str, byte_range: Optional[tuple]) -> int:
+    return byte_range[1] - byte_range[0] if byte_range is not None else input_size(input_path)
+
+
+@contextmanager
+def _open(input_path: str, byte_range: Optional[tuple]):
+    """
+    Source à passer à pandas : le chemin, une plage d'octets (début, fin, préfixe), ou un
+    flux décompressé pour un membre d'archive zip / fichier gzip.
+    """
+    if byte_range is not None:
+        with open_range(input_path, *byte_range) as f:
+            yield f
+    elif is_stream_only(input_path):
+        with open_input(input_path) as f:
+            yield f
+    else:
+        yield input_path
+
+
+def _read_csv(input_path: str, source: Optional[str], columns: Optional[List[str]],
+              byte_range: Optional[tuple]) -> pd.DataFrame:
+    dtype, parse_dates = read_options(source, columns)
+    engine = "pyarrow" if has_pyarrow() else "c"
+    try:
+        with _open(input_path, byte_range) as src:
+            return pd.read_csv(src, usecols=columns, dtype=dtype, parse_dates=parse_dates, engine=engine)
+    except (ValueError, TypeError):
+        # Valeurs non conformes au schéma : seules les colonnes texte sont imposées,
+        # les autres sont converties ensuite par apply_schema
+        dtype = {col: t for col, t in dtype.items() if t is str}
+        with _open(input_path, byte_range) as src:
+            return pd.read_csv(src, usecols=columns, dtype=dtype)
+
+
+def _read_json(input_path: str, columns: Optional[List[str]], byte_range: Optional[tuple]) -> pd.DataFrame:
+    df = None
+    if has_pyarrow():
+        try:
+            with _open(input_path, byte_range) as src:
+                df = pd.read_json(src, lines=True, engine="pyarrow")
+        except ValueError:
+            df = None  # Lignes hétérogènes : repli sur le parseur pandas
+    if df is None:
+        with _open(input_path, byte_range) as src:
+            df = pd.read_json(src, lines=True, dtype=False, convert_dates=False)
+    return df[columns] if columns is not None else df
+
+
+def _parse(input_path: str, source: Optional[str], columns: Optional[List[str]],
+           byte_range: Optional[tuple]) -> pd.DataFrame:
+    ext = source_extension(input_path)
+    if ext == ".csv":
+        return _read_csv(input_path, source, columns, byte_range)
+    elif ext == ".json":
+        return _read_json(input_path, columns, byte_range)
+    elif ext == ".xlsx":
+        dtype = {col: t for col, t in read_options(source, columns)[0].items() if t is str}
+        return pd.read_excel(input_path, engine="openpyxl", usecols=columns, dtype=dtype)
+    raise ValueError(f"Format non supporté : {ext}")
+
+
+def read_source(input_path: str, source: Optional[str], columns: Optional[List[str]] = None,
+                coerce: bool = True, byte_range: Optional[tuple] = None,
+                categorical: bool = True, column_profile: bool = False) -> pd.DataFrame:
+    """
+    Lit un fichier d'entrée (CSV, JSONL ou XLSX) avec les types de data_schemas.json :
+    dtypes explicites et parse_dates à la lecture, moteur pyarrow si disponible.
+    Les entrées .gz et les membres d'archive (<archive.zip>/<membre>) sont lus en flux.
+    Avec le cache de parsing (`parse_cache`), une lecture complète conserve le résultat brut
+    du parseur en Arrow IPC ; les lectures suivantes du même contenu le projettent en mémoire.
+
+    Args:
+        input_path (str): Fichier (ou membre d'archive) à lire.
+        source (str): Source du schéma (logs, sessions, products, users) ; None = sans schéma.
+        columns (list): Colonnes à charger (usecols) ; None = toutes.
+        coerce (bool): Valeurs invalides → nulles (processeurs) ou laissées brutes (validation).
+        byte_range (tuple): (début, fin, préfixe) pour ne lire qu'une plage d'octets.
+        categorical (bool): Encoder les dimensions configurées en catégories (dictionnaires persistés).
+        column_profile (bool): Calculer et mettre en cache le profil de colonnes du fichier
+            s'il n'existe pas encore (lecture complète uniquement).
+
+    Returns:
+        pd.DataFrame: Données typées.
+    """
+    use_cache = byte_range is None and cache_enabled()
+    df = load_cached(input_path, source, columns) if use_cache else None
+    if df is not None:
+        add_counts(rows_in=len(df))  # Projection du cache : rien n'est relu dans la source
+    else:
+        df = _parse(input_path, source, columns, byte_range)
+        add_counts(rows_in=len(df), bytes_read=_bytes_read(input_path, byte_range))
+        if use_cache and columns is None:
+            save_cached(input_path, source, df)  # Avant apply_schema, qui modifie df en place
+    profile = None
+    if column_profile and columns is None and byte_range is None and not has_profile(input_path, source):
+        profile = ColumnProfile()
+    df = apply_schema(df, source, coerce, profile)
+    if profile is not None:
+        save_profile(input_path, source, profile)
+    return encode_categoricals(df) if categorical else df
+
+
+def iter_source(input_path: str, source: Optional[str], chunksize: int, coerce: bool = True,
+                byte_range: Optional[tuple] = None, categorical: bool = True,
+                column_profile: bool = False) -> Iterator[pd.DataFrame]:
+    """
+    Lit un fichier JSONL ou CSV par chunks de `chunksize` lignes, chaque chunk étant typé
+    selon le schéma (les conversions de dates ne sont faites qu'une fois, ici).
+    Un membre d'archive zip / fichier gzip est décompressé au fil de la lecture.
+    Avec column_profile, le profil de colonnes est cumulé chunk par chunk et mis en cache
+    une fois le fichier lu en entier. Le cache de parsing est lu par tranches s'il existe,
+    écrit au fil des chunks sinon (publié seulement si le fichier a été lu jusqu'au bout).
+    """
+    ext = source_extension(input_path)
+    if ext not in (".json", ".csv"):
+        raise ValueError(f"Lecture par chunks non supportée : {ext}")
+    use_cache = byte_range is None and cache_enabled()
+    cached = iter_cached(input_path, source, chunksize) if use_cache else None
+    writer = CacheWriter(input_path, source) if use_cache and cached is None else None
+    if cached is None:
+        add_counts(bytes_read=_bytes_read(input_path, byte_range))
+    profile = None
+    if column_profile and byte_range is None and not has_profile(input_path, source):
+        profile = ColumnProfile()
+    complete = False
+    try:
+        with nullcontext(cached) if cached is not None else _chunk_reader(input_path, ext, source, chunksize,
+                                                                          byte_range) as reader:
+            for chunk in reader:
+                add_counts(rows_in=len(chunk))
+                if writer is not None:
+                    writer.write(chunk)
+                chunk = apply_schema(chunk, source, coerce, profile)
+                yield encode_categoricals(chunk) if categorical else chunk
+        complete = True
+    finally:
+        # Lecture interrompue : cache incomplet non publié
+        if writer is not None:
+            writer.close() if complete else writer.abort()
+    if profile is not None:
+        save_profile(input_path, source, profile)
+
+
+@contextmanager
+def _chunk_reader(input_path: str, ext: str, source: Optional[str], chunksize: int,
+                  byte_range: Optional[tuple]):
+    with _open(input_path, byte_range) as src:
+        if ext == ".json":
+            reader = pd.read_json(src, lines=True, chunksize=chunksize, dtype=False, convert_dates=False)
+        else:
+            dtype = {col: t for col, t in read_options(source)[0].items() if t is str}
+            reader = pd.read_csv(src, dtype=dtype, chunksize=chunksize)
+        with reader:
+            yield reader
@@ -0,0 +1,247 @@
+# transformations/data_sketches.py
+# 🧮 Sketches fusionnables pour les agrégats : HyperLogLog (valeurs distinctes) et
+# histogramme logarithmique à précision relative (quantiles, façon DDSketch).
+#
+# Un lot de sketches est gardé sous forme « longue » : un DataFrame (group, bin, value)
+# où group est la position de la ligne d'agrégat, bin un registre HLL ou un bucket de
+# l'histogramme, value le rang maximal (HLL) ou le nombre de valeurs (histogramme).
+# Construction, fusion, estimation et quantiles sont vectorisés (groupby / cumsum).
+# Seuls les registres ou buckets non vides sont stockés.
+
+import base64
+from typing import List, Sequence
+
+import numpy as np
+import pandas as pd
+
+from transformations.data_storage import load_pipeline_config
+
+HLL = "hll"
+QUANTILES = "quantiles"
+SKETCH_COLUMNS = ["group", "bin", "value"]
+
+ZERO_BUCKET = np.iinfo(np.int32).min  # Valeurs <= 0 (temps nul)
+BIN_OFFSET = 1 << 31
+
+
+def hll_precision() -> int:
+    """
+    Nombre de bits d'index HLL (m = 2^p registres, erreur type ≈ 1.04 / sqrt(m)).
+    """
+    return int(load_pipeline_config().get("sketch_hll_precision", 12))
+
+
+def relative_accuracy() -> float:
+    """
+    Précision relative des quantiles (0.01 : valeur rendue à ±1 % de la valeur exacte).
+    """
+    return float(load_pipeline_config().get("sketch_relative_accuracy", 0.01))
+
+
+def empty_sketch() -> pd.DataFrame:
+    return pd.DataFrame({"group": np.empty(0, np.int64), "bin": np.empty(0, np.int32),
+                         "value": np.empty(0, np.int64)})
+
+
+def _reduce(group: np.ndarray, bins: np.ndarray, values: np.ndarray, how: str) -> pd.DataFrame:
+    """
+    Regroupe les entrées (group, bin) : max des rangs (HLL) ou somme des comptes (quantiles).
+    """
+    if len(group) == 0:
+        return empty_sketch()
+    # Clé unique (group, bin décalé en positif) : un seul groupby entier, trié dans l'ordre (group, bin)
+    key = (group.astype(np.int64) << 32) | (bins.astype(np.int64) + BIN_OFFSET)
+    reduced = pd.Series(values.astype(np.int64)).groupby(key, sort=True).agg(how)
+    key = reduced.index.to_numpy()
+    return pd.DataFrame({"group": key >> 32, "bin": ((key & 0xFFFFFFFF) - BIN_OFFSET).astype(np.int32),
+                         "value": reduced.to_numpy()})
+
+
+def _hash_values(values: pd.Series) -> np.ndarray:
+    """
+    Hash 64 bits stable des valeurs, indépendant du dtype (catégorie, str, objet, entier).
+    """
+    if pd.api.types.is_numeric_dtype(values) and not pd.api.types.is_bool_dtype(values):
+        values = values.astype("float64")
+    else:
+        values = values.astype(str)
+    return pd.util.hash_pandas_object(values, index=False).to_numpy()
+
+
+def _bit_length(x: np.ndarray) -> np.ndarray:
+    """
+    Nombre de bits significatifs d'entiers uint64 (frexp exact sur chaque moitié de 32 bits).
+    """
+    hi = np.frexp((x >> np.uint64(32)).astype(np.float64))[1]
+    lo = np.frexp((x & np.uint64(0xFFFFFFFF)).astype(np.float64))[1]
+    return np.where(hi > 0, hi + 32, lo)
+
+
+# ===============================
+# 🔢 HyperLogLog
+# ===============================
+
+def hll_sketch(values: pd.Series, groups: np.ndarray, p: int = None) -> pd.DataFrame:
+    """
+    Registres HLL non nuls de chaque groupe (valeurs nulles ignorées).
+    """
+    mask = values.notna().to_numpy()
+    if not mask.any():
+        return empty_sketch()
+    return hll_from_hashes(_hash_values(values[mask]), np.asarray(groups)[mask], p)
+
+
+def hll_from_hashes(hashes: np.ndarray, groups: np.ndarray, p: int = None) -> pd.DataFrame:
+    """
+    Registres HLL non nuls de chaque groupe à partir de hash 64 bits déjà calculés.
+    """
+    p = p or hll_precision()
+    if len(hashes) == 0:
+        return empty_sketch()
+    register = (hashes >> np.uint64(64 - p)).astype(np.int32)
+    # Bits restants + bit sentinelle : rang = position du premier 1 (au plus 64 - p + 1)
+    rest = (hashes << np.uint64(p)) | np.uint64(1 << (p - 1))
+    rank = 65 - _bit_length(rest)
+    return _reduce(np.asarray(groups), register, rank, "max")
+
+
+def hll_estimate(sketch: pd.DataFrame, n_groups: int, p: int = None) -> np.ndarray:
+    """
+    Estimation du nombre de valeurs distinctes de chaque groupe (correction petites cardinalités).
+    """
+    p = p or hll_precision()
+    m = 1 << p
+    group = sketch["group"].to_numpy()
+    inverse_sum = np.bincount(group, weights=np.exp2(-sketch["value"].to_numpy(np.float64)), minlength=n_groups)
+    zeros = m - np.bincount(group, minlength=n_groups)
+    inverse_sum = inverse_sum + zeros  # Registres vides : 2^0
+    alpha = 0.7213 / (1 + 1.079 / m)
+    raw = alpha * m * m / inverse_sum
+    with np.errstate(divide="ignore"):
+        linear = m * np.log(m / np.maximum(zeros, 1))
+    estimate = np.where((raw <= 2.5 * m) & (zeros > 0), linear, raw)
+    return np.round(estimate).astype(np.int64)
+
+
+# ===============================
+# 📈 Quantiles (histogramme logarithmique)
+# ===============================
+
+def _gamma(accuracy: float) -> float:
+    return (1 + accuracy) / (1 - accuracy)
+
+
+def quantile_sketch(values: pd.Series, groups: np.ndarray, accuracy: float = None) -> pd.DataFrame:
+    """
+    Histogramme par groupe : bucket i = ]gamma^(i-1), gamma^i] (valeurs nulles ignorées).
+    """
+    gamma = _gamma(accuracy or relative_accuracy())
+    x = pd.to_numeric(values, errors="coerce").to_numpy(np.float64, na_value=np.nan)
+    mask = ~np.isnan(x)
+    if not mask.any():
+        return empty_sketch()
+    x = x[mask]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        bucket = np.ceil(np.log(x) / np.log(gamma))
+    bucket = np.where(x > 0, bucket, ZERO_BUCKET).astype(np.int32)
+    return _reduce(np.asarray(groups)[mask], bucket, np.ones(len(x), np.int64), "sum")
+
+
+def bucket_values(bins: np.ndarray, accuracy: float = None) -> np.ndarray:
+    """
+    Valeur représentative de chaque bucket : centre relatif (erreur relative <= précision).
+    """
+    gamma = _gamma(accuracy or relative_accuracy())
+    bins = np.asarray(bins)
+    return np.where(bins == ZERO_BUCKET, 0.0, 2 * np.power(gamma, bins.astype(np.float64)) / (gamma + 1))
+
+
+def sketch_quantiles(sketch: pd.DataFrame, n_groups: int, quantiles: Sequence[float],
+                     accuracy: float = None) -> np.ndarray:
+    """
+    Quantiles de chaque groupe (n_groups x len(quantiles)), NaN pour un groupe sans valeur.
+    Le sketch doit être trié par (group, bin), ce que garantissent sa construction et sa fusion.
+    """
+    result = np.full((n_groups, len(quantiles)), np.nan)
+    if sketch.empty:
+        return result
+    group = sketch["group"].to_numpy()
+    counts = sketch["value"].to_numpy()
+    cumulative = np.cumsum(counts)
+    totals = np.bincount(group, weights=counts, minlength=n_groups).astype(np.int64)
+    offsets = np.concatenate([[0], np.cumsum(totals)[:-1]])
+    present = totals > 0
+    representative = bucket_values(sketch["bin"].to_numpy(), accuracy)
+    for k, q in enumerate(quantiles):
+        rank = np.floor(q * (totals[present] - 1)).astype(np.int64)
+        position = np.searchsorted(cumulative, offsets[present] + rank, side="right")
+        result[present, k] = representative[position]
+    return result
+
+
+# ===============================
+# 🔗 Fusion et sérialisation
+# ===============================
+
+def merge_sketches(sketches: List[pd.DataFrame], group_maps: List[np.ndarray], kind: str) -> pd.DataFrame:
+    """
+    Fusionne des lots de sketches : group_maps[i] donne, pour chaque groupe du lot i,
+    son groupe dans le résultat (ex : ngroup() après concaténation des agrégats).
+    """
+    parts = [s for s in sketches if not s.empty]
+    if not parts:
+        return empty_sketch()
+    group = np.concatenate([np.asarray(g)[s["group"].to_numpy()] for s, g in zip(sketches, group_maps) if not s.empty])
+    bins = np.concatenate([s["bin"].to_numpy() for s in parts])
+    values = np.concatenate([s["value"].to_numpy() for s in parts])
+    return _reduce(group, bins, values, "max" if kind == HLL else "sum")
+
+
+def _header(kind: str) -> np.ndarray:
+    if kind == HLL:
+        return np.array([hll_precision()], np.float32)
+    return np.array([relative_accuracy()], np.float32)
+
+
+def encode_sketches(sketch: pd.DataFrame, n_groups: int, kind: str) -> List[str]:
+    """
+    Sérialise chaque groupe en base64 (en-tête : paramètre du sketch, puis bins int32 et
+    valeurs) pour être stocké dans une colonne texte, en CSV comme en Parquet.
+    """
+    header = _header(kind).tobytes()
+    value_dtype = np.uint8 if kind == HLL else np.int64
+    group = sketch["group"].to_numpy()
+    bins = sketch["bin"].to_numpy(np.int32)
+    values = sketch["value"].to_numpy().astype(value_dtype)
+    bounds = np.searchsorted(group, np.arange(n_groups + 1))
+    encoded = []
+    for g in range(n_groups):
+        start, end = bounds[g], bounds[g + 1]
+        payload = header + bins[start:end].tobytes() + values[start:end].tobytes()
+        encoded.append(base64.b64encode(payload).decode("ascii"))
+    return encoded
+
+
+def decode_sketches(column: pd.Series, kind: str) -> pd.DataFrame:
+    """
+    Reconstruit le lot de sketches d'une colonne sérialisée (group = position de la ligne).
+    Refuse des sketches construits avec d'autres paramètres (fusion incohérente).
+    """
+    expected = _header(kind)
+    value_dtype = np.uint8 if kind == HLL else np.int64
+    entry_size = 4 + np.dtype(value_dtype).itemsize
+    groups, bins, values = [], [], []
+    for g, text in enumerate(column.fillna("")):
+        raw = base64.b64decode(text)
+        if not raw:
+            continue
+        if np.frombuffer(raw[:4], np.float32)[0] != expected[0]:
+            raise ValueError(f"❌ Sketch {kind} construit avec un autre paramètre ({np.frombuffer(raw[:4], np.float32)[0]})")
+        n = (len(raw) - 4) // entry_size
+        groups.append(np.full(n, g, np.int64))
+        bins.append(np.frombuffer(raw, np.int32, n, offset=4))
+        values.append(np.frombuffer(raw, value_dtype, n, offset=4 + 4 * n))
+    if not groups:
+        return empty_sketch()
+    return pd.DataFrame({"group": np.concatenate(groups), "bin": np.concatenate(bins),
+                         "value": np.concatenate(values).astype(np.int64)})
@@ -0,0 +1,125 @@
+# transformations/data_splitter.py
+
+import io
+import os
+from typing import List, Tuple
+
+import numpy as np
+
+from transformations.data_storage import load_pipeline_config
+from transformations.data_zip import is_stream_only
+
+SCAN_BLOCK_SIZE = 16 * 1024 * 1024  # Taille des blocs lus pour repérer les fins de ligne
+
+
+class RangeReader(io.RawIOBase):
+    """
+    Flux binaire limité à l'intervalle [start, end) d'un fichier, éventuellement
+    précédé d'un préfixe (l'en-tête CSV pour les plages qui ne commencent pas le fichier).
+    """
+
+    def __init__(self, path: str, start: int, end: int, prefix: bytes = b""):
+        super().__init__()
+        self._file = open(path, "rb")
+        self._file.seek(start)
+        self._remaining = end - start
+        self._prefix = prefix
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        if self._prefix:
+            n = min(len(buffer), len(self._prefix))
+            buffer[:n] = self._prefix[:n]
+            self._prefix = self._prefix[n:]
+            return n
+        if self._remaining <= 0:
+            return 0
+        n = self._file.readinto(memoryview(buffer)[:min(len(buffer), self._remaining)])
+        self._remaining -= n
+        return n
+
+    def close(self) -> None:
+        self._file.close()
+        super().close()
+
+
+def open_range(path: str, start: int, end: int, prefix: bytes = b"") -> io.BufferedReader:
+    """
+    Ouvre une plage d'octets comme un fichier binaire lisible par pandas.
+    """
+    return io.BufferedReader(RangeReader(path, start, end, prefix))
+
+
+def read_header(path: str) -> bytes:
+    """
+    Première ligne du fichier (en-tête CSV), fin de ligne comprise.
+    """
+    with open(path, "rb") as f:
+        return f.readline()
+
+
+def should_split(path: str, workers: int) -> bool:
+    """
+    Découpage utile seulement avec plusieurs workers et un fichier d'au moins `split_min_mb` Mo
+    (fichier à plat : un flux compressé ou un membre d'archive ne se lit pas par plages).
+    """
+    if workers <= 1 or is_stream_only(path):
+        return False
+    min_bytes = load_pipeline_config().get("split_min_mb", 64) * 1024 * 1024
+    return os.path.getsize(path) >= min_bytes
+
+
+def split_line_ranges(path: str, n_parts: int, header: bool = False) -> List[Tuple[int, int]]:
+    """
+    Découpe un fichier en n_parts plages d'octets de tailles voisines, chaque frontière
+    étant reportée au début de la ligne suivante. Avec header=True, la première ligne
+    est exclue des plages (elle est à rajouter devant chacune).
+    """
+    size = os.path.getsize(path)
+    first = len(read_header(path)) if header else 0
+    bounds = [first]
+    with open(path, "rb") as f:
+        for i in range(1, n_parts):
+            target = first + (size - first) * i // n_parts
+            if target <= bounds[-1]:
+                continue
+            f.seek(target - 1)
+            f.readline()
+            bounds.append(f.tell())
+    bounds.append(size)
+    return [(start, end) for start, end in zip(bounds, bounds[1:]) if start < end]
+
+
+def split_chunk_ranges(path: str, chunksize: int, n_parts: int) -> List[Tuple[int, int, int]]:
+    """
+    Découpe un fichier ligne à ligne (JSONL) en plages alignées sur les chunks de
+    `chunksize` lignes d'une lecture séquentielle : renvoie (début, fin, numéro du
+    premier chunk). Chaque plage relue par chunks redonne exactement les mêmes chunks.
+    """
+    size = os.path.getsize(path)
+    offsets = [0]
+    lines_seen = 0
+    with open(path, "rb") as f:
+        pos = 0
+        while True:
+            block = f.read(SCAN_BLOCK_SIZE)
+            if not block:
+                break
+            newlines = np.flatnonzero(np.frombuffer(block, dtype=np.uint8) == ord("\n"))
+            first = (-lines_seen - 1) % chunksize  # fin de ligne qui termine un chunk
+            offsets.extend((pos + newlines[first::chunksize] + 1).tolist())
+            lines_seen += len(newlines)
+            pos += len(block)
+    if offsets[-1] < size:
+        offsets.append(size)
+
+    n_chunks = len(offsets) - 1
+    n_parts = max(1, min(n_parts, n_chunks))
+    ranges = []
+    for i in range(n_parts):
+        lo, hi = n_chunks * i // n_parts, n_chunks * (i + 1) // n_parts
+        if lo < hi:
+            ranges.append((offsets[lo], offsets[hi], lo))
+    return ranges
@@ -0,0 +1,284 @@
+# transformations/data_storage.py
+
+import os
+import threading
+from functools import lru_cache
+from typing import Iterable, Iterator, List, Optional
+
+import pandas as pd
+import yaml
+
+from transformations.data_counters import add_counts
+
+PIPELINE_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+CONFIG_PATH = os.path.join(PIPELINE_ROOT, "config", "pipeline_config.yaml")
+
+SUPPORTED_FORMATS = {"csv": ".csv", "parquet": ".parquet"}
+
+
+@lru_cache(maxsize=None)
+def load_pipeline_config(config_path: str = CONFIG_PATH) -> dict:
+    """
+    Charge pipeline_config.yaml (une seule fois par processus).
+    """
+    if not os.path.exists(config_path):
+        return {}
+    with open(config_path) as f:
+        return yaml.safe_load(f) or {}
+
+
+@lru_cache(maxsize=None)
+def get_output_format() -> str:
+    """
+    Format de sortie configuré (`output_format`), avec repli sur CSV si pyarrow est absent.
+    """
+    fmt = str(load_pipeline_config().get("output_format", "csv")).lower()
+    if fmt not in SUPPORTED_FORMATS:
+        raise ValueError(f"❌ Format de sortie non supporté : {fmt}")
+    if fmt == "parquet":
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            print("⚠️  pyarrow indisponible : repli sur le format CSV")
+            return "csv"
+    return fmt
+
+
+def table_path(base_path: str, fmt: Optional[str] = None) -> str:
+    """
+    Chemin complet d'une table (base sans extension + extension du format).
+    """
+    fmt = fmt or get_output_format()
+    return base_path + SUPPORTED_FORMATS[fmt]
+
+
+def write_table(df: pd.DataFrame, base_path: str, fmt: Optional[str] = None) -> str:
+    """
+    Écrit un DataFrame au format configuré et renvoie le chemin du fichier produit.
+    Parquet : compression + statistiques par row group (min/max) pour le pruning.
+    L'écriture passe par un fichier temporaire renommé atomiquement : un lecteur ne
+    voit jamais de fichier partiel.
+    """
+    fmt = fmt or get_output_format()
+    output_path = table_path(base_path, fmt)
+    tmp_path = f"{output_path}.tmp-{os.getpid()}-{threading.get_ident()}"
+
+    try:
+        if fmt == "parquet":
+            config = load_pipeline_config()
+            df.to_parquet(
+                tmp_path,
+                engine="pyarrow",
+                index=False,
+                compression=config.get("parquet_compression", "zstd"),
+                row_group_size=config.get("parquet_row_group_size", 100_000),
+                write_statistics=True,
+            )
+        else:
+            df.to_csv(tmp_path, index=False)
+        add_counts(bytes_written=os.path.getsize(tmp_path))
+        os.replace(tmp_path, output_path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    return output_path
+
+
+def resolve_table(base_path: str) -> str:
+    """
+    Retrouve une table existante quel que soit son format (format configuré en priorité).
+    """
+    preferred = get_output_format()
+    for fmt in [preferred] + [f for f in SUPPORTED_FORMATS if f != preferred]:
+        path = table_path(base_path, fmt)
+        if os.path.exists(path):
+            return path
+    raise FileNotFoundError(f"Table introuvable : {base_path}.(csv|parquet)")
+
+
+def read_table(path: str, columns: Optional[List[str]] = None) -> pd.DataFrame:
+    """
+    Lit une table CSV ou Parquet en ne chargeant que les colonnes demandées.
+    """
+    if path.endswith(".parquet"):
+        df = pd.read_parquet(path, columns=columns)
+    else:
+        df = pd.read_csv(path, usecols=columns)
+    add_counts(rows_in=len(df), bytes_read=os.path.getsize(path))
+    return df
+
+
+# ===============================
+# 🧩 Datasets : une pièce par fichier d'entrée (et par chunk)
+# ===============================
+
+PIECE_CHUNK_SEP = "__chunk"
+
+
+def piece_name(input_path: str, chunk_id: Optional[int] = None) -> str:
+    """
+    Nom d'une pièce de dataset : nom complet du fichier source, extension comprise
+    (products_catalog.csv et products_catalog.xlsx restent distincts) (+ numéro de chunk).
+    """
+    stem = os.path.basename(input_path)
+    if chunk_id is None:
+        return stem
+    return f"{stem}{PIECE_CHUNK_SEP}{chunk_id:05d}"
+
+
+def _legacy_piece_name(input_path: str) -> str:
+    """
+    Ancien nom de pièce (sans extension ni .gz), supprimé au retraitement du fichier.
+    """
+    name = os.path.basename(input_path)
+    if name.endswith(".gz"):
+        name = name[:-len(".gz")]
+    return os.path.splitext(name)[0]
+
+
+def _pieces_of(dataset_path: str, stem: str) -> List[str]:
+    pieces = []
+    for path in list_dataset(dataset_path):
+        name = os.path.splitext(os.path.basename(path))[0]
+        if name == stem or name.startswith(stem + PIECE_CHUNK_SEP):
+            pieces.append(path)
+    return pieces
+
+
+def list_dataset(dataset_path: str) -> List[str]:
+    """
+    Pièces publiées d'un dataset (fichiers temporaires exclus), dans un ordre stable.
+    """
+    if not os.path.isdir(dataset_path):
+        return []
+    extensions = tuple(SUPPORTED_FORMATS.values())
+    return sorted(
+        os.path.join(dataset_path, name) for name in os.listdir(dataset_path)
+        if name.endswith(extensions)
+    )
+
+
+def write_dataset_piece(df: pd.DataFrame, dataset_path: str, input_path: str,
+                        chunk_id: Optional[int] = None) -> str:
+    """
+    Publie (atomiquement) la pièce d'un fichier d'entrée / chunk : des workers parallèles
+    écrivent chacun leurs pièces sans jamais s'écraser.
+    """
+    os.makedirs(dataset_path, exist_ok=True)
+    return write_table(df, os.path.join(dataset_path, piece_name(input_path, chunk_id)))
+
+
+def dataset_pieces(dataset_path: str, input_path: str) -> List[str]:
+    """
+    Pièces publiées d'un fichier d'entrée (toutes ses pièces de chunk).
+    """
+    return _pieces_of(dataset_path, piece_name(input_path))
+
+
+def remove_dataset_pieces(dataset_path: str, input_path: str) -> None:
+    """
+    Supprime les pièces d'un fichier d'entrée (avant un retraitement complet), y compris
+    celles écrites sous l'ancien nom sans extension.
+    """
+    for path in dataset_pieces(dataset_path, input_path) + _pieces_of(dataset_path, _legacy_piece_name(input_path)):
+        os.remove(path)
+
+
+def read_dataset(dataset_path: str, columns: Optional[List[str]] = None) -> pd.DataFrame:
+    """
+    Lit toutes les pièces d'un dataset en un seul DataFrame.
+    """
+    pieces = list_dataset(dataset_path)
+    if not pieces:
+        raise FileNotFoundError(f"Dataset vide ou introuvable : {dataset_path}")
+    return pd.concat([read_table(p, columns=columns) for p in pieces], ignore_index=True)
+
+
+def iter_dataset(dataset_path: str, chunksize: int = 100_000,
+                 columns: Optional[List[str]] = None) -> Iterator[pd.DataFrame]:
+    """
+    Parcourt toutes les pièces d'un dataset par blocs (mémoire bornée).
+    """
+    pieces = list_dataset(dataset_path)
+    if not pieces:
+        raise FileNotFoundError(f"Dataset vide ou introuvable : {dataset_path}")
+    for path in pieces:
+        yield from iter_table(path, chunksize, columns=columns)
+
+
+def iter_table(path: str, chunksize: int = 100_000, columns: Optional[List[str]] = None) -> Iterator[pd.DataFrame]:
+    """
+    Parcourt une table CSV ou Parquet par blocs de `chunksize` lignes (mémoire bornée).
+    """
+    add_counts(bytes_read=os.path.getsize(path))
+    if path.endswith(".parquet"):
+        import pyarrow.parquet as pq
+        batches = (batch.to_pandas() for batch in pq.ParquetFile(path).iter_batches(batch_size=chunksize, columns=columns))
+    else:
+        batches = pd.read_csv(path, usecols=columns, chunksize=chunksize)
+    for df in batches:
+        add_counts(rows_in=len(df))
+        yield df
+
+
+def _empty_schema(schema):
+    """
+    Schéma d'une table sans aucun bloc : impossible à déduire sans `schema` explicite.
+    """
+    if schema is None:
+        raise ValueError("❌ Aucun bloc à écrire et aucun schéma fourni")
+    return schema
+
+
+def write_table_batches(batches: Iterable[pd.DataFrame], base_path: str, fmt: Optional[str] = None,
+                        schema=None) -> str:
+    """
+    Écrit une suite de DataFrames dans une seule table, bloc par bloc, avec la même
+    publication atomique que write_table. `schema` (pyarrow) impose des types communs
+    à tous les blocs ; à défaut, le schéma du premier bloc est utilisé. Sans aucun bloc,
+    une table vide au schéma `schema` est écrite.
+    """
+    fmt = fmt or get_output_format()
+    output_path = table_path(base_path, fmt)
+    tmp_path = f"{output_path}.tmp-{os.getpid()}-{threading.get_ident()}"
+    writer = None
+
+    try:
+        if fmt == "parquet":
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+            config = load_pipeline_config()
+            for df in batches:
+                table = pa.Table.from_pandas(df, schema=schema, preserve_index=False)
+                if writer is None:
+                    writer = pq.ParquetWriter(
+                        tmp_path, table.schema,
+                        compression=config.get("parquet_compression", "zstd"),
+                        write_statistics=True,
+                    )
+                writer.write_table(table, row_group_size=config.get("parquet_row_group_size", 100_000))
+            if writer is None:
+                # Aucun bloc (ex : dataset vide) : table vide au schéma attendu, comme write_table
+                pq.write_table(_empty_schema(schema).empty_table(), tmp_path,
+                               compression=config.get("parquet_compression", "zstd"))
+            else:
+                writer.close()
+                writer = None
+        else:
+            header = True
+            for df in batches:
+                if schema is not None:
+                    import pyarrow as pa
+                    df = pa.Table.from_pandas(df, schema=schema, preserve_index=False).to_pandas()
+                df.to_csv(tmp_path, index=False, header=header, mode="w" if header else "a")
+                header = False
+            if header:
+                pd.DataFrame(columns=_empty_schema(schema).names).to_csv(tmp_path, index=False)
+        add_counts(bytes_written=os.path.getsize(tmp_path))
+        os.replace(tmp_path, output_path)
+    finally:
+        if writer is not None:
+            writer.close()
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    return output_path
@@ -0,0 +1,119 @@
+# transformations/data_zip.py
+# Lecture en flux des membres d'archives zip (sans extraction) — bibliothèque standard uniquement,
+# importable par le manifest sans charger pandas
+
+import fnmatch
+import gzip
+import os
+import time
+import zipfile
+from contextlib import contextmanager
+from typing import BinaryIO, Iterator, List, Optional, Tuple
+
+ARCHIVE_EXTENSION = ".zip"
+COMPRESSED_EXTENSION = ".gz"
+
+
+def archive_member_path(zip_path: str, member: str) -> str:
+    """
+    Chemin logique d'un membre : <archive.zip>/<membre>. Son nom de base est celui
+    du membre, comme s'il avait été extrait dans un dossier.
+    """
+    return os.path.join(zip_path, member)
+
+
+def split_archive_path(path: str) -> Optional[Tuple[str, str]]:
+    """
+    (archive, membre) si `path` désigne un membre d'archive zip, None sinon.
+    """
+    if os.path.exists(path):
+        return None
+    zip_path, sep, member = path.partition(ARCHIVE_EXTENSION + os.sep)
+    if not sep or not os.path.isfile(zip_path + ARCHIVE_EXTENSION):
+        return None
+    return zip_path + ARCHIVE_EXTENSION, member
+
+
+def input_exists(path: str) -> bool:
+    """
+    Vrai pour un fichier existant ou un membre présent dans son archive.
+    """
+    archive = split_archive_path(path)
+    if archive is None:
+        return os.path.exists(path)
+    with zipfile.ZipFile(archive[0]) as zf:
+        return archive[1] in zf.NameToInfo
+
+
+def source_extension(path: str) -> str:
+    """
+    Extension du contenu (.json, .csv...), compression gzip éventuelle ignorée.
+    """
+    if path.endswith(COMPRESSED_EXTENSION):
+        path = path[:-len(COMPRESSED_EXTENSION)]
+    return os.path.splitext(path)[1].lower()
+
+
+def is_stream_only(path: str) -> bool:
+    """
+    Entrée lisible uniquement en flux (membre d'archive ou fichier gzip) : pas d'accès par plages.
+    """
+    return path.endswith(COMPRESSED_EXTENSION) or split_archive_path(path) is not None
+
+
+def list_archive_members(zip_path: str, pattern: str = "*.json.gz", limit: Optional[int] = None) -> List[str]:
+    """
+    Membres (fichiers) de l'archive dont le nom de base correspond à `pattern`, triés
+    (les `limit` premiers seulement si précisé).
+    """
+    with zipfile.ZipFile(zip_path) as zf:
+        members = sorted(
+            info.filename for info in zf.infolist()
+            if not info.is_dir() and fnmatch.fnmatch(os.path.basename(info.filename), pattern)
+        )
+    return members[:limit] if limit else members
+
+
+def input_size(path: str) -> int:
+    """
+    Octets lus sur disque pour une entrée (taille compressée pour un membre d'archive).
+    """
+    archive = split_archive_path(path)
+    if archive is None:
+        return os.path.getsize(path)
+    with zipfile.ZipFile(archive[0]) as zf:
+        return zf.getinfo(archive[1]).compress_size
+
+
+def member_fingerprint(path: str) -> Tuple[str, int, float]:
+    """
+    Empreinte d'un membre lue dans le répertoire central du zip, sans décompression :
+    (CRC-32 et taille décompressée, taille, date du membre).
+    """
+    zip_path, member = split_archive_path(path)
+    with zipfile.ZipFile(zip_path) as zf:
+        info = zf.getinfo(member)
+    mtime = time.mktime(info.date_time + (0, 0, -1))
+    return f"crc32:{info.CRC:08x}:{info.file_size}", info.file_size, mtime
+
+
+@contextmanager
+def open_input(path: str) -> Iterator[BinaryIO]:
+    """
+    Ouvre une entrée en flux binaire décompressé : membre d'archive zip et/ou gzip.
+    Rien n'est écrit sur disque ; la décompression se fait au fil de la lecture.
+    """
+    archive = split_archive_path(path)
+    if archive is None:
+        raw = open(path, "rb")
+    else:
+        with zipfile.ZipFile(archive[0]) as zf:
+            raw = zf.open(archive[1])  # Reste lisible après la fermeture du ZipFile
+    try:
+        if path.endswith(COMPRESSED_EXTENSION):
+            with gzip.GzipFile(fileobj=raw) as stream:
+                yield stream
+        else:
+            yield raw
+    finally:
+        raw.close()